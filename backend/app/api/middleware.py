@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+async def _send_error(send: Send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class MaxBodySizeMiddleware:
+    """Cap request bodies per path before FastAPI parses them.
+
+    A declared ``Content-Length`` over the limit is refused without reading
+    the body. Bodies without one (chunked) are counted as they are received and
+    refused with 413 once they pass the limit, so the multipart parser never
+    spools more than the limit to disk. Paths match with or without a trailing slash.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]) -> None:
+        self.app = app
+        self.limits = {path.rstrip("/"): limit for path, limit in limits.items()}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"].rstrip("/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                declared = -1
+            if declared < 0:
+                await _send_error(send, 400, "Invalid Content-Length header")
+                return
+            if declared > limit:
+                await _send_error(send, 413, f"Request body exceeds the maximum size of {limit} bytes")
+                return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Answer now and make the app see a disconnect, so it stops reading.
+                    rejected = True
+                    await _send_error(send, 413, f"Request body exceeds the maximum size of {limit} bytes")
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            # Whatever the app answers after the 413 (it sees a disconnect) is dropped.
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+
+__all__ = ["MaxBodySizeMiddleware"]
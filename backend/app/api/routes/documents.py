@@ -1,22 +1,63 @@
-from pathlib import Path
-from typing import Annotated
+import asyncio
+import dataclasses
+import json
+import mimetypes
+import uuid
+from datetime import datetime
+from typing import Annotated, AsyncIterator, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from loguru import logger
 from pydantic import BaseModel
-from sqlalchemy import select
+from celery import group
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.db.session import get_db
 from app.models.document import Document, DocumentStatus
-from app.schemas.document import DocumentRead
+from app.schemas.document import (
+    BatchProgress,
+    BatchUploadRead,
+    DocumentPage,
+    DocumentRead,
+    DocumentSummary,
+    DocumentTable,
+    DocumentText,
+)
+from app.schemas.search import SearchHit, SearchResponse
+from app.services.answer_cache import answer_cache
+from app.services.artifact_store import ArtifactManifest, artifact_store
+from app.services.comparison import document_comparator
+from app.services.document_list import document_counts, encode_cursor, list_filters, page_query
+from app.services.concurrency import stage_limiter
+from app.services.chunk_store import chunk_store
+from app.services.llm_cache import llm_cache
 from app.services.rag import rag_service
-from app.workers.tasks import process_document
+from app.services.search import search_service
+from app.services.search_index import SearchFilters
+from app.services.storage import (
+    ArchiveError,
+    StoredUpload,
+    UploadTooLargeError,
+    extract_archive,
+    save_upload,
+    spool_upload,
+)
+from app.workers.tasks import document_pipeline, reindex_embeddings
 from app.services.document_processor import DocumentProcessor
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
+async def _store_upload(file: UploadFile) -> StoredUpload:
+    try:
+        return await save_upload(file, file.filename)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+
+
 class QuestionRequest(BaseModel):
     question: str
 
@@ -31,17 +72,14 @@ async def upload_document(
     file: Annotated[UploadFile, File(..., description="Binary document")],
     db: AsyncSession = Depends(get_db),
 ) -> DocumentRead:
-    file_bytes = await file.read()
-    storage_dir = Path("storage/uploads")
-    storage_dir.mkdir(parents=True, exist_ok=True)
-    storage_path = storage_dir / file.filename
-    storage_path.write_bytes(file_bytes)
+    stored = await _store_upload(file)
 
     document = Document(
         filename=file.filename,
         content_type=file.content_type or "application/octet-stream",
-        size_bytes=len(file_bytes),
-        storage_path=str(storage_path),
+        size_bytes=stored.size_bytes,
+        storage_path=str(stored.path),
+        content_hash=stored.content_hash,
         document_metadata={"original_name": file.filename},
         status=DocumentStatus.PROCESSING,
     )
@@ -49,10 +87,118 @@ async def upload_document(
     await db.commit()
     await db.refresh(document)
 
-    process_document.delay(document.id, str(storage_path))
+    document_pipeline(document.id, str(stored.path)).delay()
     return DocumentRead.from_orm(document)
 
 
+@router.post("/batch", response_model=BatchUploadRead, status_code=status.HTTP_201_CREATED)
+async def upload_batch(
+    files: Annotated[list[UploadFile], File(..., description="Documents and/or zip archives of documents")],
+    db: AsyncSession = Depends(get_db),
+) -> BatchUploadRead:
+    """Upload many documents in one request; zip archives are expanded.
+
+    Every file is streamed to content-addressed storage, all ``Document`` rows
+    are created by one bulk ``INSERT ... RETURNING`` in a single commit, and
+    processing is dispatched as one Celery group whose id is the batch id.
+    Track it with ``GET /documents/batches/{batch_id}``. The multipart parser
+    accepts at most 1,000 parts per request, so larger backfills should send
+    zip archives.
+    """
+    settings = get_settings()
+    uploads: list[tuple[str, str, StoredUpload]] = []
+    for file in files:
+        filename = file.filename or "upload"
+        if filename.lower().endswith(".zip"):
+            try:
+                archive = await spool_upload(file, max_bytes=settings.max_batch_upload_bytes)
+                try:
+                    members = await asyncio.to_thread(
+                        extract_archive, archive, max_files=settings.batch_max_files - len(uploads)
+                    )
+                finally:
+                    archive.unlink(missing_ok=True)
+            except UploadTooLargeError as exc:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+            except ArchiveError as exc:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{filename}: {exc}")
+            uploads.extend(
+                (name, mimetypes.guess_type(name)[0] or "application/octet-stream", stored)
+                for name, stored in members
+            )
+        else:
+            stored = await _store_upload(file)
+            uploads.append((filename, file.content_type or "application/octet-stream", stored))
+        if len(uploads) > settings.batch_max_files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A batch may contain at most {settings.batch_max_files} files"
+            )
+    if not uploads:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The batch contains no files")
+
+    batch_id = str(uuid.uuid4())
+    result = await db.scalars(
+        insert(Document).returning(Document),
+        [
+            {
+                "filename": filename,
+                "content_type": content_type,
+                "size_bytes": stored.size_bytes,
+                "storage_path": str(stored.path),
+                "content_hash": stored.content_hash,
+                "document_metadata": {"original_name": filename},
+                "status": DocumentStatus.RECEIVED,
+                "batch_id": batch_id,
+            }
+            for filename, content_type, stored in uploads
+        ],
+    )
+    documents = result.all()
+    await db.commit()
+
+    job = group(document_pipeline(doc.id, doc.storage_path) for doc in documents)
+    try:
+        # One producer connection publishes every task; the group id doubles as the batch id.
+        await asyncio.to_thread(job.apply_async, task_id=batch_id)
+    except Exception as exc:
+        logger.exception("Dispatching batch {} failed: {}", batch_id, exc)
+        await db.execute(
+            update(Document).where(Document.batch_id == batch_id).values(status=DocumentStatus.FAILED)
+        )
+        await db.commit()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Could not queue the batch")
+
+    return BatchUploadRead(
+        batch_id=batch_id,
+        document_count=len(documents),
+        documents=[DocumentRead.from_orm(doc) for doc in documents],
+    )
+
+
+@router.get("/batches/{batch_id}", response_model=BatchProgress)
+async def batch_progress(batch_id: str, db: AsyncSession = Depends(get_db)) -> BatchProgress:
+    rows = await db.execute(
+        select(Document.status, func.count()).where(Document.batch_id == batch_id).group_by(Document.status)
+    )
+    counts = {doc_status: count for doc_status, count in rows.all()}
+    total = sum(counts.values())
+    if not total:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    completed = counts.get(DocumentStatus.COMPLETED, 0)
+    failed = counts.get(DocumentStatus.FAILED, 0)
+    return BatchProgress(
+        batch_id=batch_id,
+        total=total,
+        received=counts.get(DocumentStatus.RECEIVED, 0),
+        processing=counts.get(DocumentStatus.PROCESSING, 0),
+        completed=completed,
+        failed=failed,
+        finished=completed + failed == total,
+        progress=round((completed + failed) / total, 4),
+    )
+
+
 @router.post("/analyze-image")
 async def analyze_image(
     file: Annotated[UploadFile, File(..., description="Image file")],
@@ -64,16 +210,11 @@ async def analyze_image(
     `/upload` + background worker flow should be used.
     """
     processor = DocumentProcessor()
-    # save to temporary path
-    file_bytes = await file.read()
-    storage_dir = Path("storage/uploads")
-    storage_dir.mkdir(parents=True, exist_ok=True)
-    storage_path = storage_dir / file.filename
-    storage_path.write_bytes(file_bytes)
-
-    # Process synchronously (extract text, embed, summarize, etc.)
+    stored = await _store_upload(file)
+
+    # Extract and enrich synchronously; the image is not a stored document, so nothing is indexed.
     try:
-        result = processor.process(0, storage_path)
+        result = await stage_limiter.run("processing", processor.analyze, stored.path)
         return {
             "filename": file.filename,
             "summary": result.get("summary"),
@@ -88,15 +229,98 @@ async def analyze_image(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
 
-@router.get("/", response_model=list[DocumentRead])
+@router.get("/", response_model=DocumentPage)
 async def list_documents(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    doc_status: Annotated[Optional[DocumentStatus], Query(alias="status")] = None,
+    category: Optional[str] = None,
+    include_total: bool = False,
     db: AsyncSession = Depends(get_db),
-) -> list[DocumentRead]:
-    result = await db.execute(select(Document).offset(skip).limit(limit).order_by(Document.created_at.desc()))
-    documents = result.scalars().all()
-    return [DocumentRead.from_orm(doc) for doc in documents]
+) -> DocumentPage:
+    """Newest documents first, one page per request; follow ``next_cursor`` for the next page.
+
+    Rows are a summary projection (no insights or key points), paged by
+    keyset on ``(created_at, id)``, so page 10,000 costs the same as page 1.
+    ``include_total`` adds a per-filter count that is cached briefly.
+    """
+    filters = list_filters(doc_status, category)
+    try:
+        query = page_query(filters, cursor, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    rows = (await db.execute(query)).all()
+    items = [DocumentSummary.model_validate(row, from_attributes=True) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > limit else None
+    total = await document_counts.count(db, doc_status, category) if include_total else None
+    return DocumentPage(items=items, next_cursor=next_cursor, total=total)
+
+
+@router.get("/answer-cache/stats")
+async def answer_cache_stats() -> dict:
+    return answer_cache.stats()
+
+
+@router.get("/llm-cache/stats")
+async def llm_cache_stats() -> dict:
+    return await asyncio.to_thread(llm_cache.stats)
+
+
+@router.get("/index-versions")
+async def list_index_versions() -> list[dict]:
+    """Vector index versions: the active one, any being built by a re-index, and retired ones not yet dropped."""
+    versions = await asyncio.to_thread(chunk_store.versions)
+    return [dataclasses.asdict(version) for version in versions]
+
+
+@router.post("/index-versions/reindex", status_code=status.HTTP_202_ACCEPTED)
+async def start_reindex() -> dict:
+    """Re-embed every stored chunk with the configured embedding model in the background, then switch to it."""
+    result = await asyncio.to_thread(reindex_embeddings.delay)
+    return {"task_id": result.id}
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_documents(
+    q: Annotated[str, Query(min_length=1, max_length=512)],
+    category: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: Annotated[int, Query(ge=1)] = 1,
+    page_size: Annotated[int, Query(ge=1, le=100)] = 20,
+    db: AsyncSession = Depends(get_db),
+) -> SearchResponse:
+    """Search chunks across the whole corpus (BM25 and vector similarity, rank-fused)."""
+    offset = (page - 1) * page_size
+    if offset + page_size > get_settings().search_max_results:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Page is beyond the searchable result window; narrow the query or filters",
+        )
+    filters = SearchFilters(category=category, sentiment=sentiment, date_from=date_from, date_to=date_to)
+    results, has_more = await stage_limiter.run("vector", search_service.search, q, filters, offset, page_size)
+
+    ids = {result.document_id for result in results}
+    rows = await db.execute(select(Document).where(Document.id.in_(ids))) if ids else None
+    documents = {document.id: document for document in rows.scalars()} if rows else {}
+    hits = [
+        SearchHit(
+            document_id=result.document_id,
+            filename=documents[result.document_id].filename,
+            category=documents[result.document_id].category,
+            sentiment=documents[result.document_id].sentiment,
+            chunk_index=result.chunk_index,
+            page=result.page,
+            snippet=result.snippet,
+            score=result.score,
+            keyword_rank=result.keyword_rank,
+            vector_rank=result.vector_rank,
+        )
+        for result in results
+        if result.document_id in documents
+    ]
+    return SearchResponse(query=q, page=page, page_size=page_size, has_more=has_more, results=hits)
 
 
 @router.get("/{document_id}", response_model=DocumentRead)
@@ -107,6 +331,89 @@ async def get_document(document_id: int, db: AsyncSession = Depends(get_db)) ->
     # return DocumentRead.from_orm(document)
     return None
 
+
+async def _stored_artifacts(document_id: int, db: AsyncSession) -> ArtifactManifest:
+    row = (await db.execute(select(Document.content_hash).where(Document.id == document_id))).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    manifest = await asyncio.to_thread(artifact_store.manifest, row.content_hash) if row.content_hash else None
+    if manifest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No extracted text is stored for this document"
+        )
+    return manifest
+
+
+@router.get("/{document_id}/text", response_model=DocumentText)
+async def read_document_text(
+    document_id: int,
+    start: Annotated[int, Query(ge=0)] = 0,
+    length: Annotated[int, Query(ge=1, le=1024 * 1024)] = 64 * 1024,
+    db: AsyncSession = Depends(get_db),
+) -> DocumentText:
+    """Characters ``[start, start + length)`` of the extracted text, decompressing only the frames covering them."""
+    manifest = await _stored_artifacts(document_id, db)
+    end = min(start + length, manifest.text_chars)
+    start = min(start, end)
+    text = await asyncio.to_thread(artifact_store.read_text, manifest.content_hash, start, end)
+    return DocumentText(document_id=document_id, start=start, end=end, text_length=manifest.text_chars, text=text)
+
+
+@router.get("/{document_id}/pages/{page}", response_model=DocumentText)
+async def read_document_page(document_id: int, page: int, db: AsyncSession = Depends(get_db)) -> DocumentText:
+    manifest = await _stored_artifacts(document_id, db)
+    result = await asyncio.to_thread(artifact_store.read_page, manifest.content_hash, page)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Page {page} not found")
+    start, end, text = result
+    return DocumentText(
+        document_id=document_id, start=start, end=end, text_length=manifest.text_chars, page=page, text=text
+    )
+
+
+@router.get("/{document_id}/chunks/{chunk_index}", response_model=DocumentText)
+async def read_document_chunk(document_id: int, chunk_index: int, db: AsyncSession = Depends(get_db)) -> DocumentText:
+    """A chunk as indexed (under the current chunking settings), sliced from the stored text."""
+    manifest = await _stored_artifacts(document_id, db)
+    result = await asyncio.to_thread(artifact_store.read_chunk, manifest.content_hash, chunk_index)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Chunk {chunk_index} not found")
+    span, text = result
+    return DocumentText(
+        document_id=document_id,
+        start=span.start,
+        end=span.end,
+        text_length=manifest.text_chars,
+        page=span.page,
+        page_end=span.page_end,
+        chunk_index=chunk_index,
+        text=text,
+    )
+
+
+@router.get("/{document_id}/tables/{table_index}", response_model=DocumentTable)
+async def read_document_table(
+    document_id: int,
+    table_index: int,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=10000)] = 1000,
+    db: AsyncSession = Depends(get_db),
+) -> DocumentTable:
+    """Rows ``[offset, offset + limit)`` of an extracted table (insights only keep the first few)."""
+    manifest = await _stored_artifacts(document_id, db)
+    result = await asyncio.to_thread(artifact_store.read_table, manifest.content_hash, table_index, offset, limit)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Table {table_index} not found")
+    table, rows = result
+    return DocumentTable(
+        document_id=document_id,
+        index=table_index,
+        headers=table.headers,
+        row_count=table.row_count,
+        offset=offset,
+        rows=rows,
+    )
+
 @router.post("/{document_id}/ask")
 async def ask_question(
     document_id: int,
@@ -123,28 +430,73 @@ async def ask_question(
             detail="Document processing is not complete yet"
         )
     
-    rag_result = rag_service.answer(document_id, request.question)
+    rag_result = await rag_service.aanswer(document_id, request.question, version=document.updated_at.isoformat())
     return {
         "answer": rag_result["answer"],
         "sources": rag_result.get("sources", []),
         "document_id": document_id,
+        "cached": rag_result.get("cached", False),
     }
 
 
+@router.post("/{document_id}/ask/stream")
+async def ask_question_stream(
+    document_id: int,
+    request: QuestionRequest,
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Server-Sent Events: one ``sources`` event, ``token`` events as the answer is generated, then ``done``.
+
+    A client disconnect cancels the stream, which closes the upstream LLM request.
+    """
+    document = await db.get(Document, document_id)
+    if not document:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
+    if document.status != DocumentStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Document processing is not complete yet"
+        )
+
+    version = document.updated_at.isoformat()
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in rag_service.astream(document_id, request.question, version=version):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as exc:
+            logger.exception("Streaming answer failed for document {}: {}", document_id, exc)
+            yield f"event: error\ndata: {json.dumps({'detail': 'Failed to generate answer'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/compare")
 async def compare_documents(
     request: CompareRequest,
     db: AsyncSession = Depends(get_db),
 ) -> dict:
-    if len(request.document_ids) < 2:
+    document_ids = list(dict.fromkeys(request.document_ids))
+    if len(document_ids) < 2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="At least 2 documents are required for comparison"
         )
-    
-    documents = []
-    for doc_id in request.document_ids:
-        doc = await db.get(Document, doc_id)
+    if len(document_ids) > get_settings().compare_max_documents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {get_settings().compare_max_documents} documents can be compared at once"
+        )
+
+    rows = await db.execute(select(Document).where(Document.id.in_(document_ids)))
+    found = {doc.id: doc for doc in rows.scalars()}
+    for doc_id in document_ids:
+        doc = found.get(doc_id)
         if not doc:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -155,16 +507,5 @@ async def compare_documents(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Document {doc_id} processing is not complete yet"
             )
-        documents.append(doc)
-    
-    # TODO: Implement document comparison logic
-    # For now, return a placeholder comparison
-    comparison = {
-        "documents": [{"id": doc.id, "filename": doc.filename} for doc in documents],
-        "similarities": "Placeholder: Documents are being compared...",
-        "differences": "Placeholder: Differences will be highlighted here...",
-    }
-    
-    return comparison
-
 
+    return await document_comparator.acompare([(doc_id, found[doc_id].filename) for doc_id in document_ids])
@@ -20,14 +20,167 @@ class Settings(BaseSettings):
     celery_result_backend: str = Field("redis://localhost:6379/2", alias="CELERY_RESULT_BACKEND")
 
     vector_db_path: Path = Field(Path("./storage/chroma"), alias="VECTOR_DB_PATH")
+    upload_dir: Path = Field(Path("./storage/uploads"), alias="UPLOAD_DIR")
+    max_upload_bytes: int = Field(512 * 1024 * 1024, alias="MAX_UPLOAD_BYTES")
+    upload_chunk_size: int = Field(1024 * 1024, alias="UPLOAD_CHUNK_SIZE")
+    # /documents/batch: total request size and number of files (after expanding zip archives).
+    max_batch_upload_bytes: int = Field(8 * 1024 * 1024 * 1024, alias="MAX_BATCH_UPLOAD_BYTES")
+    batch_max_files: int = Field(10000, alias="BATCH_MAX_FILES")
+    artifact_cache_path: Path = Field(Path("./storage/artifacts"), alias="ARTIFACT_CACHE_PATH")
+    # Extracted text, chunk offset maps and tables of each upload (by content hash), kept once.
+    # Text is zstd-compressed in frames of ARTIFACT_STORE_FRAME_CHARS characters and tables
+    # column-wise in groups of ARTIFACT_STORE_ROW_GROUP_ROWS rows, so a page, chunk or run of
+    # table rows is served by decompressing only the frames it covers. "local" keeps them under
+    # ARTIFACT_STORE_PATH; "s3" keeps them in the bucket (any S3-compatible endpoint) and uses
+    # ARTIFACT_STORE_PATH as scratch space while writing.
+    artifact_store_backend: str = Field("local", alias="ARTIFACT_STORE_BACKEND")
+    artifact_store_path: Path = Field(Path("./storage/artifact_store"), alias="ARTIFACT_STORE_PATH")
+    artifact_store_s3_bucket: str | None = Field(default=None, alias="ARTIFACT_STORE_S3_BUCKET")
+    artifact_store_s3_prefix: str = Field("artifacts/", alias="ARTIFACT_STORE_S3_PREFIX")
+    artifact_store_s3_endpoint_url: str | None = Field(default=None, alias="ARTIFACT_STORE_S3_ENDPOINT_URL")
+    artifact_store_frame_chars: int = Field(64 * 1024, alias="ARTIFACT_STORE_FRAME_CHARS")
+    artifact_store_row_group_rows: int = Field(1024, alias="ARTIFACT_STORE_ROW_GROUP_ROWS")
+    artifact_store_zstd_level: int = Field(3, alias="ARTIFACT_STORE_ZSTD_LEVEL")
+    # Rows of each extracted table kept in a document's insights; the whole table is served
+    # from the artifact store by GET /documents/{id}/tables/{index}.
+    table_preview_rows: int = Field(5, alias="TABLE_PREVIEW_ROWS")
+    # Unreferenced uploads/artifacts younger than this are kept so in-flight uploads survive GC.
+    artifact_gc_min_age_seconds: int = Field(3600, alias="ARTIFACT_GC_MIN_AGE_SECONDS")
+    # Per-run scratch directories the staged Celery pipeline hands stage outputs through.
+    # Must be on storage shared by the cpu and io workers.
+    stage_workspace_path: Path = Field(Path("./storage/stages"), alias="STAGE_WORKSPACE_PATH")
+    stage_workspace_max_age_seconds: int = Field(24 * 3600, alias="STAGE_WORKSPACE_MAX_AGE_SECONDS")
     database_url: str = Field("sqlite+aiosqlite:///./storage/app.db", alias="DATABASE_URL")
+    # GET /documents: how long a total count (per filter) is reused before being recounted.
+    document_count_cache_ttl_seconds: int = Field(30, alias="DOCUMENT_COUNT_CACHE_TTL_SECONDS")
+
+    # Celery worker children: pooled DB connections each, and torch intra-op threads each
+    # (unset keeps torch's default of one per core, which oversubscribes prefork pools).
+    worker_db_pool_size: int = Field(5, alias="WORKER_DB_POOL_SIZE")
+    worker_torch_threads: int | None = Field(default=None, alias="WORKER_TORCH_THREADS")
+    # Load the embedding model in the parent before forking so children share its pages.
+    worker_preload_models: bool = Field(True, alias="WORKER_PRELOAD_MODELS")
+    # Port the worker's main process serves Prometheus metrics on (aggregated across prefork
+    # children when PROMETHEUS_MULTIPROC_DIR is set); 0 disables it.
+    worker_metrics_port: int = Field(9100, alias="WORKER_METRICS_PORT")
+
+    # OCR pool size per worker process. Unset, a prefork worker's children split the cores
+    # (cores // --concurrency each, at least 1) rather than each starting one process per core.
+    ocr_workers: int | None = Field(default=None, alias="OCR_WORKERS")
+    ocr_dpi: int = Field(300, alias="OCR_DPI")
+    ocr_language: str = Field("eng", alias="OCR_LANGUAGE")
+    # PDF pages whose text layer has fewer characters than this are rasterized and OCR'd.
+    ocr_min_text_chars: int = Field(16, alias="OCR_MIN_TEXT_CHARS")
+    ocr_cache_path: Path = Field(Path("./storage/ocr_cache"), alias="OCR_CACHE_PATH")
 
     embedding_model: str = Field("all-MiniLM-L6-v2", alias="EMBEDDING_MODEL")
+    # Concurrent query embeddings are coalesced into one encode call of up to this size...
+    embedding_batch_max_size: int = Field(32, alias="EMBEDDING_BATCH_MAX_SIZE")
+    # ...waiting at most this long for the batch to fill.
+    embedding_batch_max_wait_ms: float = Field(5.0, alias="EMBEDDING_BATCH_MAX_WAIT_MS")
+    # dtype for embeddings we persist ourselves (artifact cache, numpy vector backend):
+    # float32, float16 or int8.
+    embedding_storage_dtype: str = Field("float32", alias="EMBEDDING_STORAGE_DTYPE")
+    # Chunk size is measured in embedding-model tokens and capped at the model's max sequence length.
+    chunk_max_tokens: int = Field(256, alias="CHUNK_MAX_TOKENS")
+    chunk_overlap_tokens: int = Field(0, alias="CHUNK_OVERLAP_TOKENS")
+    # Chunks are embedded and upserted in batches of this size, bounding worker memory.
+    embedding_batch_size: int = Field(64, alias="EMBEDDING_BATCH_SIZE")
     llm_model: str = Field("gpt-4o-mini", alias="LLM_MODEL")
     llm_api_key: str = Field("changeme", alias="LLM_API_KEY")
     llm_base_url: str | None = Field(default=None, alias="LLM_BASE_URL")
+    # Connection pool and timeout of the async HTTP client used by the API.
+    llm_max_connections: int = Field(200, alias="LLM_MAX_CONNECTIONS")
+    llm_timeout_seconds: float = Field(60.0, alias="LLM_TIMEOUT_SECONDS")
+    # Provider quota shared by every API and worker process through Redis (REDIS_URL).
+    # Batch (enrichment) requests leave the reserve fraction of both buckets to interactive
+    # ones (questions); a caller waits at most the max wait before sending anyway.
+    llm_rate_limit_enabled: bool = Field(True, alias="LLM_RATE_LIMIT_ENABLED")
+    llm_requests_per_minute: int = Field(500, alias="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: int = Field(200_000, alias="LLM_TOKENS_PER_MINUTE")
+    llm_batch_reserve_fraction: float = Field(0.2, alias="LLM_BATCH_RESERVE_FRACTION")
+    llm_rate_limit_max_wait_seconds: float = Field(300.0, alias="LLM_RATE_LIMIT_MAX_WAIT_SECONDS")
+    # Per-process cap on in-flight requests, adapted between min and max (AIMD) as the
+    # provider accepts or throttles them.
+    llm_concurrency_initial: int = Field(16, alias="LLM_CONCURRENCY_INITIAL")
+    llm_concurrency_min: int = Field(1, alias="LLM_CONCURRENCY_MIN")
+    llm_concurrency_max: int = Field(128, alias="LLM_CONCURRENCY_MAX")
+    # Retries of throttled (429), 5xx and connection-failed requests, with full-jitter
+    # exponential backoff unless the provider sends Retry-After.
+    llm_max_retries: int = Field(5, alias="LLM_MAX_RETRIES")
+    llm_retry_base_seconds: float = Field(0.5, alias="LLM_RETRY_BASE_SECONDS")
+    llm_retry_max_seconds: float = Field(30.0, alias="LLM_RETRY_MAX_SECONDS")
+    # Persistent cache of completions keyed by a hash of model, prompts, max tokens and output
+    # format, so re-running identical prompts (retries, backfills, tests) makes no request.
+    # Spread over this many SQLite files; entries unused for the max age, or least recently
+    # used beyond the size limit, are evicted by the collect_garbage task.
+    llm_cache_enabled: bool = Field(True, alias="LLM_CACHE_ENABLED")
+    llm_cache_path: Path = Field(Path("./storage/llm_cache"), alias="LLM_CACHE_PATH")
+    llm_cache_shards: int = Field(16, alias="LLM_CACHE_SHARDS")
+    llm_cache_max_age_seconds: int = Field(30 * 24 * 3600, alias="LLM_CACHE_MAX_AGE_SECONDS")
+    llm_cache_max_mb: int = Field(1024, alias="LLM_CACHE_MAX_MB")
+
+    # Threads the API process uses for blocking work (vector queries, inline processing).
+    api_blocking_workers: int = Field(16, alias="API_BLOCKING_WORKERS")
+    # Build the model, vector store and LLM client in the background right after startup,
+    # so the first requests do not pay for loading them.
+    api_warm_up: bool = Field(True, alias="API_WARM_UP")
+    # Per-stage limits on in-flight work within one API process.
+    api_embedding_concurrency: int = Field(256, alias="API_EMBEDDING_CONCURRENCY")
+    api_vector_concurrency: int = Field(8, alias="API_VECTOR_CONCURRENCY")
+    api_llm_concurrency: int = Field(128, alias="API_LLM_CONCURRENCY")
+    api_processing_concurrency: int = Field(2, alias="API_PROCESSING_CONCURRENCY")
 
     chroma_collection: str = Field("documents", alias="CHROMA_COLLECTION")
+    # "chroma" (one global collection) or "numpy" (memory-mapped matrix per document, plus one
+    # corpus-wide matrix that /search scans exactly, taking 100-200 ms per 1M chunks; chroma's ANN
+    # index keeps corpus-wide search under 100 ms at that size).
+    vector_backend: str = Field("chroma", alias="VECTOR_BACKEND")
+    numpy_vector_path: Path = Field(Path("./storage/vectors"), alias="NUMPY_VECTOR_PATH")
+    # Chunk texts and metadata, kept apart from the vector index so that changing EMBEDDING_MODEL
+    # or VECTOR_BACKEND only needs the reindex_embeddings task to re-embed them into a new index
+    # version, not re-processing every document. Queries use the active version until it is done.
+    chunk_store_path: Path = Field(Path("./storage/chunks.db"), alias="CHUNK_STORE_PATH")
+    reindex_batch_size: int = Field(512, alias="REINDEX_BATCH_SIZE")
+    # A re-index job holds its version for this long past its last progress; a crashed job's
+    # version can be resumed by another after that.
+    reindex_lease_seconds: int = Field(600, alias="REINDEX_LEASE_SECONDS")
+    # Retired versions are dropped by collect_garbage after this, once in-flight queries are done.
+    index_version_retention_seconds: int = Field(3600, alias="INDEX_VERSION_RETENTION_SECONDS")
+
+    # SQLite FTS5 inverted index over chunk text, updated incrementally at ingest.
+    search_index_path: Path = Field(Path("./storage/search.db"), alias="SEARCH_INDEX_PATH")
+    search_rrf_k: int = Field(60, alias="SEARCH_RRF_K")
+    # Deepest result position /documents/search will page to.
+    search_max_results: int = Field(1000, alias="SEARCH_MAX_RESULTS")
+    # Filters matching at most this many documents are pushed down into the vector query.
+    search_filter_pushdown_limit: int = Field(1000, alias="SEARCH_FILTER_PUSHDOWN_LIMIT")
+
+    answer_cache_max_entries: int = Field(4096, alias="ANSWER_CACHE_MAX_ENTRIES")
+    answer_cache_ttl_seconds: int = Field(3600, alias="ANSWER_CACHE_TTL_SECONDS")
+    # Cosine similarity above which a new question reuses a cached answer; set > 1 to disable.
+    answer_cache_similarity_threshold: float = Field(0.95, alias="ANSWER_CACHE_SIMILARITY_THRESHOLD")
+
+    # /documents/compare: chunks whose best counterpart scores below the match threshold
+    # are "only in" their document; matches below the identical threshold are "changed".
+    compare_match_threshold: float = Field(0.75, alias="COMPARE_MATCH_THRESHOLD")
+    compare_identical_threshold: float = Field(0.95, alias="COMPARE_IDENTICAL_THRESHOLD")
+    compare_max_documents: int = Field(10, alias="COMPARE_MAX_DOCUMENTS")
+    # Budget for the differing sections sent to the LLM in one request.
+    compare_max_llm_chars: int = Field(12000, alias="COMPARE_MAX_LLM_CHARS")
+
+    # "concurrent" issues the four enrichment prompts in parallel, "fused" asks for
+    # all insights in one structured (JSON schema) request; both read only the document's
+    # first ENRICHMENT_TEXT_CHARS. "hierarchical" summarizes every section and reduces.
+    enrichment_mode: str = Field("concurrent", alias="ENRICHMENT_MODE")
+    enrichment_max_workers: int = Field(4, alias="ENRICHMENT_MAX_WORKERS")
+    # Hierarchical mode: sections of at most this many (embedding) tokens, at most this many
+    # sections per document (longer documents are sampled evenly), summarized this many at
+    # a time; partial summaries are reduced in rounds until they fit the final prompt.
+    enrichment_section_tokens: int = Field(2048, alias="ENRICHMENT_SECTION_TOKENS")
+    enrichment_max_sections: int = Field(48, alias="ENRICHMENT_MAX_SECTIONS")
+    enrichment_section_concurrency: int = Field(8, alias="ENRICHMENT_SECTION_CONCURRENCY")
+    enrichment_reduce_max_chars: int = Field(16000, alias="ENRICHMENT_REDUCE_MAX_CHARS")
 
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+T = TypeVar("T")
+
+# Observations are one lock and an add, so hot paths record them per batch or per call,
+# never per item. Processes sharing PROMETHEUS_MULTIPROC_DIR (prefork Celery children,
+# several uvicorn workers) each write their own mmap files and ``collect()`` aggregates
+# them; without it the default in-process registry is used.
+NAMESPACE = "doc_insights"
+
+# Seconds: 1 ms to ~10 min, for stages ranging from a vector query to OCR of a long PDF.
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768)
+
+EXTRACTION_SECONDS = Histogram(
+    "extraction_seconds",
+    "Time spent extracting page text from a document, by file type.",
+    ["file_type"],
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+CHUNKING_SECONDS = Histogram(
+    "chunking_seconds",
+    "Time spent splitting a document's pages into chunks.",
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "embedding_batch_seconds",
+    "Time to embed one batch of texts.",
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Number of texts per embedding batch.",
+    namespace=NAMESPACE,
+    buckets=BATCH_SIZE_BUCKETS,
+)
+VECTOR_STORE_SECONDS = Histogram(
+    "vector_store_seconds",
+    "Vector store call latency, by backend and operation.",
+    ["backend", "operation"],
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds",
+    "LLM request latency, by prompt kind and outcome.",
+    ["kind", "outcome"],
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "llm_tokens",
+    "Tokens per LLM request, by prompt kind and direction (input or output).",
+    ["kind", "direction"],
+    namespace=NAMESPACE,
+    buckets=TOKEN_BUCKETS,
+)
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests",
+    "LLM response cache lookups, by prompt kind and result (hit or miss).",
+    ["kind", "result"],
+    namespace=NAMESPACE,
+)
+LLM_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "llm_rate_limit_wait_seconds",
+    "Time an LLM request waited for the shared rate limit and concurrency cap, by priority.",
+    ["priority"],
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+LLM_RETRIES = Counter(
+    "llm_retries",
+    "LLM requests retried, by prompt kind and reason (throttled, server_error, connection).",
+    ["kind", "reason"],
+    namespace=NAMESPACE,
+)
+REINDEXED_CHUNKS = Counter(
+    "reindexed_chunks",
+    "Chunks re-embedded from the chunk store into a new index version.",
+    namespace=NAMESPACE,
+)
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "task_queue_wait_seconds",
+    "Time from publishing a Celery task to a worker starting it.",
+    ["task"],
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    "task_seconds",
+    "Celery task run time, by task and final state (its count is the number of tasks run).",
+    ["task", "state"],
+    namespace=NAMESPACE,
+    buckets=DURATION_BUCKETS,
+)
+
+
+_nested = threading.local()
+
+
+def timed_iter(iterable: Iterable[T], histogram: Histogram) -> Iterator[T]:
+    """Yield from ``iterable``, observing the time spent producing its items.
+
+    Pipeline stages are generators pulling from each other (chunking pulls
+    pages from extraction), so time spent in a nested ``timed_iter`` is
+    subtracted: each stage records only its own work, and nothing the
+    consumer does between items is counted.
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            outer = getattr(_nested, "seconds", 0.0)
+            _nested.seconds = 0.0
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                duration = time.perf_counter() - started
+                elapsed += duration - _nested.seconds
+                _nested.seconds = outer + duration
+            yield item
+    finally:
+        histogram.observe(elapsed)
+
+
+def multiprocess_dir() -> Path | None:
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    return Path(path) if path else None
+
+
+def clear_multiprocess_dir() -> None:
+    """Remove metric files left by a previous run; call once in the parent before forking."""
+    path = multiprocess_dir()
+    if path is None:
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob("*.db"):
+        stale.unlink(missing_ok=True)
+
+
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drop a finished process's live gauges from the multiprocess aggregate."""
+    if multiprocess_dir() is not None:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def registry() -> CollectorRegistry:
+    """The registry to expose: every process's metrics in multiprocess mode, else this process's."""
+    if multiprocess_dir() is None:
+        return REGISTRY
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collected)
+    return collected
+
+
+def collect() -> bytes:
+    return generate_latest(registry())
+
+
+__all__ = [
+    "CHUNKING_SECONDS",
+    "CONTENT_TYPE_LATEST",
+    "EMBEDDING_BATCH_SECONDS",
+    "EMBEDDING_BATCH_SIZE",
+    "EXTRACTION_SECONDS",
+    "LLM_CACHE_REQUESTS",
+    "LLM_RATE_LIMIT_WAIT_SECONDS",
+    "LLM_REQUEST_SECONDS",
+    "LLM_RETRIES",
+    "LLM_TOKENS",
+    "REINDEXED_CHUNKS",
+    "TASK_QUEUE_WAIT_SECONDS",
+    "TASK_SECONDS",
+    "VECTOR_STORE_SECONDS",
+    "clear_multiprocess_dir",
+    "collect",
+    "mark_process_dead",
+    "registry",
+    "timed_iter",
+]
@@ -1,13 +1,23 @@
-from fastapi import FastAPI
+import asyncio
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.middleware import MaxBodySizeMiddleware
 from app.api.routes import documents
 from app.core.config import get_settings
+from app.core.metrics import CONTENT_TYPE_LATEST, collect
 from app.db.session import engine
 from app.models import base  # noqa: F401
 from app.models.document import Document  # noqa: F401
 from app.models.base import Base
+from app.services.concurrency import stage_limiter
+from app.services.llm_client import llm_client
+from app.services.llm_rate_limiter import llm_rate_limiter
+from app.services.registry import loaded, warm_up
 
 settings = get_settings()
 
@@ -21,12 +31,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_upload_paths = ("/documents/upload", "/documents/analyze-image")
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    limits={
+        **{f"{settings.api_v1_prefix}{path}": settings.max_upload_bytes for path in _upload_paths},
+        f"{settings.api_v1_prefix}/documents/batch": settings.max_batch_upload_bytes,
+    },
+)
+
+
+async def _warm_up() -> None:
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception as exc:
+        logger.exception("Service warm-up failed, services will be built on first use: {}", exc)
+
+
+def _add_missing_columns(connection) -> None:
+    """Add columns introduced since an existing table was created (``create_all`` leaves its tables as they are)."""
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(
+                    f"Table {table.name} lacks the required column {column.name}; migrate or recreate the database"
+                )
+            column_type = column.type.compile(dialect=connection.dialect)
+            table_name, column_name = preparer.format_table(table), preparer.quote(column.name)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+            logger.info("Added column {}.{} to the existing database", table.name, column.name)
+
+
+def _create_schema(connection) -> None:
+    Base.metadata.create_all(connection)
+    # create_all skips new columns and indexes of tables that already exist; add any introduced since.
+    _add_missing_columns(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Create database tables on startup."""
+    """Create or upgrade database tables and indexes on startup and start warming up services in the background."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_schema)
+    if settings.api_warm_up:
+        app.state.warm_up = asyncio.create_task(_warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled LLM and Redis connections and the blocking-call pool, if they were ever built."""
+    if loaded("llm_client"):
+        await llm_client.aclose()
+    if loaded("llm_rate_limiter"):
+        await llm_rate_limiter.aclose()
+    if loaded("stage_limiter"):
+        stage_limiter.shutdown()
 
 
 @app.get("/health", tags=["system"])
@@ -34,6 +101,12 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", tags=["system"], include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus metrics (every uvicorn worker's when ``PROMETHEUS_MULTIPROC_DIR`` is set)."""
+    return Response(collect(), media_type=CONTENT_TYPE_LATEST)
+
+
 app.include_router(documents.router, prefix=settings.api_v1_prefix)
 
 
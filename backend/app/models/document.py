@@ -2,7 +2,7 @@ import enum
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Enum, JSON, String
+from sqlalchemy import Enum, Index, JSON, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import Base
@@ -16,11 +16,20 @@ class DocumentStatus(str, enum.Enum):
 
 
 class Document(Base):
+    # Keyset pagination of the document list, newest first, optionally filtered by status or category.
+    __table_args__ = (
+        Index("ix_document_created_at_id", "created_at", "id"),
+        Index("ix_document_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_document_category_created_at_id", "category", "created_at", "id"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     filename: Mapped[str] = mapped_column(String(255))
     content_type: Mapped[str] = mapped_column(String(128))
     size_bytes: Mapped[int]
     storage_path: Mapped[str] = mapped_column(String(512))
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    batch_id: Mapped[Optional[str]] = mapped_column(String(36), index=True)
     document_metadata: Mapped[dict] = mapped_column(JSON, default=dict)
     status: Mapped[DocumentStatus] = mapped_column(Enum(DocumentStatus), default=DocumentStatus.RECEIVED)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
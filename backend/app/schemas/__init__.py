@@ -1,5 +1,12 @@
-from app.schemas.document import DocumentCreate, DocumentRead, DocumentUpdate
-
-__all__ = ["DocumentCreate", "DocumentRead", "DocumentUpdate"]
-
+from app.schemas.document import BatchProgress, BatchUploadRead, DocumentCreate, DocumentRead, DocumentUpdate
+from app.schemas.search import SearchHit, SearchResponse
 
+__all__ = [
+    "BatchProgress",
+    "BatchUploadRead",
+    "DocumentCreate",
+    "DocumentRead",
+    "DocumentUpdate",
+    "SearchHit",
+    "SearchResponse",
+]
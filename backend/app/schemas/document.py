@@ -27,6 +27,8 @@ class DocumentRead(BaseModel):
     content_type: str
     size_bytes: int
     storage_path: str
+    content_hash: Optional[str] = None
+    batch_id: Optional[str] = None
     document_metadata: dict | None = None
     status: DocumentStatus
     created_at: datetime
@@ -43,3 +45,69 @@ class DocumentRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class DocumentSummary(BaseModel):
+    """List view of a document: only columns the list shows, never insights or key points."""
+
+    id: int
+    filename: str
+    content_type: str
+    size_bytes: int
+    status: DocumentStatus
+    category: Optional[str] = None
+    sentiment: Optional[str] = None
+    batch_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class DocumentPage(BaseModel):
+    items: list[DocumentSummary]
+    # Pass as ``cursor`` to get the next page; ``None`` on the last page.
+    next_cursor: Optional[str] = None
+    # Only when requested; may lag new uploads by the count cache TTL.
+    total: Optional[int] = None
+
+
+class DocumentText(BaseModel):
+    """A character range of a document's extracted text: a requested range, a page or a chunk."""
+
+    document_id: int
+    start: int
+    end: int
+    # Characters in the whole document.
+    text_length: int
+    page: Optional[int] = None
+    page_end: Optional[int] = None
+    chunk_index: Optional[int] = None
+    text: str
+
+
+class DocumentTable(BaseModel):
+    document_id: int
+    index: int
+    headers: list[str]
+    row_count: int
+    offset: int
+    rows: list[list[str]]
+
+
+class BatchUploadRead(BaseModel):
+    batch_id: str
+    document_count: int
+    documents: list[DocumentRead]
+
+
+class BatchProgress(BaseModel):
+    batch_id: str
+    total: int
+    received: int
+    processing: int
+    completed: int
+    failed: int
+    finished: bool
+    progress: float
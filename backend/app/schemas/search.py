@@ -0,0 +1,24 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    document_id: int
+    filename: str
+    category: Optional[str]
+    sentiment: Optional[str]
+    chunk_index: int
+    page: Optional[int] = None
+    snippet: str
+    score: float
+    keyword_rank: Optional[int] = None
+    vector_rank: Optional[int] = None
+
+
+class SearchResponse(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    has_more: bool
+    results: list[SearchHit]
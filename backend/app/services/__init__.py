@@ -1,19 +1,83 @@
+from app.services.answer_cache import AnswerCache, answer_cache
+from app.services.artifact_cache import ArtifactCache, artifact_cache
+from app.services.artifact_store import ArtifactStore, artifact_store
+from app.services.chunk_store import ChunkStore, IndexVersion, chunk_store
+from app.services.comparison import DocumentComparator, document_comparator
+from app.services.concurrency import StageLimiter, stage_limiter
+from app.services.document_list import DocumentCounts, document_counts
 from app.services.document_processor import DocumentProcessor
+from app.services.embedding_batcher import EmbeddingBatcher, embedding_batcher
 from app.services.embeddings import EmbeddingService, embedding_service
+from app.services.enrichment import EnrichmentService, enrichment_service
+from app.services.llm_cache import LLMResponseCache, llm_cache
 from app.services.llm_client import LLMClient, llm_client
-from app.services.vector_store import VectorStore, vector_store
+from app.services.llm_rate_limiter import LLMRateLimiter, llm_rate_limiter
+from app.services.ocr import OcrEngine, ocr_engine
+from app.services.vector_store import (
+    ChromaVectorStore,
+    IndexHandle,
+    NumpyVectorStore,
+    VectorStore,
+    VersionedVectorStore,
+    create_vector_store,
+    vector_store,
+)
 from app.services.rag import RagService, rag_service
+from app.services.reindex import Reindexer, reindexer
+from app.services.registry import LazyService, lazy, loaded, warm_up
+from app.services.search import HybridSearchService, search_service
+from app.services.search_index import SearchIndex, search_index
 
 __all__ = [
+    "AnswerCache",
+    "answer_cache",
+    "ArtifactCache",
+    "artifact_cache",
+    "ArtifactStore",
+    "artifact_store",
+    "ChunkStore",
+    "IndexVersion",
+    "chunk_store",
+    "DocumentComparator",
+    "document_comparator",
+    "StageLimiter",
+    "stage_limiter",
+    "DocumentCounts",
+    "document_counts",
     "DocumentProcessor",
+    "EmbeddingBatcher",
+    "embedding_batcher",
     "EmbeddingService",
     "embedding_service",
+    "EnrichmentService",
+    "enrichment_service",
+    "LLMResponseCache",
+    "llm_cache",
     "LLMClient",
     "llm_client",
+    "LLMRateLimiter",
+    "llm_rate_limiter",
+    "OcrEngine",
+    "ocr_engine",
     "VectorStore",
+    "ChromaVectorStore",
+    "IndexHandle",
+    "NumpyVectorStore",
+    "VersionedVectorStore",
+    "create_vector_store",
     "vector_store",
     "RagService",
     "rag_service",
+    "Reindexer",
+    "reindexer",
+    "LazyService",
+    "lazy",
+    "loaded",
+    "warm_up",
+    "HybridSearchService",
+    "search_service",
+    "SearchIndex",
+    "search_index",
 ]
 
 
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.registry import lazy
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    return _WHITESPACE.sub(" ", _NON_WORD.sub("", question.lower())).strip()
+
+
+@dataclass
+class _Entry:
+    embedding: np.ndarray
+    answer: dict[str, Any]
+    expires_at: float
+
+
+@dataclass
+class _DocumentAnswers:
+    version: str | None
+    entries: dict[str, _Entry] = field(default_factory=dict)
+    _matrix: tuple[list[str], np.ndarray] | None = None
+
+    def matrix(self) -> tuple[list[str], np.ndarray]:
+        if self._matrix is None:
+            keys = list(self.entries)
+            self._matrix = (keys, np.stack([self.entries[key].embedding for key in keys]))
+        return self._matrix
+
+    def pop(self, key: str) -> None:
+        if self.entries.pop(key, None) is not None:
+            self._matrix = None
+
+    def add(self, key: str, entry: _Entry) -> None:
+        self.entries[key] = entry
+        self._matrix = None
+
+
+class AnswerCache:
+    """Per-document cache of RAG answers with exact and near-duplicate lookup.
+
+    Questions are matched first on their normalized text and then, given the
+    question embedding, on cosine similarity against the document's cached
+    questions. Entries expire after a TTL and are evicted LRU beyond a global
+    size cap. Each document's entries are tagged with a version (the document's
+    ``updated_at``); a lookup with a different version drops them, so
+    reprocessing a document invalidates its answers even across processes.
+    """
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.max_entries = settings.answer_cache_max_entries
+        self.ttl = settings.answer_cache_ttl_seconds
+        self.threshold = settings.answer_cache_similarity_threshold
+        self._documents: dict[int, _DocumentAnswers] = {}
+        self._lru: OrderedDict[tuple[int, str], None] = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _answers(self, document_id: int, version: str | None) -> _DocumentAnswers:
+        answers = self._documents.get(document_id)
+        if answers is None or answers.version != version:
+            if answers is not None:
+                self._drop_document(document_id)
+            answers = self._documents[document_id] = _DocumentAnswers(version)
+        return answers
+
+    def _drop_document(self, document_id: int) -> None:
+        answers = self._documents.pop(document_id, None)
+        if answers is not None:
+            for key in answers.entries:
+                self._lru.pop((document_id, key), None)
+
+    def _hit(self, document_id: int, key: str, entry: _Entry) -> dict[str, Any]:
+        self._lru.move_to_end((document_id, key))
+        return entry.answer
+
+    def get(self, document_id: int, version: str | None, question: str) -> dict[str, Any] | None:
+        """Exact lookup on the normalized question; does not count a miss."""
+        key = normalize_question(question)
+        with self._lock:
+            answers = self._answers(document_id, version)
+            entry = answers.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                answers.pop(key)
+                self._lru.pop((document_id, key), None)
+                return None
+            self.exact_hits += 1
+            return self._hit(document_id, key, entry)
+
+    def get_similar(
+        self,
+        document_id: int,
+        version: str | None,
+        embedding: np.ndarray,
+    ) -> dict[str, Any] | None:
+        """Near-duplicate lookup by question embedding; counts a miss when nothing matches."""
+        with self._lock:
+            answers = self._answers(document_id, version)
+            if answers.entries:
+                keys, matrix = answers.matrix()
+                scores = matrix @ np.asarray(embedding, dtype=np.float32)
+                best = int(np.argmax(scores))
+                entry = answers.entries[keys[best]]
+                if scores[best] >= self.threshold and entry.expires_at >= time.monotonic():
+                    self.semantic_hits += 1
+                    return self._hit(document_id, keys[best], entry)
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        document_id: int,
+        version: str | None,
+        question: str,
+        embedding: np.ndarray,
+        answer: dict[str, Any],
+    ) -> None:
+        key = normalize_question(question)
+        entry = _Entry(np.asarray(embedding, dtype=np.float32), answer, time.monotonic() + self.ttl)
+        with self._lock:
+            self._answers(document_id, version).add(key, entry)
+            self._lru[(document_id, key)] = None
+            self._lru.move_to_end((document_id, key))
+            while len(self._lru) > self.max_entries:
+                (evicted_document, evicted_key), _ = self._lru.popitem(last=False)
+                evicted = self._documents.get(evicted_document)
+                if evicted is not None:
+                    evicted.pop(evicted_key)
+                    if not evicted.entries:
+                        del self._documents[evicted_document]
+
+    def invalidate(self, document_id: int) -> None:
+        with self._lock:
+            self._drop_document(document_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "documents": len(self._documents),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+
+answer_cache = lazy("answer_cache", AnswerCache)
+
+__all__ = ["AnswerCache", "answer_cache", "normalize_question"]
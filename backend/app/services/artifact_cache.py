@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import get_settings
+from app.services.artifact_store import artifact_store
+from app.services.llm_client import PROMPT_VERSION
+from app.services.quantization import QuantizedVectors, dequantize, quantize
+from app.services.registry import lazy
+
+# Bump when the on-disk layout below changes.
+CACHE_FORMAT = "4"
+
+
+@dataclass
+class CachedArtifacts:
+    path: Path
+    content_hash: str
+    insights: dict[str, Any]
+    chunk_count: int
+    dimension: int
+    dtype: str
+    embedding_model: str
+
+    def read_text(self, limit: int | None = None) -> str:
+        return artifact_store.read_text(self.content_hash, 0, limit) or ""
+
+    def iter_batches(self, batch_size: int) -> Iterator[tuple[list[dict[str, Any]], np.ndarray]]:
+        """Yield ``(chunk records, float32 embeddings)`` without loading the whole entry.
+
+        Chunk texts are sliced out of the artifact store's text by their ``char_start``/``char_end``.
+        """
+        reader = artifact_store.reader(self.content_hash)
+        data = np.memmap(self.path / "embeddings.bin", dtype=self.dtype, mode="r").reshape(-1, self.dimension)
+        scales_path = self.path / "scales.f32"
+        scales = np.memmap(scales_path, dtype=np.float32, mode="r") if scales_path.exists() else None
+
+        def rows(start: int, stop: int) -> np.ndarray:
+            return dequantize(QuantizedVectors(data[start:stop], scales[start:stop] if scales is not None else None))
+
+        with (self.path / "chunks.jsonl").open(encoding="utf-8") as fh:
+            start = 0
+            records: list[dict[str, Any]] = []
+            for line in fh:
+                record = json.loads(line)
+                has_span = "char_start" in record
+                record["text"] = reader.read(record["char_start"], record["char_end"]) if has_span else ""
+                records.append(record)
+                if len(records) == batch_size:
+                    yield records, rows(start, start + batch_size)
+                    start += batch_size
+                    records = []
+            if records:
+                yield records, rows(start, start + len(records))
+
+
+class ArtifactWriter:
+    """Incrementally writes one cache entry; nothing is visible until ``commit``.
+
+    A writer can span processes: ``detach`` closes its files and returns the
+    state ``ArtifactCache.reattach`` needs to commit or abort it elsewhere.
+    """
+
+    def __init__(self, cache: ArtifactCache, content_hash: str, embedding_model: str) -> None:
+        self.content_hash = content_hash
+        self.embedding_model = embedding_model
+        self.dtype = cache.storage_dtype
+        self.entry = cache._entry_dir(content_hash)
+        self.entry.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = self.entry.parent / f".{cache.variant}.{uuid.uuid4().hex}.tmp"
+        self.tmp.mkdir()
+        self._chunks = (self.tmp / "chunks.jsonl").open("w", encoding="utf-8")
+        self._embeddings = (self.tmp / "embeddings.bin").open("wb")
+        self._scales = (self.tmp / "scales.f32").open("wb") if self.dtype == "int8" else None
+        self.chunk_count = 0
+        self.dimension = 0
+
+    def add_chunks(
+        self,
+        chunks: Sequence[str],
+        embeddings: np.ndarray,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+    ) -> None:
+        if embeddings.size:
+            self.dimension = embeddings.shape[1]
+        # Only metadata: texts are rebuilt from the artifact store by their character spans.
+        for idx in range(len(chunks)):
+            self._chunks.write(json.dumps(metadatas[idx] if metadatas else {}) + "\n")
+        stored = quantize(embeddings, self.dtype)
+        self._embeddings.write(stored.data.tobytes())
+        if self._scales is not None and stored.scales is not None:
+            self._scales.write(stored.scales.tobytes())
+        self.chunk_count += len(chunks)
+
+    def _close(self) -> None:
+        for fh in (self._chunks, self._embeddings, self._scales):
+            if fh is not None:
+                fh.close()
+
+    def detach(self) -> dict[str, Any]:
+        self._close()
+        return {
+            "tmp": str(self.tmp),
+            "chunk_count": self.chunk_count,
+            "dimension": self.dimension,
+            "embedding_model": self.embedding_model,
+        }
+
+    def commit(self, insights: dict[str, Any]) -> None:
+        self._close()
+        if not self.tmp.is_dir():
+            logger.warning("Staged artifact cache entry for {} is gone; not caching it", self.content_hash[:12])
+            return
+        stored = artifact_store.manifest(self.content_hash)
+        if stored is None:
+            logger.warning("No stored text for {}; not caching its artifacts", self.content_hash[:12])
+            self.abort()
+            return
+        try:
+            (self.tmp / "insights.json").write_text(json.dumps(insights), "utf-8")
+            (self.tmp / "manifest.json").write_text(
+                json.dumps(
+                    {
+                        "content_hash": self.content_hash,
+                        "chunk_count": self.chunk_count,
+                        "dimension": self.dimension,
+                        "dtype": self.dtype,
+                        "embedding_model": self.embedding_model,
+                        "text_sha256": stored.text_sha256,
+                        "created_at": time.time(),
+                    }
+                ),
+                "utf-8",
+            )
+            self.tmp.rename(self.entry)
+        except OSError:
+            # Another worker won the race (or the disk failed); either way drop our copy.
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            if not (self.entry / "manifest.json").exists():
+                raise
+
+    def abort(self) -> None:
+        self._close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class ArtifactCache:
+    """Processing artifacts keyed by upload SHA-256, embedding model and prompt version.
+
+    Layout: ``<root>/<content_hash>/<variant>/`` where the variant folds in the
+    embedding model, chunking parameters, LLM model, enrichment mode (with its
+    section and reduce limits) and prompt version. Embeddings are those of the
+    index version active when the entry was written (its manifest names the
+    model); chunk texts are replayed with them as long as that model is still
+    active and re-embedded otherwise. Entries are written to a temporary
+    directory and renamed into place, so concurrent workers processing the same
+    bytes never observe a partial entry. The extracted text lives once in the
+    artifact store; entries hold chunk metadata (whose character spans rebuild
+    the chunk texts), embeddings and insights.
+    """
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.root = settings.artifact_cache_path
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.storage_dtype = settings.embedding_storage_dtype
+        self.embedding_model = settings.embedding_model
+        fingerprint = "|".join(
+            str(part)
+            for part in (
+                settings.embedding_model,
+                settings.chunk_max_tokens,
+                settings.chunk_overlap_tokens,
+                settings.llm_model,
+                settings.enrichment_mode,
+                settings.enrichment_section_tokens,
+                settings.enrichment_max_sections,
+                settings.enrichment_reduce_max_chars,
+                PROMPT_VERSION,
+                CACHE_FORMAT,
+            )
+        )
+        self.variant = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+    def _entry_dir(self, content_hash: str) -> Path:
+        return self.root / content_hash / self.variant
+
+    def load(self, content_hash: str) -> CachedArtifacts | None:
+        entry = self._entry_dir(content_hash)
+        if not (entry / "manifest.json").exists():
+            return None
+        try:
+            manifest = json.loads((entry / "manifest.json").read_text("utf-8"))
+            stored = artifact_store.manifest(content_hash)
+            if stored is None or stored.text_sha256 != manifest["text_sha256"]:
+                # The chunk spans index text that is gone or was re-extracted differently.
+                raise ValueError("its text is no longer in the artifact store")
+            # Both entries are being reused; refresh them so garbage collection spares them.
+            os.utime(entry.parent)
+            artifact_store.touch(content_hash)
+            return CachedArtifacts(
+                path=entry,
+                content_hash=content_hash,
+                insights=json.loads((entry / "insights.json").read_text("utf-8")),
+                chunk_count=manifest["chunk_count"],
+                dimension=manifest["dimension"],
+                dtype=manifest["dtype"],
+                # Entries from before versioned indexes were embedded with the model in the variant.
+                embedding_model=manifest.get("embedding_model", self.embedding_model),
+            )
+        except Exception as exc:
+            logger.warning("Discarding unreadable artifact cache entry {}: {}", entry, exc)
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+    def writer(self, content_hash: str, embedding_model: str | None = None) -> ArtifactWriter:
+        """Writer for a new entry whose embeddings come from ``embedding_model`` (the configured one by default)."""
+        return ArtifactWriter(self, content_hash, embedding_model or self.embedding_model)
+
+    def reattach(self, content_hash: str, detached: dict[str, Any]) -> ArtifactWriter | None:
+        """Writer for an entry another stage wrote and ``detach``-ed; only ``commit``/``abort`` apply.
+
+        ``None`` if its temporary directory is gone, so the result is simply not cached.
+        """
+        if not Path(detached["tmp"]).is_dir():
+            logger.warning("Staged artifact cache entry for {} is gone; not caching it", content_hash[:12])
+            return None
+        writer = ArtifactWriter.__new__(ArtifactWriter)
+        writer.content_hash = content_hash
+        writer.embedding_model = detached.get("embedding_model", self.embedding_model)
+        writer.dtype = self.storage_dtype
+        writer.entry = self._entry_dir(content_hash)
+        writer.tmp = Path(detached["tmp"])
+        writer._chunks = writer._embeddings = writer._scales = None
+        writer.chunk_count = detached["chunk_count"]
+        writer.dimension = detached["dimension"]
+        return writer
+
+    def collect_garbage(
+        self, referenced_hashes: Iterable[str], min_age_seconds: int, staged_max_age_seconds: int | None = None
+    ) -> int:
+        """Evict entries whose content hash no ``Document`` references, plus stale variants.
+
+        Unfinished entries (writer temporary directories) may be waiting for a
+        queued enrich stage to commit them, so they are only removed once older
+        than ``staged_max_age_seconds``, the age limit of stage workspaces.
+        Returns the number of directories removed.
+        """
+        referenced = set(referenced_hashes)
+        now = time.time()
+        cutoff = now - min_age_seconds
+        if staged_max_age_seconds is None:
+            staged_max_age_seconds = get_settings().stage_workspace_max_age_seconds
+        staged_cutoff = now - max(min_age_seconds, staged_max_age_seconds)
+        removed = 0
+        for hash_dir in self.root.iterdir():
+            if not hash_dir.is_dir():
+                continue
+            if hash_dir.name not in referenced:
+                if hash_dir.stat().st_mtime <= cutoff:
+                    shutil.rmtree(hash_dir, ignore_errors=True)
+                    removed += 1
+                continue
+            for variant_dir in hash_dir.iterdir():
+                staged = variant_dir.name.startswith(".") and variant_dir.name.endswith(".tmp")
+                if variant_dir.name != self.variant and variant_dir.stat().st_mtime <= (
+                    staged_cutoff if staged else cutoff
+                ):
+                    shutil.rmtree(variant_dir, ignore_errors=True)
+                    removed += 1
+        if removed:
+            logger.info("Artifact cache GC removed {} entr(ies)", removed)
+        return removed
+
+
+artifact_cache = lazy("artifact_cache", ArtifactCache)
+
+__all__ = ["ArtifactCache", "ArtifactWriter", "CachedArtifacts", "artifact_cache"]
@@ -0,0 +1,583 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+import zstandard
+from loguru import logger
+
+from app.core.config import get_settings
+from app.services.chunking import Chunk
+from app.services.registry import lazy
+
+# Bump when the layout below changes; entries in another format are rewritten on next processing.
+ARTIFACT_FORMAT = 1
+
+# Parsed manifests and chunk maps kept per process; entries are immutable once written.
+_CACHED_OBJECTS = 256
+
+
+class ArtifactBackend(ABC):
+    """Immutable objects under ``<content_hash>/<name>`` keys, readable by byte range."""
+
+    backend: str
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    def put_file(self, key: str, path: Path) -> None:
+        """Store the file at ``path`` under ``key``, consuming the file."""
+
+    @abstractmethod
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        """Bytes ``[start, end)`` of the object (to its end if ``end`` is None); ``KeyError`` if it is missing."""
+
+    @abstractmethod
+    def entries(self) -> Iterator[tuple[str, float]]:
+        """``(content_hash, last modified)`` of every stored entry."""
+
+    @abstractmethod
+    def delete_entry(self, content_hash: str) -> None: ...
+
+    @abstractmethod
+    def touch(self, content_hash: str) -> None:
+        """Mark the entry as just used, so garbage collection treats it as new."""
+
+
+class LocalArtifactBackend(ArtifactBackend):
+    backend = "local"
+
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = root or get_settings().artifact_store_path
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _place(self, key: str, write: Callable[[Path], Any]) -> None:
+        # Written beside the destination and renamed into place, so readers never see a partial object.
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def put(self, key: str, data: bytes) -> None:
+        self._place(key, lambda tmp: tmp.write_bytes(data))
+
+    def put_file(self, key: str, path: Path) -> None:
+        self._place(key, lambda tmp: shutil.move(path, tmp))
+
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        try:
+            with (self.root / key).open("rb") as fh:
+                fh.seek(start)
+                return fh.read(-1 if end is None else end - start)
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def entries(self) -> Iterator[tuple[str, float]]:
+        for entry in self.root.iterdir():
+            if entry.is_dir() and not entry.name.startswith("."):
+                yield entry.name, entry.stat().st_mtime
+
+    def delete_entry(self, content_hash: str) -> None:
+        shutil.rmtree(self.root / content_hash, ignore_errors=True)
+
+    def touch(self, content_hash: str) -> None:
+        try:
+            os.utime(self.root / content_hash)
+        except FileNotFoundError:
+            pass
+
+
+class S3ArtifactBackend(ArtifactBackend):
+    """Objects in an S3 bucket (or any S3-compatible store via ``ARTIFACT_STORE_S3_ENDPOINT_URL``)."""
+
+    backend = "s3"
+
+    def __init__(self, bucket: str | None = None, prefix: str | None = None) -> None:
+        # Imported here so the local backend (and API cold start) never pays for boto3.
+        import boto3
+
+        settings = get_settings()
+        self.bucket = bucket or settings.artifact_store_s3_bucket
+        if not self.bucket:
+            raise ValueError("ARTIFACT_STORE_S3_BUCKET must be set for the s3 artifact store backend")
+        self.prefix = settings.artifact_store_s3_prefix if prefix is None else prefix
+        self.client = boto3.client("s3", endpoint_url=settings.artifact_store_s3_endpoint_url)
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def put_file(self, key: str, path: Path) -> None:
+        try:
+            # Multipart for large files, without reading them into memory.
+            self.client.upload_file(str(path), self.bucket, self.prefix + key)
+        finally:
+            path.unlink(missing_ok=True)
+
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        extra = {}
+        if start or end is not None:
+            extra["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key, **extra)
+        except self.client.exceptions.NoSuchKey:
+            raise KeyError(key) from None
+        return response["Body"].read()
+
+    def _objects(self, prefix: str) -> Iterator[dict[str, Any]]:
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+            yield from page.get("Contents", [])
+
+    def entries(self) -> Iterator[tuple[str, float]]:
+        latest: dict[str, float] = {}
+        for obj in self._objects(self.prefix):
+            content_hash = obj["Key"][len(self.prefix) :].split("/", 1)[0]
+            latest[content_hash] = max(latest.get(content_hash, 0.0), obj["LastModified"].timestamp())
+        yield from latest.items()
+
+    def delete_entry(self, content_hash: str) -> None:
+        keys = [{"Key": obj["Key"]} for obj in self._objects(f"{self.prefix}{content_hash}/")]
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": keys[start : start + 1000]})
+
+    def touch(self, content_hash: str) -> None:
+        # Objects cannot be touched in place; copying the manifest onto itself renews its LastModified.
+        key = f"{self.prefix}{content_hash}/manifest.json"
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE",
+            )
+        except self.client.exceptions.NoSuchKey:
+            pass
+
+
+ARTIFACT_BACKENDS: dict[str, type[ArtifactBackend]] = {"local": LocalArtifactBackend, "s3": S3ArtifactBackend}
+
+
+def create_artifact_backend(backend: str | None = None) -> ArtifactBackend:
+    backend = backend or get_settings().artifact_store_backend
+    if backend not in ARTIFACT_BACKENDS:
+        raise ValueError(f"Unknown artifact store backend {backend!r}; expected one of {sorted(ARTIFACT_BACKENDS)}")
+    return ARTIFACT_BACKENDS[backend]()
+
+
+def chunking_key() -> str:
+    """Fingerprint of the settings chunk boundaries depend on; chunk maps are stored per fingerprint."""
+    settings = get_settings()
+    fingerprint = f"{settings.embedding_model}|{settings.chunk_max_tokens}|{settings.chunk_overlap_tokens}"
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+@dataclass
+class StoredTable:
+    headers: list[str]
+    row_count: int
+    width: int
+    row_groups: list[tuple[int, int, int]]  # (byte offset in tables.zst, byte length, rows)
+
+
+@dataclass
+class ArtifactManifest:
+    content_hash: str
+    text_sha256: str
+    text_chars: int
+    frame_chars: int
+    frames: list[int]  # byte offset of each text frame in text.zst, then the end offset
+    pages: list[tuple[int, int, int]]  # (page number, start, end) character spans
+    tables: list[StoredTable]
+
+    def page_spans(self, page: int) -> list[tuple[int, int]]:
+        return [(start, end) for number, start, end in self.pages if number == page]
+
+
+@dataclass
+class ChunkSpan:
+    """Where chunk ``index`` lies in the document text; its text is ``text[start:end]``."""
+
+    index: int
+    start: int
+    end: int
+    page: int
+    page_end: int
+
+
+class TextReader:
+    """Character ranges of one entry's text, fetching and decompressing only the frames they cover.
+
+    The frames of the last read are kept, so reading chunks in order decompresses each
+    frame about once even though overlapping chunks share text.
+    """
+
+    def __init__(self, backend: ArtifactBackend, manifest: ArtifactManifest) -> None:
+        self.backend = backend
+        self.manifest = manifest
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._start = 0  # character offset of ``_text``
+        self._text = ""
+
+    def read(self, start: int = 0, end: int | None = None) -> str:
+        manifest = self.manifest
+        start = max(start, 0)
+        end = manifest.text_chars if end is None else min(end, manifest.text_chars)
+        if start >= end:
+            return ""
+        if not (self._start <= start and end <= self._start + len(self._text)):
+            first, last = start // manifest.frame_chars, (end - 1) // manifest.frame_chars
+            offsets = manifest.frames[first : last + 2]
+            data = self.backend.get(f"{manifest.content_hash}/text.zst", offsets[0], offsets[-1])
+            base = offsets[0]
+            self._text = "".join(
+                self._decompressor.decompress(data[frame_start - base : frame_end - base]).decode("utf-8")
+                for frame_start, frame_end in zip(offsets, offsets[1:])
+            )
+            self._start = first * manifest.frame_chars
+        return self._text[start - self._start : end - self._start]
+
+
+class ArtifactStoreWriter:
+    """Streams one document's pages, chunk spans and tables into the store; nothing is visible until ``commit``.
+
+    Pages are compressed frame by frame into a local spool file as they arrive, so
+    at most one frame of text is held. If the store already has this text (the same
+    upload processed again) ``commit`` only adds a missing chunk map.
+    """
+
+    def __init__(self, store: ArtifactStore, content_hash: str) -> None:
+        self.store = store
+        self.content_hash = content_hash
+        self.frame_chars = store.frame_chars
+        self._compressor = zstandard.ZstdCompressor(level=store.level)
+        self.spool = Path(tempfile.mkdtemp(prefix=f"{content_hash[:16]}-", dir=store.scratch))
+        self._text = (self.spool / "text.zst").open("wb")
+        self._digest = hashlib.sha256()
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self.text_chars = 0
+        self.frames = [0]
+        self.pages: list[list[int]] = []
+        self.chunks: dict[str, list[int]] = {"start": [], "end": [], "page": [], "page_end": []}
+        self.tables: list[dict[str, Any]] = []
+
+    def add_page(self, page_number: int, text: str) -> None:
+        if not text:
+            return
+        start, self.text_chars = self.text_chars, self.text_chars + len(text)
+        if self.pages and self.pages[-1][0] == page_number and self.pages[-1][2] == start:
+            self.pages[-1][2] = self.text_chars
+        else:
+            self.pages.append([page_number, start, self.text_chars])
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if self._pending_chars >= self.frame_chars:
+            buffer = "".join(self._pending)
+            full = len(buffer) - len(buffer) % self.frame_chars
+            for pos in range(0, full, self.frame_chars):
+                self._write_frame(buffer[pos : pos + self.frame_chars])
+            self._pending = [buffer[full:]]
+            self._pending_chars = len(buffer) - full
+
+    def _write_frame(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self._digest.update(data)
+        frame = self._compressor.compress(data)
+        self._text.write(frame)
+        self.frames.append(self.frames[-1] + len(frame))
+
+    def add_chunks(self, chunks: Sequence[Chunk]) -> None:
+        """Record where the chunks lie in the text (chunks without a span are empty)."""
+        for chunk in chunks:
+            self.chunks["start"].append(chunk.char_start or 0)
+            self.chunks["end"].append(chunk.char_end or 0)
+            self.chunks["page"].append(chunk.page)
+            self.chunks["page_end"].append(chunk.page_end or chunk.page)
+
+    def add_tables(self, tables: Iterable[dict[str, Any]]) -> None:
+        self.tables.extend(tables)
+
+    def _write_tables(self) -> list[dict[str, Any]]:
+        """Write the tables column by column, one frame per row group; returns their manifest records."""
+        records = []
+        offset = 0
+        group_rows = self.store.row_group_rows
+        with (self.spool / "tables.zst").open("wb") as fh:
+            for table in self.tables:
+                headers, rows = table["headers"], table["rows"]
+                # Extracted rows can be ragged; short rows are padded with nulls, dropped again on read.
+                width = max([len(headers), *(len(row) for row in rows)])
+                row_groups = []
+                for pos in range(0, len(rows), group_rows):
+                    group = rows[pos : pos + group_rows]
+                    columns = [[row[col] if col < len(row) else None for row in group] for col in range(width)]
+                    frame = self._compressor.compress(json.dumps(columns, separators=(",", ":")).encode())
+                    fh.write(frame)
+                    row_groups.append([offset, len(frame), len(group)])
+                    offset += len(frame)
+                records.append({"headers": headers, "row_count": len(rows), "width": width, "row_groups": row_groups})
+        return records
+
+    def _close(self) -> None:
+        if not self._text.closed:
+            if self._pending_chars:
+                self._write_frame("".join(self._pending))
+                self._pending, self._pending_chars = [], 0
+            self._text.close()
+
+    def commit(self) -> ArtifactManifest:
+        self._close()
+        store, content_hash = self.store, self.content_hash
+        chunk_map = f"{content_hash}/chunks-{chunking_key()}.zst"
+        try:
+            manifest = store.manifest(content_hash)
+            text_sha256 = self._digest.hexdigest()
+            if manifest is not None and manifest.text_sha256 == text_sha256:
+                if store.chunk_spans(content_hash) is None:
+                    store.backend.put(chunk_map, self._compressed_chunks())
+                store.touch(content_hash)
+                return manifest
+            if manifest is not None:
+                logger.warning("Extracted text of {} changed; rewriting its artifacts", content_hash[:12])
+                store.delete(content_hash)
+            tables = self._write_tables()
+            store.backend.put_file(f"{content_hash}/text.zst", self.spool / "text.zst")
+            store.backend.put_file(f"{content_hash}/tables.zst", self.spool / "tables.zst")
+            store.backend.put(chunk_map, self._compressed_chunks())
+            record = {
+                "format": ARTIFACT_FORMAT,
+                "content_hash": content_hash,
+                "text_sha256": text_sha256,
+                "text_chars": self.text_chars,
+                "frame_chars": self.frame_chars,
+                "frames": self.frames,
+                "pages": self.pages,
+                "tables": tables,
+                "created_at": time.time(),
+            }
+            # The manifest goes last: an entry exists once its manifest does.
+            store.backend.put(f"{content_hash}/manifest.json", json.dumps(record, separators=(",", ":")).encode())
+            return store.manifest(content_hash)  # type: ignore[return-value]
+        finally:
+            shutil.rmtree(self.spool, ignore_errors=True)
+
+    def _compressed_chunks(self) -> bytes:
+        return self._compressor.compress(json.dumps(self.chunks, separators=(",", ":")).encode())
+
+    def abort(self) -> None:
+        self._text.close()
+        shutil.rmtree(self.spool, ignore_errors=True)
+
+
+class ArtifactStore:
+    """Extracted text, chunk offset maps and tables per upload, compressed and content-addressed.
+
+    An entry ``<content_hash>/`` holds ``text.zst`` (the concatenated page text as
+    independent zstd frames of ``frame_chars`` characters), ``tables.zst`` (each
+    table column-wise, one frame per row group), one ``chunks-<fingerprint>.zst``
+    per chunking configuration (chunk character spans; texts are sliced from the
+    text, so overlaps are not stored twice) and ``manifest.json`` with the frame
+    offsets, page spans and table index. Any page, chunk or run of rows is read
+    with one ranged request and decompresses only the frames it covers.
+    """
+
+    def __init__(self, backend: ArtifactBackend | None = None) -> None:
+        settings = get_settings()
+        self.backend = backend or create_artifact_backend()
+        self.scratch = settings.artifact_store_path / ".tmp"
+        self.scratch.mkdir(parents=True, exist_ok=True)
+        self.frame_chars = settings.artifact_store_frame_chars
+        self.row_group_rows = settings.artifact_store_row_group_rows
+        self.level = settings.artifact_store_zstd_level
+        self._objects: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: str, parse: Callable[[bytes], Any]) -> Any | None:
+        with self._lock:
+            if key in self._objects:
+                self._objects.move_to_end(key)
+                return self._objects[key]
+        try:
+            value = parse(self.backend.get(key))
+        except KeyError:
+            return None
+        with self._lock:
+            self._objects[key] = value
+            while len(self._objects) > _CACHED_OBJECTS:
+                self._objects.popitem(last=False)
+        return value
+
+    def _forget(self, content_hash: str) -> None:
+        with self._lock:
+            for key in [key for key in self._objects if key.startswith(f"{content_hash}/")]:
+                del self._objects[key]
+
+    def manifest(self, content_hash: str) -> ArtifactManifest | None:
+        def parse(data: bytes) -> ArtifactManifest | None:
+            record = json.loads(data)
+            if record.get("format") != ARTIFACT_FORMAT:
+                return None
+            return ArtifactManifest(
+                content_hash=content_hash,
+                text_sha256=record["text_sha256"],
+                text_chars=record["text_chars"],
+                frame_chars=record["frame_chars"],
+                frames=record["frames"],
+                pages=[tuple(page) for page in record["pages"]],
+                tables=[
+                    StoredTable(
+                        table["headers"], table["row_count"], table["width"], [tuple(g) for g in table["row_groups"]]
+                    )
+                    for table in record["tables"]
+                ],
+            )
+
+        return self._cached(f"{content_hash}/manifest.json", parse)
+
+    def writer(self, content_hash: str) -> ArtifactStoreWriter:
+        return ArtifactStoreWriter(self, content_hash)
+
+    def reader(self, content_hash: str) -> TextReader | None:
+        manifest = self.manifest(content_hash)
+        return TextReader(self.backend, manifest) if manifest is not None else None
+
+    def read_text(self, content_hash: str, start: int = 0, end: int | None = None) -> str | None:
+        reader = self.reader(content_hash)
+        return reader.read(start, end) if reader is not None else None
+
+    def read_page(self, content_hash: str, page: int) -> tuple[int, int, str] | None:
+        """``(start, end, text)`` of page ``page``, or ``None`` if the entry or page does not exist."""
+        reader = self.reader(content_hash)
+        if reader is None:
+            return None
+        spans = reader.manifest.page_spans(page)
+        if not spans:
+            return None
+        return spans[0][0], spans[-1][1], "".join(reader.read(start, end) for start, end in spans)
+
+    def chunk_spans(self, content_hash: str) -> list[ChunkSpan] | None:
+        """Chunk spans under the current chunking settings, or ``None`` if none were stored."""
+
+        def parse(data: bytes) -> list[ChunkSpan]:
+            columns = json.loads(zstandard.ZstdDecompressor().decompress(data))
+            return [
+                ChunkSpan(index, *row)
+                for index, row in enumerate(zip(columns["start"], columns["end"], columns["page"], columns["page_end"]))
+            ]
+
+        return self._cached(f"{content_hash}/chunks-{chunking_key()}.zst", parse)
+
+    def read_chunk(self, content_hash: str, index: int) -> tuple[ChunkSpan, str] | None:
+        spans = self.chunk_spans(content_hash)
+        reader = self.reader(content_hash)
+        if spans is None or reader is None or not 0 <= index < len(spans):
+            return None
+        span = spans[index]
+        return span, reader.read(span.start, span.end)
+
+    def read_table(
+        self, content_hash: str, index: int, offset: int = 0, limit: int | None = None
+    ) -> tuple[StoredTable, list[list[str]]] | None:
+        """Table ``index`` and its rows ``[offset, offset + limit)``, decompressing only their row groups."""
+        manifest = self.manifest(content_hash)
+        if manifest is None or not 0 <= index < len(manifest.tables):
+            return None
+        table = manifest.tables[index]
+        stop = table.row_count if limit is None else min(table.row_count, offset + limit)
+        needed = []
+        first_row = 0
+        for byte_offset, length, count in table.row_groups:
+            if first_row < stop and first_row + count > offset:
+                needed.append((first_row, byte_offset, length, count))
+            first_row += count
+        if not needed:
+            return table, []
+        base = needed[0][1]
+        data = self.backend.get(f"{content_hash}/tables.zst", base, needed[-1][1] + needed[-1][2])
+        decompressor = zstandard.ZstdDecompressor()
+        rows = []
+        for first_row, byte_offset, length, count in needed:
+            columns = json.loads(decompressor.decompress(data[byte_offset - base : byte_offset - base + length]))
+            for pos in range(max(offset - first_row, 0), min(stop - first_row, count)):
+                row = [column[pos] for column in columns]
+                while row and row[-1] is None:
+                    row.pop()
+                rows.append(row)
+        return table, rows
+
+    def delete(self, content_hash: str) -> None:
+        self.backend.delete_entry(content_hash)
+        self._forget(content_hash)
+
+    def touch(self, content_hash: str) -> None:
+        """Keep a reused entry from being collected before the document that reuses it is saved."""
+        self.backend.touch(content_hash)
+
+    def collect_garbage(self, referenced_hashes: Iterable[str], min_age_seconds: int) -> int:
+        """Delete entries no ``Document`` references, and spool directories of writers that died.
+
+        Returns the number of entries removed.
+        """
+        referenced = set(referenced_hashes)
+        cutoff = time.time() - min_age_seconds
+        removed = 0
+        for content_hash, modified in list(self.backend.entries()):
+            if content_hash not in referenced and modified <= cutoff:
+                self.delete(content_hash)
+                removed += 1
+        for spool in self.scratch.iterdir():
+            if spool.stat().st_mtime <= cutoff:
+                shutil.rmtree(spool, ignore_errors=True)
+        if removed:
+            logger.info("Artifact store GC removed {} entr(ies)", removed)
+        return removed
+
+
+def summarize_tables(tables: Sequence[dict[str, Any]], preview_rows: int | None = None) -> list[dict[str, Any]]:
+    """What a document's insights keep of its tables: headers, row count and the first rows."""
+    preview_rows = get_settings().table_preview_rows if preview_rows is None else preview_rows
+    return [
+        {
+            "index": index,
+            "headers": table["headers"],
+            "rows": table["rows"][:preview_rows],
+            "row_count": len(table["rows"]),
+        }
+        for index, table in enumerate(tables)
+    ]
+
+
+artifact_store = lazy("artifact_store", ArtifactStore)
+
+__all__ = [
+    "ARTIFACT_BACKENDS",
+    "ArtifactBackend",
+    "ArtifactManifest",
+    "ArtifactStore",
+    "ArtifactStoreWriter",
+    "ChunkSpan",
+    "LocalArtifactBackend",
+    "S3ArtifactBackend",
+    "StoredTable",
+    "TextReader",
+    "artifact_store",
+    "chunking_key",
+    "create_artifact_backend",
+    "summarize_tables",
+]
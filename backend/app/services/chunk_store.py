@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from app.core.config import get_settings
+from app.services.registry import lazy
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    document_id INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    PRIMARY KEY (document_id, chunk_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS documents (
+    document_id INTEGER PRIMARY KEY,
+    chunk_count INTEGER NOT NULL,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_documents_revision ON documents (revision);
+CREATE TABLE IF NOT EXISTS index_versions (
+    id INTEGER PRIMARY KEY,
+    embedding_model TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    location TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    activated_at REAL,
+    retired_at REAL
+);
+"""
+
+_NEXT_REVISION = "(SELECT COALESCE(MAX(revision), 0) + 1 FROM documents)"
+
+
+@dataclass
+class IndexVersion:
+    """One vector index: the embedding model and backend it was built with and where it lives.
+
+    ``status`` is ``building``, ``active`` (exactly one version serves queries)
+    or ``retired``. While building, ``cursor`` is the chunk store revision up
+    to which every document has been embedded into it.
+    """
+
+    id: int
+    embedding_model: str
+    backend: str
+    location: str
+    status: str
+    cursor: int
+    chunks: int
+    created_at: float
+    activated_at: float | None
+    retired_at: float | None
+
+    _COLUMNS = "id, embedding_model, backend, location, status, cursor, chunks, created_at, activated_at, retired_at"
+
+
+class ChunkStore:
+    """Chunk texts and metadata per document, independent of any vector index, plus the index versions.
+
+    Every reset and every completed write of a document gives it a new, higher
+    ``revision``, so a re-index can embed everything changed since its cursor
+    and knows it has caught up when no revision is beyond it. The active
+    version is switched in the same database, in one transaction that checks
+    exactly that. Each thread gets its own connection; WAL mode lets API
+    readers run alongside worker writes.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_settings().chunk_store_path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self) -> None:
+        """Forget connections inherited across ``fork()``; each process opens its own."""
+        self._local = threading.local()
+
+    @contextmanager
+    def _immediate(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction taken up front, for read-then-write decisions."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    # Chunks
+
+    def reset_document(self, document_id: int) -> None:
+        """Drop the document's chunks (before re-extraction, or for good)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+            conn.execute(
+                f"INSERT OR REPLACE INTO documents VALUES (?, 0, {_NEXT_REVISION})",
+                (document_id,),
+            )
+
+    def add_chunks(
+        self,
+        document_id: int,
+        chunks: Sequence[str],
+        start_index: int = 0,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+    ) -> None:
+        rows = [
+            (document_id, start_index + pos, text, json.dumps(metadatas[pos] if metadatas else {}))
+            for pos, text in enumerate(chunks)
+        ]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", rows)
+
+    def finish_document(self, document_id: int, chunk_count: int) -> int:
+        """Mark the document's chunks complete; returns the id of the index version active now."""
+        with self._immediate() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO documents VALUES (?, ?, {_NEXT_REVISION})",
+                (document_id, chunk_count),
+            )
+            active = conn.execute("SELECT id FROM index_versions WHERE status = 'active'").fetchone()
+            return active[0] if active else 0
+
+    def iter_chunks(self, document_id: int) -> Iterator[tuple[int, str, dict[str, Any]]]:
+        """``(chunk_index, text, metadata)`` of the document's stored chunks, in order."""
+        rows = self._connect().execute(
+            "SELECT chunk_index, text, metadata FROM chunks WHERE document_id = ? ORDER BY chunk_index",
+            (document_id,),
+        )
+        for chunk_index, text, metadata in rows:
+            yield chunk_index, text, json.loads(metadata)
+
+    def changed_since(self, revision: int, limit: int) -> list[tuple[int, int]]:
+        """``(document_id, revision)`` of the first ``limit`` documents changed after ``revision``."""
+        return self._connect().execute(
+            "SELECT document_id, revision FROM documents WHERE revision > ? ORDER BY revision LIMIT ?",
+            (revision, limit),
+        ).fetchall()
+
+    def missing(self, document_ids: Iterable[int]) -> list[int]:
+        """Those of ``document_ids`` never written here (indexed before the chunk store existed)."""
+        conn = self._connect()
+        return [
+            document_id
+            for document_id in document_ids
+            if conn.execute("SELECT 1 FROM documents WHERE document_id = ?", (document_id,)).fetchone() is None
+        ]
+
+    # Index versions
+
+    def _versions(self, where: str = "1", params: Sequence[Any] = ()) -> list[IndexVersion]:
+        rows = self._connect().execute(
+            f"SELECT {IndexVersion._COLUMNS} FROM index_versions WHERE {where} ORDER BY id", params
+        )
+        return [IndexVersion(*row) for row in rows]
+
+    def versions(self) -> list[IndexVersion]:
+        return self._versions()
+
+    def active_version(self) -> IndexVersion | None:
+        versions = self._versions("status = 'active'")
+        return versions[0] if versions else None
+
+    def building_version(self, embedding_model: str, backend: str) -> IndexVersion | None:
+        versions = self._versions(
+            "status = 'building' AND embedding_model = ? AND backend = ?", (embedding_model, backend)
+        )
+        return versions[-1] if versions else None
+
+    def bootstrap_version(self, embedding_model: str, backend: str, location: str) -> IndexVersion:
+        """The active version, first recording the existing index as version 1 if there is none."""
+        with self._immediate() as conn:
+            if conn.execute("SELECT 1 FROM index_versions WHERE status = 'active'").fetchone() is None:
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO index_versions (embedding_model, backend, location, status, created_at, activated_at) "
+                    "VALUES (?, ?, ?, 'active', ?, ?)",
+                    (embedding_model, backend, location, now, now),
+                )
+        return self.active_version()  # type: ignore[return-value]
+
+    def create_version(self, embedding_model: str, backend: str, locate: Callable[[int], str]) -> IndexVersion:
+        """A new ``building`` version, stored at ``locate(version_id)``."""
+        with self._immediate() as conn:
+            version_id = conn.execute(
+                "INSERT INTO index_versions (embedding_model, backend, location, status, created_at) "
+                "VALUES (?, ?, '', 'building', ?)",
+                (embedding_model, backend, time.time()),
+            ).lastrowid
+            conn.execute("UPDATE index_versions SET location = ? WHERE id = ?", (locate(version_id), version_id))
+        return self._versions("id = ?", (version_id,))[0]
+
+    def claim(self, version_id: int, seconds: float) -> bool:
+        """Take (or renew) the lease on building ``version_id``; false if another job holds it."""
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE index_versions SET lease_expires = ? "
+                "WHERE id = ? AND status = 'building' AND (lease_expires IS NULL OR lease_expires < ?)",
+                (now + seconds, version_id, now),
+            ).rowcount
+        return claimed == 1
+
+    def save_progress(self, version_id: int, cursor: int, chunks: int, lease_seconds: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE index_versions SET cursor = ?, chunks = ?, lease_expires = ? WHERE id = ?",
+                (cursor, chunks, time.time() + lease_seconds, version_id),
+            )
+
+    def release(self, version_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE index_versions SET lease_expires = NULL WHERE id = ?", (version_id,))
+
+    def activate(self, version_id: int, cursor: int) -> bool:
+        """Make ``version_id`` the active version if it is caught up to ``cursor``.
+
+        Returns false, switching nothing, when documents changed after
+        ``cursor``. The previously active version is retired in the same
+        transaction, so every process sees exactly one active version.
+        """
+        with self._immediate() as conn:
+            latest = conn.execute("SELECT COALESCE(MAX(revision), 0) FROM documents").fetchone()[0]
+            if latest > cursor:
+                return False
+            now = time.time()
+            conn.execute("UPDATE index_versions SET status = 'retired', retired_at = ? WHERE status = 'active'", (now,))
+            conn.execute(
+                "UPDATE index_versions SET status = 'active', activated_at = ?, cursor = ?, lease_expires = NULL "
+                "WHERE id = ?",
+                (now, cursor, version_id),
+            )
+            return True
+
+    def retired_versions(self, min_age_seconds: float) -> list[IndexVersion]:
+        return self._versions("status = 'retired' AND retired_at <= ?", (time.time() - min_age_seconds,))
+
+    def delete_version(self, version_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM index_versions WHERE id = ?", (version_id,))
+
+
+chunk_store = lazy("chunk_store", ChunkStore)
+
+__all__ = ["ChunkStore", "IndexVersion", "chunk_store"]
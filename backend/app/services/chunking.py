@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Protocol, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Paragraphs are separated by blank lines; sentences end in terminal punctuation
+# (optionally followed by closing quotes/brackets) and whitespace.
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_WORD = re.compile(r"\w+|[^\w\s]")
+
+
+@dataclass
+class Chunk:
+    text: str
+    index: int
+    page: int
+    metadata: dict[str, Any] = field(default_factory=dict)
+    page_end: int | None = None
+    char_start: int | None = None
+    char_end: int | None = None
+
+    def vector_metadata(self) -> dict[str, Any]:
+        metadata: dict[str, Any] = {"page": self.page, **self.metadata}
+        if self.page_end is not None:
+            metadata["page_end"] = self.page_end
+        if self.char_start is not None:
+            metadata["char_start"] = self.char_start
+            metadata["char_end"] = self.char_end
+        return metadata
+
+
+class TokenCounter(Protocol):
+    def count(self, texts: Sequence[str]) -> list[int]: ...
+
+    def split(self, text: str, max_tokens: int) -> list[tuple[int, int]]:
+        """Character spans of consecutive pieces of at most ``max_tokens`` tokens."""
+        ...
+
+
+class TokenizerCounter:
+    """Counts tokens with the embedding model's (fast) Hugging Face tokenizer."""
+
+    def __init__(self, tokenizer: Any) -> None:
+        self.tokenizer = tokenizer
+
+    def count(self, texts: Sequence[str]) -> list[int]:
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            list(texts),
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def split(self, text: str, max_tokens: int) -> list[tuple[int, int]]:
+        offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        spans = []
+        for pos in range(0, len(offsets), max_tokens):
+            window = offsets[pos : pos + max_tokens]
+            spans.append((window[0][0], window[-1][1]))
+        return spans or [(0, len(text))]
+
+
+class WordCounter:
+    """Tokenizer-free approximation: one token per word or punctuation mark."""
+
+    def count(self, texts: Sequence[str]) -> list[int]:
+        return [sum(1 for _ in _WORD.finditer(text)) for text in texts]
+
+    def split(self, text: str, max_tokens: int) -> list[tuple[int, int]]:
+        matches = list(_WORD.finditer(text))
+        spans = []
+        for pos in range(0, len(matches), max_tokens):
+            window = matches[pos : pos + max_tokens]
+            spans.append((window[0].start(), window[-1].end()))
+        return spans or [(0, len(text))]
+
+
+@dataclass
+class _Segment:
+    page: int
+    page_text: str
+    start: int  # offsets within ``page_text``
+    end: int
+    offset: int  # global offset of ``page_text[0]``
+    tokens: int
+    paragraph_end: bool
+
+
+class TokenChunker:
+    """Packs whole sentences into chunks of at most ``max_tokens`` embedding tokens.
+
+    Pages are split into paragraphs and sentences with a single regex pass, all
+    sentences of a page are tokenized in one batched call, and chunks are emitted
+    greedily, preferring to close a chunk at a paragraph boundary once it is
+    ``soft_ratio`` full. Sentences longer than the budget are split on token
+    boundaries. Each chunk records its global character span and page range, so
+    the whole document is never materialised and work is linear in its length.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        max_tokens: int = 256,
+        overlap_tokens: int = 0,
+        soft_ratio: float = 0.75,
+    ) -> None:
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.soft_tokens = int(max_tokens * soft_ratio)
+
+    def _sentence_spans(self, text: str) -> Iterator[tuple[int, int, bool]]:
+        paragraph_start = 0
+        breaks = [(m.start(), m.end()) for m in _PARAGRAPH_BREAK.finditer(text)] + [(len(text), len(text))]
+        for paragraph_end, next_start in breaks:
+            start = paragraph_start
+            for match in _SENTENCE_BREAK.finditer(text, paragraph_start, paragraph_end):
+                if match.start() > start:
+                    yield start, match.start(), False
+                start = match.end()
+            if paragraph_end > start and text[start:paragraph_end].strip():
+                yield start, paragraph_end, next_start < len(text)
+            paragraph_start = next_start
+
+    def _segments(self, pages: Iterable[tuple[int, str]]) -> Iterator[_Segment]:
+        offset = 0
+        for page_number, text in pages:
+            spans = list(self._sentence_spans(text))
+            counts = self.counter.count([text[start:end] for start, end, _ in spans])
+            for (start, end, paragraph_end), tokens in zip(spans, counts):
+                if tokens <= self.max_tokens:
+                    yield _Segment(page_number, text, start, end, offset, tokens, paragraph_end)
+                    continue
+                pieces = self.counter.split(text[start:end], self.max_tokens)
+                for pos, (piece_start, piece_end) in enumerate(pieces):
+                    yield _Segment(
+                        page_number,
+                        text,
+                        start + piece_start,
+                        start + piece_end,
+                        offset,
+                        self.max_tokens,
+                        paragraph_end and pos == len(pieces) - 1,
+                    )
+            offset += len(text)
+
+    def _build(self, segments: list[_Segment], index: int) -> Chunk:
+        first, last = segments[0], segments[-1]
+        if first.page_text is last.page_text:
+            text = first.page_text[first.start : last.end]
+        else:
+            # Spanning pages: equal to slicing the concatenated pages at the chunk's offsets.
+            parts = [first.page_text[first.start :]]
+            for previous, segment in zip(segments, segments[1:]):
+                if segment.page_text is not previous.page_text and segment.page_text is not last.page_text:
+                    parts.append(segment.page_text)
+            parts.append(last.page_text[: last.end])
+            text = "".join(parts)
+        return Chunk(
+            text=text,
+            index=index,
+            page=first.page,
+            page_end=last.page,
+            char_start=first.offset + first.start,
+            char_end=last.offset + last.end,
+        )
+
+    def _overlap(self, segments: list[_Segment], incoming: int = 0) -> tuple[list[_Segment], int]:
+        """Trailing sentences to repeat at the start of the next chunk."""
+        budget = min(self.overlap_tokens, self.max_tokens - incoming)
+        carried: list[_Segment] = []
+        tokens = 0
+        for segment in reversed(segments):
+            if tokens + segment.tokens > budget:
+                break
+            carried.append(segment)
+            tokens += segment.tokens
+        carried.reverse()
+        return carried, tokens
+
+    def iter_chunks(self, pages: Iterable[tuple[int, str]]) -> Iterator[Chunk]:
+        current: list[_Segment] = []
+        tokens = 0
+        fresh = False  # whether ``current`` holds anything beyond carried-over overlap
+        index = 0
+        for segment in self._segments(pages):
+            if current and tokens + segment.tokens > self.max_tokens:
+                if fresh:
+                    yield self._build(current, index)
+                    index += 1
+                current, tokens = self._overlap(current, segment.tokens)
+            current.append(segment)
+            tokens += segment.tokens
+            fresh = True
+            if segment.paragraph_end and tokens >= self.soft_tokens:
+                yield self._build(current, index)
+                index += 1
+                current, tokens = self._overlap(current)
+                fresh = False
+        if fresh:
+            yield self._build(current, index)
+            index += 1
+        if index == 0:
+            yield Chunk("", 0, 1)
+
+
+def iter_chunks(
+    pages: Iterable[tuple[int, str]],
+    chunk_size: int = 1000,
+    overlap: int = 200,
+) -> Iterator[Chunk]:
+    """Fixed-size character windows over a stream of ``(page_number, text)`` pairs.
+
+    Produces the same windows as slicing the concatenated pages, but only ever
+    holds the current page plus one window of carry-over, and tags each chunk
+    with the page it starts on.
+    """
+    step = chunk_size - overlap
+    buffer = ""
+    pos = 0  # start of the next window within ``buffer``
+    buffer_offset = 0  # global offset of ``buffer[0]``
+    boundaries: list[tuple[int, int]] = []  # (global start offset, page number)
+    index = 0
+
+    def page_at(offset: int) -> int:
+        while len(boundaries) > 1 and boundaries[1][0] <= offset:
+            boundaries.pop(0)
+        return boundaries[0][1]
+
+    for page_number, text in pages:
+        if not text:
+            continue
+        boundaries.append((buffer_offset + len(buffer), page_number))
+        buffer = buffer[pos:] + text
+        buffer_offset += pos
+        pos = 0
+        while len(buffer) - pos >= chunk_size:
+            yield Chunk(buffer[pos : pos + chunk_size], index, page_at(buffer_offset + pos))
+            index += 1
+            pos += step
+
+    while pos < len(buffer):
+        yield Chunk(buffer[pos : pos + chunk_size], index, page_at(buffer_offset + pos))
+        index += 1
+        pos += step
+
+    if index == 0:
+        yield Chunk("", 0, 1)
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+__all__ = ["Chunk", "TokenChunker", "TokenCounter", "TokenizerCounter", "WordCounter", "batched", "iter_chunks"]
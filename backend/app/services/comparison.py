@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.concurrency import stage_limiter
+from app.services.llm_client import llm_client
+from app.services.registry import lazy
+from app.services.vector_store import vector_store
+
+# Rows of the similarity matrix computed at once, bounding memory for long documents.
+SIMILARITY_BLOCK_ROWS = 2048
+EXCERPT_CHARS = 600
+
+
+@dataclass
+class ComparedDocument:
+    document_id: int
+    filename: str
+    texts: list[str]
+    embeddings: np.ndarray
+    metadatas: list[dict[str, Any]]
+
+    def page(self, chunk: int) -> int | None:
+        metadata = self.metadatas[chunk]
+        return metadata.get("page_end", metadata.get("page"))
+
+    def section(self, start: int, end: int) -> dict[str, Any]:
+        """Chunks ``start..end`` (inclusive) as one contiguous section."""
+        return {
+            "document_id": self.document_id,
+            "chunks": [start, end],
+            "pages": [self.metadatas[start].get("page"), self.page(end)],
+            "text": " ".join(self.texts[start : end + 1])[:EXCERPT_CHARS],
+        }
+
+
+@dataclass
+class BestMatches:
+    """For each row (column) of a similarity matrix, its best column (row) and score."""
+
+    row_best: np.ndarray
+    row_score: np.ndarray
+    col_best: np.ndarray
+    col_score: np.ndarray
+
+
+@dataclass
+class PairAlignment:
+    a: ComparedDocument
+    b: ComparedDocument
+    matches: BestMatches
+    aligned: list[tuple[int, int, float]] = field(default_factory=list)
+    changed: list[tuple[int, int, float]] = field(default_factory=list)
+    only_in_a: list[tuple[int, int]] = field(default_factory=list)
+    only_in_b: list[tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def similarity(self) -> float:
+        """Share of both documents' chunks that have a counterpart in the other."""
+        total = len(self.a.texts) + len(self.b.texts)
+        unmatched = sum(end - start + 1 for start, end in self.only_in_a + self.only_in_b)
+        return (total - unmatched) / total if total else 1.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "document_ids": [self.a.document_id, self.b.document_id],
+            "similarity": round(self.similarity, 4),
+            "aligned_chunks": len(self.aligned),
+            "changed": [
+                {
+                    "a": self.a.section(i, i),
+                    "b": self.b.section(j, j),
+                    "similarity": round(score, 4),
+                }
+                for i, j, score in self.changed
+            ],
+            "only_in_a": [self.a.section(start, end) for start, end in self.only_in_a],
+            "only_in_b": [self.b.section(start, end) for start, end in self.only_in_b],
+        }
+
+
+def best_matches(a: np.ndarray, b: np.ndarray, block_rows: int = SIMILARITY_BLOCK_ROWS) -> BestMatches:
+    """Row-wise and column-wise argmax of ``a @ b.T`` without materializing it all at once."""
+    row_best = np.zeros(len(a), dtype=np.int64)
+    row_score = np.full(len(a), -np.inf, dtype=np.float32)
+    col_best = np.zeros(len(b), dtype=np.int64)
+    col_score = np.full(len(b), -np.inf, dtype=np.float32)
+    if len(a) == 0 or len(b) == 0:
+        return BestMatches(row_best, row_score, col_best, col_score)
+
+    columns = np.arange(len(b))
+    for start in range(0, len(a), block_rows):
+        similarities = a[start : start + block_rows] @ b.T
+        rows = similarities.argmax(axis=1)
+        row_best[start : start + len(rows)] = rows
+        row_score[start : start + len(rows)] = similarities[np.arange(len(rows)), rows]
+
+        block_best = similarities.argmax(axis=0)
+        block_score = similarities[block_best, columns]
+        better = block_score > col_score
+        col_best[better] = block_best[better] + start
+        col_score[better] = block_score[better]
+    return BestMatches(row_best, row_score, col_best, col_score)
+
+
+def runs(indices: np.ndarray) -> list[tuple[int, int]]:
+    """Collapse sorted chunk indices into inclusive ``(start, end)`` runs."""
+    if len(indices) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(indices) != 1)
+    starts = np.concatenate(([indices[0]], indices[breaks + 1]))
+    ends = np.concatenate((indices[breaks], [indices[-1]]))
+    return [(int(start), int(end)) for start, end in zip(starts, ends)]
+
+
+class DocumentComparator:
+    """Compare documents by aligning their chunk embeddings.
+
+    For every pair of documents, each chunk's best counterpart comes from one
+    blocked matrix product. Mutual best matches above
+    ``compare_identical_threshold`` are aligned, mutual matches below it are
+    changed, and chunks whose best counterpart scores under
+    ``compare_match_threshold`` form "only in" sections. One LLM request then
+    describes only the differing sections, within ``compare_max_llm_chars``.
+    """
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.match_threshold = settings.compare_match_threshold
+        self.identical_threshold = settings.compare_identical_threshold
+        self.max_llm_chars = settings.compare_max_llm_chars
+
+    def load(self, documents: Sequence[tuple[int, str]]) -> list[ComparedDocument]:
+        loaded = []
+        for document_id, filename in documents:
+            texts, embeddings, metadatas = vector_store.get_document_chunks(document_id)
+            loaded.append(ComparedDocument(document_id, filename, texts, embeddings, metadatas))
+        return loaded
+
+    def align_pair(self, a: ComparedDocument, b: ComparedDocument) -> PairAlignment:
+        matches = best_matches(a.embeddings, b.embeddings)
+        pair = PairAlignment(a, b, matches)
+        if len(b.texts):
+            rows = np.arange(len(a.texts))
+            mutual = (matches.row_score >= self.match_threshold) & (matches.col_best[matches.row_best] == rows)
+            identical = matches.row_score >= self.identical_threshold
+            for i in np.flatnonzero(mutual):
+                target = pair.aligned if identical[i] else pair.changed
+                target.append((int(i), int(matches.row_best[i]), float(matches.row_score[i])))
+        pair.only_in_a = runs(np.flatnonzero(matches.row_score < self.match_threshold))
+        pair.only_in_b = runs(np.flatnonzero(matches.col_score < self.match_threshold))
+        pair.changed.sort(key=lambda change: change[2])
+        return pair
+
+    def align(self, documents: Sequence[tuple[int, str]]) -> tuple[list[ComparedDocument], list[PairAlignment]]:
+        loaded = self.load(documents)
+        pairs = [self.align_pair(a, b) for a, b in itertools.combinations(loaded, 2)]
+        return loaded, pairs
+
+    def unique_sections(
+        self,
+        loaded: list[ComparedDocument],
+        pairs: list[PairAlignment],
+    ) -> dict[int, list[tuple[int, int]]]:
+        """Sections of each document with no counterpart in any other document."""
+        best = {document.document_id: np.full(len(document.texts), -np.inf) for document in loaded}
+        for pair in pairs:
+            np.maximum(best[pair.a.document_id], pair.matches.row_score, out=best[pair.a.document_id])
+            np.maximum(best[pair.b.document_id], pair.matches.col_score, out=best[pair.b.document_id])
+        return {
+            document_id: runs(np.flatnonzero(scores < self.match_threshold))
+            for document_id, scores in best.items()
+        }
+
+    def differences_prompt(
+        self,
+        loaded: list[ComparedDocument],
+        pairs: list[PairAlignment],
+        unique: dict[int, list[tuple[int, int]]],
+    ) -> tuple[str, str]:
+        """Alignment overview plus the differing sections, most different first, within budget."""
+        by_id = {document.document_id: document for document in loaded}
+        overview = "\n".join(
+            [f"Document {d.document_id} ({d.filename}): {len(d.texts)} sections" for d in loaded]
+            + [
+                f"Documents {p.a.document_id} and {p.b.document_id}: {p.similarity:.0%} of sections match, "
+                f"{len(p.aligned)} identical, {len(p.changed)} reworded"
+                for p in pairs
+            ]
+        )
+
+        items: list[tuple[float, str]] = []
+        for document_id, sections in unique.items():
+            document = by_id[document_id]
+            for start, end in sections:
+                section = document.section(start, end)
+                items.append((-1.0, f"Only in document {document_id}, pages {section['pages']}:\n{section['text']}"))
+        for pair in pairs:
+            for i, j, score in pair.changed:
+                items.append(
+                    (
+                        score,
+                        f"Reworded between documents {pair.a.document_id} and {pair.b.document_id}:\n"
+                        f"[{pair.a.document_id}] {pair.a.section(i, i)['text']}\n"
+                        f"[{pair.b.document_id}] {pair.b.section(j, j)['text']}",
+                    )
+                )
+        items.sort(key=lambda item: item[0])
+
+        parts, used = [], 0
+        for _, text in items:
+            if used + len(text) > self.max_llm_chars:
+                break
+            parts.append(text)
+            used += len(text)
+        return overview, "\n\n".join(parts)
+
+    async def acompare(self, documents: Sequence[tuple[int, str]]) -> dict[str, Any]:
+        started = time.perf_counter()
+        loaded, pairs = await stage_limiter.run("vector", self.align, documents)
+        unique = self.unique_sections(loaded, pairs)
+        overview, differences = self.differences_prompt(loaded, pairs, unique)
+        alignment_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        if differences:
+            async with stage_limiter.limit("llm"):
+                summary = await llm_client.acompare_documents(overview, differences)
+        else:
+            summary = {
+                "similarities": "The documents' sections all align.",
+                "differences": "No material differences were found.",
+            }
+        llm_ms = (time.perf_counter() - started) * 1000
+
+        by_id = {document.document_id: document for document in loaded}
+        return {
+            "documents": [
+                {"id": d.document_id, "filename": d.filename, "chunk_count": len(d.texts)} for d in loaded
+            ],
+            **summary,
+            "pairs": [pair.as_dict() for pair in pairs],
+            "unique_sections": {
+                document_id: [by_id[document_id].section(start, end) for start, end in sections]
+                for document_id, sections in unique.items()
+            },
+            "stats": {
+                "alignment_ms": round(alignment_ms, 1),
+                "llm_ms": round(llm_ms, 1),
+                "llm_input_chars": len(overview) + len(differences),
+            },
+        }
+
+
+document_comparator = lazy("document_comparator", DocumentComparator)
+
+__all__ = ["DocumentComparator", "best_matches", "document_comparator"]
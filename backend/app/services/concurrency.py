@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import get_settings
+from app.services.registry import lazy
+
+T = TypeVar("T")
+
+
+class StageLimiter:
+    """Per-stage concurrency limits for the API process, plus a bounded pool for blocking calls.
+
+    ``limit(stage)`` is an ``asyncio.Semaphore`` capping in-flight work for
+    that stage, so a burst in one stage (slow LLM calls, say) waits on the
+    event loop rather than piling onto the next. ``run`` executes a blocking
+    call on the shared thread pool under the stage's semaphore; because the
+    semaphore is acquired first, queued work never occupies a thread.
+    """
+
+    def __init__(self, max_workers: int | None = None, limits: dict[str, int] | None = None) -> None:
+        settings = get_settings()
+        self.max_workers = max_workers or settings.api_blocking_workers
+        self.limits = limits or {
+            "embedding": settings.api_embedding_concurrency,
+            "vector": settings.api_vector_concurrency,
+            "llm": settings.api_llm_concurrency,
+            "processing": settings.api_processing_concurrency,
+        }
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="api-blocking")
+        return self._executor
+
+    def limit(self, stage: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            semaphore = self._semaphores[stage] = asyncio.Semaphore(self.limits[stage])
+        return semaphore
+
+    async def run(self, stage: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        async with self.limit(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+stage_limiter = lazy("stage_limiter", StageLimiter)
+
+__all__ = ["StageLimiter", "stage_limiter"]
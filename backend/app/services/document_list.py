@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.document import Document, DocumentStatus
+from app.schemas.document import DocumentSummary
+from app.services.registry import lazy
+
+# Only the columns ``DocumentSummary`` shows; the insights JSON is never read for a list.
+SUMMARY_COLUMNS = [getattr(Document, name) for name in DocumentSummary.model_fields]
+
+
+def encode_cursor(created_at: datetime, document_id: int) -> str:
+    """Opaque cursor for the page after the row ``(created_at, document_id)``."""
+    payload = json.dumps([created_at.isoformat(), document_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for anything it did not produce."""
+    try:
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(document_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor {cursor!r}") from exc
+
+
+def list_filters(doc_status: DocumentStatus | None, category: str | None) -> list[ColumnElement[bool]]:
+    filters: list[ColumnElement[bool]] = []
+    if doc_status is not None:
+        filters.append(Document.status == doc_status)
+    if category is not None:
+        filters.append(Document.category == category)
+    return filters
+
+
+def page_query(filters: list[ColumnElement[bool]], cursor: str | None, limit: int) -> Any:
+    """Newest first by ``(created_at, id)``, resuming strictly after ``cursor``.
+
+    Each page is an index range scan from the cursor position (see the
+    ``Document`` indexes), so its cost does not depend on how deep it is.
+    ``limit + 1`` rows are fetched to tell whether another page follows.
+    """
+    query = select(*SUMMARY_COLUMNS).where(*filters)
+    if cursor is not None:
+        created_at, document_id = decode_cursor(cursor)
+        # A row value comparison: SQLite seeks the index to it, where the equivalent OR of
+        # ``created_at < c OR (created_at = c AND id < i)`` with bound parameters scans from the top.
+        query = query.where(tuple_(Document.created_at, Document.id) < tuple_(created_at, document_id))
+    return query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit + 1)
+
+
+class DocumentCounts:
+    """Total documents per list filter, reused for ``document_count_cache_ttl_seconds``.
+
+    Counting is a scan of the matching index entries, so it is done at most
+    once per filter and TTL in each process (concurrent misses share one
+    count) rather than for every page request.
+    """
+
+    def __init__(self, ttl_seconds: int | None = None) -> None:
+        self.ttl = ttl_seconds if ttl_seconds is not None else get_settings().document_count_cache_ttl_seconds
+        self._counts: dict[tuple[Any, ...], tuple[int, float]] = {}
+        self._locks: dict[tuple[Any, ...], asyncio.Lock] = {}
+
+    async def count(self, db: AsyncSession, doc_status: DocumentStatus | None, category: str | None) -> int:
+        key = (doc_status, category)
+        cached = self._counts.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._counts.get(key)
+            if cached is not None and cached[1] > time.monotonic():
+                return cached[0]
+            query = select(func.count()).select_from(Document).where(*list_filters(doc_status, category))
+            total = (await db.execute(query)).scalar_one()
+            self._counts[key] = (total, time.monotonic() + self.ttl)
+            return total
+
+
+document_counts = lazy("document_counts", DocumentCounts)
+
+__all__ = [
+    "DocumentCounts",
+    "SUMMARY_COLUMNS",
+    "decode_cursor",
+    "document_counts",
+    "encode_cursor",
+    "list_filters",
+    "page_query",
+]
@@ -1,72 +1,166 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from docx import Document as DocxDocument
+import numpy as np
 from loguru import logger
-from pdfminer.high_level import extract_text as extract_pdf_text
-from PIL import Image
-import pytesseract
 
-from app.services.embeddings import embedding_service
+from app.core.config import get_settings
+from app.core.metrics import CHUNKING_SECONDS, EXTRACTION_SECONDS, timed_iter
+from app.services.artifact_cache import ArtifactWriter, artifact_cache
+from app.services.artifact_store import ArtifactStoreWriter, artifact_store, summarize_tables
+from app.services.chunk_store import chunk_store
+from app.services.chunking import Chunk, TokenChunker, TokenizerCounter, batched
+from app.services.embeddings import embedding_service, embedding_service_for
+from app.services.enrichment import ENRICHMENT_TEXT_CHARS, EnrichmentResult, SectionPacker, enrichment_service
 from app.services.llm_client import llm_client
-from app.services.vector_store import vector_store
+from app.services.ocr import PageResult, ocr_engine
+from app.services.search_index import search_index
+from app.services.stage_workspace import StageWorkspace
+from app.services.vector_store import IndexHandle, vector_store
+
+TEXT_BLOCK_CHARS = 1024 * 1024
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+
+def _file_type(file_path: Path) -> str:
+    """Extraction path taken for ``file_path``; a bounded metric label, unlike raw suffixes."""
+    suffix = file_path.suffix.lower()
+    if suffix == ".pdf":
+        return "pdf"
+    if suffix in {".docx", ".doc"}:
+        return "docx"
+    return "image" if suffix in IMAGE_SUFFIXES else "text"
+
+
+class TableScanner:
+    """Finds pipe-delimited tables in text fed one page at a time.
+
+    The unfinished last line and the open table carry over to the next page,
+    so a table that crosses a page break comes back whole, the same as
+    scanning the concatenated text in one go.
+    """
+
+    def __init__(self) -> None:
+        self.tables: list[dict[str, Any]] = []
+        self._current: list[list[str]] = []
+        self._partial = ""
+
+    def feed(self, text: str) -> None:
+        lines = (self._partial + text).splitlines(keepends=True)
+        # A trailing "\r" may be the first half of a "\r\n" split by the page break.
+        last = lines[-1] if lines else ""
+        unfinished = last.endswith("\r") or len(last.splitlines()[0] if last else "") == len(last)
+        self._partial = lines.pop() if lines and unfinished else ""
+        for line in lines:
+            self._line(line.splitlines()[0] if line.splitlines() else "")
+
+    def _line(self, line: str) -> None:
+        if "|" in line:
+            row = [cell.strip() for cell in line.split("|") if cell.strip()]
+            if row:
+                self._current.append(row)
+        elif self._current:
+            self._close()
+
+    def _close(self) -> None:
+        if len(self._current) >= 2:
+            self.tables.append({"headers": self._current[0], "rows": self._current[1:]})
+        self._current = []
+
+    def finish(self) -> list[dict[str, Any]]:
+        """Tables found so far, including one still open at the end of the text."""
+        if self._partial:
+            for line in self._partial.splitlines():
+                self._line(line)
+            self._partial = ""
+        self._close()
+        return self.tables
 
 
 class DocumentProcessor:
-    def extract_text(self, file_path: Path) -> str:
-        suffix = file_path.suffix.lower()
+    _chunker: TokenChunker | None = None
+
+    @property
+    def chunker(self) -> TokenChunker:
+        if self._chunker is None:
+            settings = get_settings()
+            # Leave room for the [CLS]/[SEP] tokens the encoder adds.
+            max_tokens = min(settings.chunk_max_tokens, embedding_service.max_seq_length - 2)
+            self._chunker = TokenChunker(
+                TokenizerCounter(embedding_service.tokenizer),
+                max_tokens=max_tokens,
+                overlap_tokens=settings.chunk_overlap_tokens,
+            )
+        return self._chunker
 
+    def iter_pages(self, file_path: Path) -> Iterator[tuple[int, str]]:
+        """Yield ``(page_number, text)`` pairs, one page at a time."""
+        return timed_iter(self._extract_pages(file_path), EXTRACTION_SECONDS.labels(_file_type(file_path)))
+
+    def _extract_pages(self, file_path: Path) -> Iterator[tuple[int, str]]:
+        suffix = file_path.suffix.lower()
+        yielded = False
         try:
             if suffix == ".pdf":
-                return extract_pdf_text(file_path)
+                for page in ocr_engine.ordered(self._iter_pdf_pages(file_path)):
+                    yielded = True
+                    yield page
+                return
             if suffix in {".docx", ".doc"}:
+                from docx import Document as DocxDocument
+
                 doc = DocxDocument(file_path)
-                return "\n".join(paragraph.text for paragraph in doc.paragraphs)
-            if suffix in {".png", ".jpg", ".jpeg"}:
-                image = Image.open(file_path)
-                return pytesseract.image_to_string(image)
-            return file_path.read_text(encoding="utf-8", errors="ignore")
+                yielded = True
+                yield 1, "\n".join(paragraph.text for paragraph in doc.paragraphs)
+                return
+            if suffix in IMAGE_SUFFIXES:
+                for page in ocr_engine.iter_image_pages(file_path):
+                    yielded = True
+                    yield page
+                return
         except Exception as exc:
             logger.exception("Failed to extract text from {}: {}", file_path, exc)
-            return file_path.read_text(encoding="utf-8", errors="ignore")
+            if yielded:
+                raise
+        yield from self._iter_text_blocks(file_path)
+
+    def _iter_pdf_pages(self, file_path: Path) -> Iterator[tuple[int, PageResult]]:
+        """Text-layer pages as strings; pages without one are handed to the OCR pool."""
+        # Parsers are imported on first use so the API, which rarely parses, starts faster.
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        for page_number, page in enumerate(extract_pages(file_path), start=1):
+            text = "".join(element.get_text() for element in page if isinstance(element, LTTextContainer))
+            if ocr_engine.needs_ocr(text):
+                yield page_number, ocr_engine.submit_pdf_page(file_path, page_number - 1)
+            else:
+                yield page_number, text
+
+    def _iter_text_blocks(self, file_path: Path) -> Iterator[tuple[int, str]]:
+        with file_path.open(encoding="utf-8", errors="ignore") as fh:
+            while block := fh.read(TEXT_BLOCK_CHARS):
+                yield 1, block
+
+    def extract_text(self, file_path: Path) -> str:
+        return "".join(text for _, text in self.iter_pages(file_path))
 
     def extract_tables(self, text: str) -> list[dict[str, Any]]:
-        tables: list[list[list[str]]] = []
-        current: list[list[str]] = []
-
-        for line in text.splitlines():
-            if "|" in line:
-                row = [cell.strip() for cell in line.split("|") if cell.strip()]
-                if row:
-                    current.append(row)
-            elif current:
-                if len(current) >= 2:
-                    tables.append(current)
-                current = []
-
-        if current and len(current) >= 2:
-            tables.append(current)
-
-        structured = []
-        for raw_table in tables:
-            headers = raw_table[0]
-            rows = raw_table[1:]
-            structured.append({"headers": headers, "rows": rows})
-        return structured
-
-    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
-        chunks: list[str] = []
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunks.append(text[start:end])
-            start += chunk_size - overlap
-        return chunks or [text]
-
-    def embed_chunks(self, chunks: list[str]) -> list[list[float]]:
-        return embedding_service.embed(chunks)
+        scanner = TableScanner()
+        scanner.feed(text)
+        return scanner.finish()
+
+    def iter_chunks(self, pages: Iterable[tuple[int, str]]) -> Iterator[Chunk]:
+        return timed_iter(self.chunker.iter_chunks(pages), CHUNKING_SECONDS)
+
+    def chunk_text(self, text: str) -> list[str]:
+        return [chunk.text for chunk in self.iter_chunks(iter([(1, text)]))]
+
+    def embed_chunks(self, chunks: list[str], model: str | None = None) -> np.ndarray:
+        return embedding_service_for(model).embed(chunks)
 
     def summarize(self, text: str) -> str:
         return llm_client.summarize(text)
@@ -80,26 +174,332 @@ class DocumentProcessor:
     def classify_document(self, text: str) -> str:
         return llm_client.classify_category(text)
 
-    def process(self, document_id: int, file_path: Path) -> dict[str, Any]:
-        text = self.extract_text(file_path)
-        chunks = self.chunk_text(text)
-        embeddings = self.embed_chunks(chunks)
-        vector_store.upsert_document_chunks(document_id, chunks, embeddings)
+    def enrich(self, text: str, mode: str | None = None, sections: list[str] | None = None) -> EnrichmentResult:
+        return enrichment_service.enrich(text, mode=mode, sections=sections)
+
+    @staticmethod
+    def _section_packer(mode: str | None) -> SectionPacker | None:
+        """A packer collecting the whole text as sections, if ``mode`` enriches from them."""
+        return SectionPacker() if (mode or enrichment_service.mode) == "hierarchical" else None
+
+    def index_chunks(
+        self,
+        document_id: int,
+        chunks: Iterator[Chunk],
+        cache_writer: ArtifactWriter | None = None,
+        sections: SectionPacker | None = None,
+        index: IndexHandle | None = None,
+        artifacts: ArtifactStoreWriter | None = None,
+    ) -> int:
+        """Embed and upsert chunks in fixed-size batches into ``index`` (the active one by default).
+
+        Returns the number indexed.
+        """
+        index = index or vector_store.active()
+        count = 0
+        for batch in batched(chunks, get_settings().embedding_batch_size):
+            texts = [chunk.text for chunk in batch]
+            metadatas = [chunk.vector_metadata() for chunk in batch]
+            embeddings = self.embed_chunks(texts, index.version.embedding_model)
+            self._write_batch(
+                index, document_id, texts, embeddings, batch[0].index, metadatas, [chunk.page for chunk in batch]
+            )
+            if cache_writer is not None:
+                cache_writer.add_chunks(texts, embeddings, metadatas)
+            if sections is not None:
+                sections.add(texts)
+            if artifacts is not None:
+                artifacts.add_chunks(batch)
+            count += len(batch)
+        self._finish(document_id, count, index)
+        return count
+
+    @staticmethod
+    def _write_batch(
+        index: IndexHandle,
+        document_id: int,
+        texts: list[str],
+        embeddings: np.ndarray,
+        start_index: int,
+        metadatas: list[dict[str, Any]],
+        pages: list[int | None],
+    ) -> None:
+        index.store.upsert_document_chunks(
+            document_id, texts, embeddings, start_index=start_index, metadatas=metadatas
+        )
+        search_index.add_chunks(document_id, texts, start_index=start_index, pages=pages)
+        chunk_store.add_chunks(document_id, texts, start_index=start_index, metadatas=metadatas)
+
+    def _finish(self, document_id: int, chunk_count: int, index: IndexHandle) -> None:
+        """Mark the document's stored chunks complete, for a re-index to pick up."""
+        if chunk_store.finish_document(document_id, chunk_count) != index.version.id:
+            # A re-index switched the active version while this document went into the old one.
+            self.reindex_document(document_id)
+
+    def reindex_document(self, document_id: int) -> int:
+        """Re-embed the document's stored chunks into the active index version. Returns the number indexed."""
+        index = vector_store.active()
+        index.store.delete_document(document_id)
+        rows = list(chunk_store.iter_chunks(document_id))
+        for batch in batched(rows, get_settings().embedding_batch_size):
+            texts = [text for _, text, _ in batch]
+            index.store.upsert_document_chunks(
+                document_id,
+                texts,
+                self.embed_chunks(texts, index.version.embedding_model),
+                start_index=batch[0][0],
+                metadatas=[metadata for _, _, metadata in batch],
+            )
+        return len(rows)
 
-        summary = self.summarize(text)
-        key_points = self.extract_key_points(text)
-        sentiment = self.detect_sentiment(text)
-        category = self.classify_document(text)
-        tables = self.extract_tables(text)
+    def _reset_index(self, document_id: int) -> None:
+        # Drop vectors, postings and stored chunks from any earlier run so a shorter re-extraction
+        # leaves no stale chunks.
+        vector_store.delete_document(document_id)
+        search_index.delete_document(document_id)
+        chunk_store.reset_document(document_id)
 
+    def _replay_cached(self, document_id: int, content_hash: str | None) -> dict[str, Any] | None:
+        """Index a cached entry for ``content_hash`` and return its result, or ``None`` on a miss.
+
+        Cached embeddings from a model other than the active index version's are recomputed.
+        """
+        cached = artifact_cache.load(content_hash) if content_hash else None
+        if cached is None:
+            return None
+        logger.info("Reusing cached artifacts {} for document {}", content_hash[:12], document_id)
+        index = vector_store.active()
+        model = index.version.embedding_model
+        start_index = 0
+        for records, embeddings in cached.iter_batches(get_settings().embedding_batch_size):
+            texts = [record.pop("text") for record in records]
+            if cached.embedding_model != model:
+                embeddings = self.embed_chunks(texts, model)
+            self._write_batch(
+                index, document_id, texts, embeddings, start_index, records, [record.get("page") for record in records]
+            )
+            start_index += len(texts)
+        self._finish(document_id, start_index, index)
+        return {
+            "text": cached.read_text(ENRICHMENT_TEXT_CHARS),
+            "chunk_count": cached.chunk_count,
+            **cached.insights,
+            "cache_hit": True,
+        }
+
+    @staticmethod
+    def _insights(enrichment: EnrichmentResult, tables: list[dict[str, Any]]) -> dict[str, Any]:
         return {
-            "text": text,
-            "chunks": chunks,
-            "summary": summary,
-            "key_points": key_points,
-            "sentiment": sentiment,
-            "category": category,
-            "tables": tables,
+            "summary": enrichment.summary,
+            "key_points": enrichment.key_points,
+            "sentiment": enrichment.sentiment,
+            "category": enrichment.category,
+            "tables": summarize_tables(tables),
+            "enrichment": enrichment.stats(),
         }
 
+    def process(
+        self,
+        document_id: int,
+        file_path: Path,
+        content_hash: str | None = None,
+        enrichment_mode: str | None = None,
+    ) -> dict[str, Any]:
+        """Run the full pipeline with memory bounded by one page plus one embedding batch.
+
+        Pages stream through chunking, embedding and upserts; only the leading
+        ``ENRICHMENT_TEXT_CHARS`` characters (all the enrichment prompts read) and
+        the extracted tables are retained. The returned ``text`` is that prefix.
+        Hierarchical enrichment reads the whole text, so in that mode the chunk
+        texts are kept too, packed into sections. With a ``content_hash`` the
+        whole text, chunk spans and tables go to the artifact store as they pass.
+        """
+        self._reset_index(document_id)
+        cached = self._replay_cached(document_id, content_hash)
+        if cached is not None:
+            return cached
+
+        head: list[str] = []
+        head_chars = 0
+        tables = TableScanner()
+        index = vector_store.active()
+        cache_writer = artifact_cache.writer(content_hash, index.version.embedding_model) if content_hash else None
+        artifacts = artifact_store.writer(content_hash) if content_hash else None
+        sections = self._section_packer(enrichment_mode)
+
+        def pages() -> Iterator[tuple[int, str]]:
+            nonlocal head_chars
+            for page_number, text in self.iter_pages(file_path):
+                if head_chars < ENRICHMENT_TEXT_CHARS:
+                    head.append(text[: ENRICHMENT_TEXT_CHARS - head_chars])
+                    head_chars += len(head[-1])
+                tables.feed(text)
+                if artifacts is not None:
+                    artifacts.add_page(page_number, text)
+                yield page_number, text
+
+        try:
+            chunk_count = self.index_chunks(
+                document_id, self.iter_chunks(pages()), cache_writer, sections, index, artifacts
+            )
+            if artifacts is not None:
+                artifacts.add_tables(tables.finish())
+                artifacts.commit()
+            text = "".join(head)
+            enrichment = self.enrich(
+                text, mode=enrichment_mode, sections=sections.finish() if sections is not None else None
+            )
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.abort()
+            if artifacts is not None:
+                artifacts.abort()
+            raise
+
+        insights = self._insights(enrichment, tables.finish())
+        if cache_writer is not None:
+            cache_writer.commit(insights)
+
+        return {"text": text, "chunk_count": chunk_count, **insights, "cache_hit": False}
+
+    def analyze(self, file_path: Path, enrichment_mode: str | None = None) -> dict[str, Any]:
+        """Extract and enrich ``file_path`` without indexing it anywhere.
+
+        For ad-hoc analysis of a file that is not a stored ``Document``: nothing
+        is written to the vector store, chunk store, search index or caches.
+        Unlike ``process``, the returned ``text`` is the whole extracted text.
+        """
+        texts: list[str] = []
+        tables = TableScanner()
+        sections = self._section_packer(enrichment_mode)
+
+        def pages() -> Iterator[tuple[int, str]]:
+            for page_number, text in self.iter_pages(file_path):
+                texts.append(text)
+                tables.feed(text)
+                yield page_number, text
+
+        if sections is not None:
+            sections.add(chunk.text for chunk in self.iter_chunks(pages()))
+        else:
+            for _ in pages():
+                pass
+        text = "".join(texts)
+        enrichment = self.enrich(
+            text[:ENRICHMENT_TEXT_CHARS],
+            mode=enrichment_mode,
+            sections=sections.finish() if sections is not None else None,
+        )
+        return {"text": text, **self._insights(enrichment, tables.finish())}
+
+    # Staged pipeline: the same work as ``process`` split at its CPU/IO boundaries so each
+    # stage can run on its own Celery queue. Stages communicate through a ``StageWorkspace``.
+
+    def extract_stage(
+        self,
+        document_id: int,
+        file_path: Path,
+        workspace: StageWorkspace,
+        content_hash: str | None = None,
+    ) -> dict[str, Any]:
+        """Stage 1 (CPU): write pages, enrichment head and tables to the workspace.
+
+        A cache hit is indexed right away and its result stored, so the later
+        stages have nothing left to do.
+        """
+        self._reset_index(document_id)
+        cached = self._replay_cached(document_id, content_hash)
+        if cached is not None:
+            return workspace.update_state(result=cached)
+
+        head: list[str] = []
+        head_chars = 0
+        tables = TableScanner()
+
+        def pages() -> Iterator[tuple[int, str]]:
+            nonlocal head_chars
+            for page_number, text in self.iter_pages(file_path):
+                if head_chars < ENRICHMENT_TEXT_CHARS:
+                    head.append(text[: ENRICHMENT_TEXT_CHARS - head_chars])
+                    head_chars += len(head[-1])
+                tables.feed(text)
+                yield page_number, text
+
+        page_count = workspace.write_pages(pages())
+        workspace.head_path.write_text("".join(head), "utf-8")
+        workspace.tables_path.write_text(json.dumps(tables.finish()), "utf-8")
+        return workspace.update_state(page_count=page_count)
+
+    def index_stage(
+        self,
+        document_id: int,
+        workspace: StageWorkspace,
+        content_hash: str | None = None,
+    ) -> dict[str, Any]:
+        """Stage 2 (CPU): chunk, embed and upsert the extracted pages, and store the document's artifacts.
+
+        When hierarchical enrichment is configured the chunk texts are also
+        written to the workspace, packed into sections, for the enrich stage.
+        """
+        state = workspace.read_state()
+        if "result" in state:
+            return state
+
+        index = vector_store.active()
+        cache_writer = artifact_cache.writer(content_hash, index.version.embedding_model) if content_hash else None
+        artifacts = artifact_store.writer(content_hash) if content_hash else None
+        sections = self._section_packer(None)
+
+        def pages() -> Iterator[tuple[int, str]]:
+            for page_number, text in workspace.iter_pages():
+                if artifacts is not None:
+                    artifacts.add_page(page_number, text)
+                yield page_number, text
+
+        try:
+            chunk_count = self.index_chunks(
+                document_id, self.iter_chunks(pages()), cache_writer, sections, index, artifacts
+            )
+            if artifacts is not None:
+                artifacts.add_tables(json.loads(workspace.tables_path.read_text("utf-8")))
+                artifacts.commit()
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.abort()
+            if artifacts is not None:
+                artifacts.abort()
+            raise
+        if sections is not None:
+            workspace.sections_path.write_text(json.dumps(sections.finish()), "utf-8")
+        return workspace.update_state(
+            chunk_count=chunk_count,
+            cache_writer=cache_writer.detach() if cache_writer is not None else None,
+        )
+
+    def enrich_stage(
+        self,
+        workspace: StageWorkspace,
+        content_hash: str | None = None,
+        enrichment_mode: str | None = None,
+    ) -> dict[str, Any]:
+        """Stage 3 (IO): run the LLM enrichment and commit the artifact cache entry."""
+        state = workspace.read_state()
+        if "result" in state:
+            return state["result"]
+
+        detached = state.get("cache_writer")
+        cache_writer = artifact_cache.reattach(content_hash, detached) if content_hash and detached else None
+        try:
+            text = workspace.head_path.read_text("utf-8")
+            sections_path = workspace.sections_path
+            sections = json.loads(sections_path.read_text("utf-8")) if sections_path.exists() else None
+            enrichment = self.enrich(text, mode=enrichment_mode, sections=sections)
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.abort()
+            raise
 
+        insights = self._insights(enrichment, json.loads(workspace.tables_path.read_text("utf-8")))
+        if cache_writer is not None:
+            cache_writer.commit(insights)
+        return {"text": text, "chunk_count": state["chunk_count"], **insights, "cache_hit": False}
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import get_settings
+from app.services.embeddings import embedding_service_for
+from app.services.registry import lazy
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embed requests into batched encode calls.
+
+    Callers get a ``Future`` back. A dispatcher thread takes the first queued
+    request, keeps collecting until ``max_batch_size`` requests are queued or
+    ``max_wait_ms`` has passed, and then runs one ``SentenceTransformer.encode``
+    for the whole batch (one per model, if requests name different models).
+    Under load this replaces many batch-size-1 forward passes competing for
+    the CPU with a few larger ones.
+    """
+
+    def __init__(self, max_batch_size: int | None = None, max_wait_ms: float | None = None) -> None:
+        settings = get_settings()
+        self.max_batch_size = max_batch_size or settings.embedding_batch_max_size
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.embedding_batch_max_wait_ms) / 1000
+        self._queue: queue.SimpleQueue[tuple[str, str | None, Future]] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def _ensure_dispatcher(self) -> None:
+        # Threads do not survive fork, so (re)start the dispatcher in each process.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                threading.Thread(target=self._run, name="embedding-batcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, text: str, model: str | None = None) -> Future:
+        """Embed ``text`` with ``model`` (the configured embedding model by default)."""
+        self._ensure_dispatcher()
+        future: Future = Future()
+        self._queue.put((text, model, future))
+        return future
+
+    def embed_one(self, text: str, model: str | None = None) -> np.ndarray:
+        return self.submit(text, model).result()
+
+    async def aembed_one(self, text: str, model: str | None = None) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(text, model))
+
+    def _collect(self) -> list[tuple[str, str | None, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            by_model: dict[str | None, list[tuple[str, Future]]] = {}
+            for text, model, future in self._collect():
+                if future.set_running_or_notify_cancel():
+                    by_model.setdefault(model, []).append((text, future))
+            for model, batch in by_model.items():
+                self._embed(model, batch)
+
+    @staticmethod
+    def _embed(model: str | None, batch: list[tuple[str, Future]]) -> None:
+        try:
+            vectors = embedding_service_for(model).embed([text for text, _ in batch])
+        except Exception as exc:
+            logger.exception("Batched embedding of {} text(s) failed: {}", len(batch), exc)
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+
+embedding_batcher = lazy("embedding_batcher", EmbeddingBatcher)
+
+__all__ = ["EmbeddingBatcher", "embedding_batcher"]
@@ -1,37 +1,74 @@
 from __future__ import annotations
 
 from functools import lru_cache
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from app.core.config import get_settings
+from app.core.metrics import EMBEDDING_BATCH_SECONDS, EMBEDDING_BATCH_SIZE
+from app.services.registry import lazy
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 
 @lru_cache
 def _load_model(model_name: str) -> SentenceTransformer:
+    # Imported here: sentence-transformers pulls in torch, which takes seconds to import.
+    from sentence_transformers import SentenceTransformer
+
     return SentenceTransformer(model_name)
 
 
 class EmbeddingService:
-    def __init__(self) -> None:
-        settings = get_settings()
-        self.model = _load_model(settings.embedding_model)
-
-    def embed(self, texts: Iterable[str]) -> list[list[float]]:
-        vectors = self.model.encode(
-            list(texts),
-            convert_to_numpy=True,
-            show_progress_bar=False,
-            normalize_embeddings=True,
-        )
-        return [vector.tolist() for vector in vectors]
-
-    def embed_one(self, text: str) -> list[float]:
+    def __init__(self, model_name: str | None = None) -> None:
+        self.model_name = model_name or get_settings().embedding_model
+        self.model = _load_model(self.model_name)
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """Normalized embeddings as a C-contiguous float32 ``(n, dim)`` matrix."""
+        texts = list(texts)
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        with EMBEDDING_BATCH_SECONDS.time():
+            vectors = self.model.encode(
+                texts,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                normalize_embeddings=True,
+            )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def embed_one(self, text: str) -> np.ndarray:
         return self.embed([text])[0]
 
 
-embedding_service = EmbeddingService()
+embedding_service = lazy("embedding_service", EmbeddingService)
+
+
+@lru_cache
+def _service_for(model_name: str) -> EmbeddingService:
+    return EmbeddingService(model_name)
+
+
+def embedding_service_for(model_name: str | None) -> EmbeddingService:
+    """The service embedding with ``model_name``, e.g. an index version's; ``None`` is the configured model.
+
+    Differs from ``embedding_service`` only while an index built with another
+    model is still active or being built.
+    """
+    if model_name is None or model_name == get_settings().embedding_model:
+        return embedding_service
+    return _service_for(model_name)
+
 
-__all__ = ["EmbeddingService", "embedding_service"]
+__all__ = ["EmbeddingService", "embedding_service", "embedding_service_for"]
 
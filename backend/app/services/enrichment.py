@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Sequence
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.services.llm_client import LLMUsage, llm_client
+from app.services.registry import lazy
+
+ENRICHMENT_MODES = ("concurrent", "fused", "hierarchical")
+# Longest prefix the concurrent and fused prompts read (see LLMClient); callers need not keep
+# more for those modes. Hierarchical mode reads the whole document as ``SectionPacker`` sections.
+ENRICHMENT_TEXT_CHARS = 6000
+
+
+@dataclass
+class EnrichmentResult:
+    summary: str
+    key_points: list[str]
+    sentiment: str
+    category: str
+    mode: str
+    wall_clock_ms: float
+    usage: LLMUsage = field(default_factory=LLMUsage)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "wall_clock_ms": round(self.wall_clock_ms, 1),
+            **self.usage.as_dict(),
+        }
+
+
+class SectionPacker:
+    """Groups consecutive chunks into sections of at most ``max_tokens`` tokens.
+
+    Chunks hold at most ``chunk_tokens`` tokens each, so packing a fixed number
+    of them bounds every section without tokenizing the text again.
+    """
+
+    def __init__(self, max_tokens: int | None = None, chunk_tokens: int | None = None) -> None:
+        settings = get_settings()
+        max_tokens = max_tokens or settings.enrichment_section_tokens
+        chunk_tokens = chunk_tokens or settings.chunk_max_tokens
+        self.chunks_per_section = max(1, max_tokens // chunk_tokens)
+        self.sections: list[str] = []
+        self._pending: list[str] = []
+
+    def add(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self._pending.append(text)
+            if len(self._pending) == self.chunks_per_section:
+                self.sections.append(" ".join(self._pending))
+                self._pending = []
+
+    def finish(self) -> list[str]:
+        if self._pending:
+            self.sections.append(" ".join(self._pending))
+            self._pending = []
+        return self.sections
+
+
+def select_sections(sections: Sequence[str], max_sections: int) -> list[str]:
+    """All sections, or ``max_sections`` spread evenly over the document when there are more."""
+    if len(sections) <= max_sections:
+        return list(sections)
+    step = (len(sections) - 1) / (max_sections - 1) if max_sections > 1 else 0
+    return [sections[round(i * step)] for i in range(max_sections)]
+
+
+def group_by_chars(texts: Sequence[str], max_chars: int) -> list[list[str]]:
+    """Consecutive groups within ``max_chars``, at least two texts each so every round shrinks."""
+    groups: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for text in texts:
+        if len(current) >= 2 and size + len(text) > max_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text)
+    if len(current) == 1 and groups:
+        groups[-1].extend(current)
+    elif current:
+        groups.append(current)
+    return groups
+
+
+class EnrichmentService:
+    """Produce summary, key points, sentiment and category for a document.
+
+    In ``concurrent`` mode the four prompts run on a bounded thread pool, so a
+    document pays roughly one LLM round trip instead of four. In ``fused`` mode a
+    single JSON-schema request returns all four fields at once. Both read only
+    the document's first ``ENRICHMENT_TEXT_CHARS``.
+
+    ``hierarchical`` mode covers the whole document: its sections (at most
+    ``enrichment_max_sections``) are summarized concurrently, the partial
+    summaries are combined in rounds until they fit
+    ``enrichment_reduce_max_chars``, and one structured request derives the
+    insights from them. Wall-clock time grows with the number of rounds, not
+    the number of sections. Every summary lands in the LLM response cache as
+    it completes, even with ``LLM_CACHE_ENABLED=false``, so a retried document
+    only pays for the sections that failed.
+    """
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.mode = settings.enrichment_mode
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.enrichment_max_workers,
+            thread_name_prefix="enrichment",
+        )
+        self.section_executor = ThreadPoolExecutor(
+            max_workers=settings.enrichment_section_concurrency,
+            thread_name_prefix="enrichment-section",
+        )
+        self.max_sections = settings.enrichment_max_sections
+        self.reduce_max_chars = settings.enrichment_reduce_max_chars
+
+    def _summarize_all(self, summarize: Callable[..., str], texts: Sequence[str], usage: LLMUsage) -> list[str]:
+        """``summarize`` every text concurrently.
+
+        Every request is allowed to finish (and be cached) before the first
+        failure is raised, so a retry only repeats the sections that failed.
+        """
+        futures = [self.section_executor.submit(summarize, text, usage=usage) for text in texts]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def _hierarchical(self, sections: Sequence[str], usage: LLMUsage) -> dict[str, Any]:
+        selected = select_sections(sections, self.max_sections)
+        if len(selected) < len(sections):
+            logger.warning("Summarizing {} of {} sections, spread over the document", len(selected), len(sections))
+
+        partials = self._summarize_all(llm_client.summarize_section, selected, usage)
+        while len(partials) > 1 and sum(len(partial) for partial in partials) > self.reduce_max_chars:
+            groups = ["\n\n".join(group) for group in group_by_chars(partials, self.reduce_max_chars)]
+            partials = self._summarize_all(llm_client.combine_summaries, groups, usage)
+        return llm_client.reduce_insights(partials, usage=usage)
+
+    def enrich(self, text: str, mode: str | None = None, sections: Sequence[str] | None = None) -> EnrichmentResult:
+        """Insights for a document; ``sections`` (the whole document) is used in hierarchical mode."""
+        mode = mode or self.mode
+        if mode not in ENRICHMENT_MODES:
+            raise ValueError(f"Unknown enrichment mode {mode!r}; expected one of {ENRICHMENT_MODES}")
+
+        usage = LLMUsage()
+        started = time.perf_counter()
+        if mode == "hierarchical":
+            insights = self._hierarchical(sections or [text], usage)
+        elif mode == "fused":
+            insights = llm_client.structured_insights(text, usage=usage)
+        else:
+            futures = {
+                "summary": self.executor.submit(llm_client.summarize, text, usage=usage),
+                "key_points": self.executor.submit(llm_client.key_points, text, usage=usage),
+                "sentiment": self.executor.submit(llm_client.classify_sentiment, text, usage=usage),
+                "category": self.executor.submit(llm_client.classify_category, text, usage=usage),
+            }
+            insights = {name: future.result() for name, future in futures.items()}
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        result = EnrichmentResult(mode=mode, wall_clock_ms=elapsed_ms, usage=usage, **insights)
+        logger.info(
+            "Enrichment ({}) took {:.0f} ms over {} call(s) and {} cached, {} input / {} output tokens",
+            mode,
+            elapsed_ms,
+            usage.calls,
+            usage.cached_calls,
+            usage.input_tokens,
+            usage.output_tokens,
+        )
+        return result
+
+
+enrichment_service = lazy("enrichment_service", EnrichmentService)
+
+__all__ = [
+    "ENRICHMENT_MODES",
+    "ENRICHMENT_TEXT_CHARS",
+    "EnrichmentResult",
+    "EnrichmentService",
+    "SectionPacker",
+    "enrichment_service",
+    "group_by_chars",
+    "select_sections",
+]
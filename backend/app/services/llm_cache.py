@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.metrics import LLM_CACHE_REQUESTS
+from app.services.registry import lazy
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at);
+"""
+
+# A hit refreshes ``accessed_at`` at most this often, so reads almost never write.
+_TOUCH_INTERVAL_SECONDS = 3600
+
+
+@dataclass
+class CachedResponse:
+    text: str
+    input_tokens: int
+    output_tokens: int
+
+
+def request_key(
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    text_format: dict[str, Any] | None = None,
+) -> str:
+    """Content hash of everything that determines a completion."""
+    payload = json.dumps([model, system_prompt, user_prompt, max_tokens, text_format], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """Persistent memo of LLM completions keyed by ``request_key``, in sharded SQLite files.
+
+    Keys are spread over ``llm_cache_shards`` WAL databases by their first
+    hex digits, so workers writing through concurrently rarely wait on the
+    same file lock. Each thread gets its own connections. Entries are evicted
+    by ``collect_garbage`` when not used within the age limit, or least
+    recently used first when the cache outgrows its size limit.
+    """
+
+    def __init__(self, path: Path | None = None, shards: int | None = None) -> None:
+        settings = get_settings()
+        self.path = path or settings.llm_cache_path
+        self.shards = shards or settings.llm_cache_shards
+        self.enabled = settings.llm_cache_enabled
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        for shard in range(self.shards):
+            with self._connect(shard) as conn:
+                conn.executescript(_SCHEMA)
+
+    def _connect(self, shard: int) -> sqlite3.Connection:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(shard)
+        if conn is None:
+            conn = sqlite3.connect(self.path / f"shard-{shard:02d}.db", timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conns[shard] = conn
+        return conn
+
+    def _shard(self, key: str) -> int:
+        return int(key[:4], 16) % self.shards
+
+    def reset_connections(self) -> None:
+        """Forget connections inherited across ``fork()``; each process opens its own."""
+        self._local = threading.local()
+
+    def _count(self, kind: str, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        LLM_CACHE_REQUESTS.labels(kind, "hit" if hit else "miss").inc()
+
+    def get(self, key: str, kind: str = "other") -> CachedResponse | None:
+        conn = self._connect(self._shard(key))
+        row = conn.execute(
+            "SELECT text, input_tokens, output_tokens, accessed_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        self._count(kind, row is not None)
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[3] > _TOUCH_INTERVAL_SECONDS:
+            with conn:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return CachedResponse(row[0], row[1], row[2])
+
+    def put(self, key: str, text: str, input_tokens: int = 0, output_tokens: int = 0) -> None:
+        now = time.time()
+        with self._connect(self._shard(key)) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, text, input_tokens, output_tokens, len(text.encode()), now, now),
+            )
+
+    def collect_garbage(self, max_age_seconds: int | None = None, max_bytes: int | None = None) -> int:
+        """Drop entries unused for ``max_age_seconds``, then the least recently used
+        beyond ``max_bytes`` of response text. Returns the number removed."""
+        settings = get_settings()
+        max_age_seconds = max_age_seconds or settings.llm_cache_max_age_seconds
+        max_bytes = max_bytes or settings.llm_cache_max_mb * 1024 * 1024
+        cutoff = time.time() - max_age_seconds
+        shard_bytes = max_bytes // self.shards
+        removed = 0
+        for shard in range(self.shards):
+            with self._connect(shard) as conn:
+                removed += conn.execute("DELETE FROM responses WHERE accessed_at < ?", (cutoff,)).rowcount
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total <= shard_bytes:
+                    continue
+                excess, keys = total - shard_bytes, []
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+                    keys.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+                removed += len(keys)
+        if removed:
+            logger.info("Evicted {} cached LLM responses", removed)
+        return removed
+
+    def stats(self) -> dict[str, Any]:
+        entries = size = 0
+        for shard in range(self.shards):
+            count, total = self._connect(shard).execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            entries += count
+            size += total
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+llm_cache = lazy("llm_cache", LLMResponseCache)
+
+__all__ = ["CachedResponse", "LLMResponseCache", "llm_cache", "request_key"]
@@ -1,87 +1,555 @@
 from __future__ import annotations
 
-from typing import List, Sequence
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Sequence
 
+import httpx
 from loguru import logger
-from openai import OpenAI
 
 from app.core.config import get_settings
+from app.core.metrics import LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+from app.services.llm_cache import CachedResponse, llm_cache, request_key
+from app.services.llm_rate_limiter import Permit, llm_rate_limiter
+from app.services.registry import lazy
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# Bump whenever a prompt below changes so cached insights are not reused.
+PROMPT_VERSION = "1"
+
+INSIGHTS_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "key_points": {"type": "array", "items": {"type": "string"}},
+        "sentiment": {"type": "string", "enum": ["positive", "neutral", "negative"]},
+        "category": {"type": "string"},
+    },
+    "required": ["summary", "key_points", "sentiment", "category"],
+    "additionalProperties": False,
+}
+
+COMPARISON_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "similarities": {"type": "string"},
+        "differences": {"type": "string"},
+    },
+    "required": ["similarities", "differences"],
+    "additionalProperties": False,
+}
+
+
+@dataclass
+class LLMUsage:
+    """Token and call counters accumulated across one or more completions.
+
+    ``calls`` and the token counts cover requests actually sent;
+    ``cached_calls`` counts completions served from the response cache.
+    """
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_calls: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+    def add_cached(self) -> None:
+        with self._lock:
+            self.cached_calls += 1
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_calls": self.cached_calls,
+        }
 
 
 class LLMClient:
-    """Thin wrapper around the OpenAI Responses API with sensible defaults."""
+    """Thin wrapper around the OpenAI Responses API with sensible defaults.
+
+    Workers use the synchronous client; the API uses ``async_client``, which
+    shares one pooled ``httpx.AsyncClient`` across requests. Non-streaming
+    completions are memoized in ``llm_cache`` unless called with ``cache=False``.
+
+    Every request is admitted by ``llm_rate_limiter`` under a priority:
+    ``batch`` by default for the synchronous methods (worker enrichment),
+    ``interactive`` for the async ones and for questions. Throttled, 5xx and
+    connection-failed requests are retried here, with jittered backoff, rather
+    than by the OpenAI client.
+    """
 
     def __init__(self) -> None:
+        # Imported here: the openai package's generated types take a few hundred ms to import.
+        from openai import AsyncOpenAI, OpenAI
+
         self.settings = get_settings()
-        self.client = OpenAI(
+        self.client: OpenAI = OpenAI(
             api_key=self.settings.llm_api_key,
             base_url=self.settings.llm_base_url,
+            max_retries=0,
+        )
+        self.async_client: AsyncOpenAI = AsyncOpenAI(
+            api_key=self.settings.llm_api_key,
+            base_url=self.settings.llm_base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.settings.llm_max_connections,
+                    max_keepalive_connections=self.settings.llm_max_connections,
+                ),
+                timeout=httpx.Timeout(self.settings.llm_timeout_seconds, connect=10.0),
+            ),
         )
         self.model = self.settings.llm_model
 
-    def _complete(self, system_prompt: str, user_prompt: str, max_tokens: int = 500) -> str:
+    def _request(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        text_format: dict[str, Any] | None,
+    ) -> dict[str, Any]:
+        request: dict[str, Any] = {
+            "model": self.model,
+            "max_output_tokens": max_tokens,
+            "input": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+        }
+        if text_format is not None:
+            request["text"] = {"format": text_format}
+        return request
+
+    @staticmethod
+    def _observe(kind: str, outcome: str, started: float, response_usage: Any = None) -> None:
+        LLM_REQUEST_SECONDS.labels(kind, outcome).observe(time.perf_counter() - started)
+        if response_usage is not None:
+            LLM_TOKENS.labels(kind, "input").observe(response_usage.input_tokens)
+            LLM_TOKENS.labels(kind, "output").observe(response_usage.output_tokens)
+
+    @staticmethod
+    def _retry_reason(exc: Exception) -> str | None:
+        from openai import APIConnectionError, APIStatusError
+
+        if isinstance(exc, APIStatusError):
+            if exc.status_code == 429:
+                return "throttled"
+            return "server_error" if exc.status_code >= 500 else None
+        # Includes APITimeoutError.
+        return "connection" if isinstance(exc, APIConnectionError) else None
+
+    def _retry_delay(self, exc: Exception, attempt: int, reason: str, kind: str) -> float:
+        """The provider's ``Retry-After`` if it sent one, else full-jitter exponential backoff."""
+        response = getattr(exc, "response", None)
+        headers = response.headers if response is not None else {}
+        delay = None
         try:
-            response = self.client.responses.create(
-                model=self.model,
-                max_output_tokens=max_tokens,
-                input=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+            if "retry-after-ms" in headers:
+                delay = float(headers["retry-after-ms"]) / 1000
+            elif "retry-after" in headers:
+                delay = float(headers["retry-after"])
+        except ValueError:  # an HTTP date rather than seconds
+            pass
+        if delay is None:
+            ceiling = self.settings.llm_retry_base_seconds * 2**attempt
+            delay = random.uniform(0, min(self.settings.llm_retry_max_seconds, ceiling))
+        LLM_RETRIES.labels(kind, reason).inc()
+        logger.warning("LLM request failed ({}, {}); retry {} in {:.2f}s", reason, kind, attempt + 1, delay)
+        return delay
+
+    def _send(self, request: dict[str, Any], priority: str, kind: str) -> Any:
+        """``responses.create`` once admitted by the rate limiter, retrying transient failures."""
+        tokens = llm_rate_limiter.estimate_tokens(request)
+        attempt = 0
+        while True:
+            permit = llm_rate_limiter.acquire(priority, tokens)
+            try:
+                response = self.client.responses.create(**request)
+            except Exception as exc:
+                reason = self._retry_reason(exc)
+                permit.release("throttled" if reason == "throttled" else "error")
+                if reason is None or attempt >= self.settings.llm_max_retries:
+                    raise
+                delay = self._retry_delay(exc, attempt, reason, kind)
+                if reason == "throttled":
+                    llm_rate_limiter.pause(delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            permit.release("ok", self._total_tokens(getattr(response, "usage", None)))
+            return response
+
+    async def _asend(self, request: dict[str, Any], priority: str, kind: str, **kwargs: Any) -> tuple[Any, Permit]:
+        """Async ``_send``. The permit is returned unreleased, for streams that are still running;
+        ``_acomplete`` releases it at once."""
+        tokens = llm_rate_limiter.estimate_tokens(request)
+        attempt = 0
+        while True:
+            permit = await llm_rate_limiter.aacquire(priority, tokens)
+            try:
+                response = await self.async_client.responses.create(**request, **kwargs)
+            except BaseException as exc:
+                if not isinstance(exc, Exception):  # cancelled
+                    await permit.arelease("cancelled")
+                    raise
+                reason = self._retry_reason(exc)
+                await permit.arelease("throttled" if reason == "throttled" else "error")
+                if reason is None or attempt >= self.settings.llm_max_retries:
+                    raise
+                delay = self._retry_delay(exc, attempt, reason, kind)
+                if reason == "throttled":
+                    await llm_rate_limiter.apause(delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            return response, permit
+
+    @staticmethod
+    def _total_tokens(response_usage: Any) -> int | None:
+        if response_usage is None:
+            return None
+        return response_usage.input_tokens + response_usage.output_tokens
+
+    @staticmethod
+    def _output_text(response: Any, usage: LLMUsage | None) -> str:
+        if usage is not None and response.usage is not None:
+            usage.add(response.usage.input_tokens, response.usage.output_tokens)
+        text_chunks: list[str] = []
+        for output in response.output:
+            for content in getattr(output, "content", []):
+                # The Responses API labels generated text "output_text".
+                if getattr(content, "type", None) in ("output_text", "text"):
+                    text_chunks.append(content.text)
+        return " ".join(text_chunks).strip()
+
+    def _cache_key(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        text_format: dict[str, Any] | None,
+        cache: bool,
+        checkpoint: bool = False,
+    ) -> str | None:
+        if not cache or not (self.settings.llm_cache_enabled or checkpoint):
+            return None
+        return request_key(self.model, system_prompt, user_prompt, max_tokens, text_format)
+
+    @staticmethod
+    def _cached_text(cached: CachedResponse | None, usage: LLMUsage | None) -> str | None:
+        if cached is not None and usage is not None:
+            usage.add_cached()
+        return cached.text if cached is not None else None
+
+    @staticmethod
+    def _cache_put(key: str | None, text: str, response: Any) -> None:
+        # Empty output (e.g. cut off by max_tokens before any text) is not worth replaying.
+        if key is None or not text:
+            return
+        response_usage = response.usage
+        llm_cache.put(
+            key,
+            text,
+            response_usage.input_tokens if response_usage is not None else 0,
+            response_usage.output_tokens if response_usage is not None else 0,
+        )
+
+    def _complete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 500,
+        *,
+        text_format: dict[str, Any] | None = None,
+        usage: LLMUsage | None = None,
+        kind: str = "other",
+        cache: bool = True,
+        checkpoint: bool = False,
+        priority: str = "batch",
+    ) -> str:
+        """One completion, memoized in ``llm_cache``.
+
+        ``checkpoint`` completions are partial results of a multi-request job;
+        they are cached even with ``LLM_CACHE_ENABLED=false`` so that a retry
+        of the job resumes instead of starting over.
+        """
+        key = self._cache_key(system_prompt, user_prompt, max_tokens, text_format, cache, checkpoint)
+        if key is not None:
+            text = self._cached_text(llm_cache.get(key, kind), usage)
+            if text is not None:
+                return text
+        started = time.perf_counter()
+        try:
+            response = self._send(self._request(system_prompt, user_prompt, max_tokens, text_format), priority, kind)
+        except Exception as exc:  # pragma: no cover - network failure
+            self._observe(kind, "error", started)
+            logger.exception("LLM request failed: {}", exc)
+            raise
+        self._observe(kind, "ok", started, response.usage)
+        text = self._output_text(response, usage)
+        self._cache_put(key, text, response)
+        return text
+
+    async def _acomplete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 500,
+        *,
+        text_format: dict[str, Any] | None = None,
+        usage: LLMUsage | None = None,
+        kind: str = "other",
+        cache: bool = True,
+        priority: str = "interactive",
+    ) -> str:
+        key = self._cache_key(system_prompt, user_prompt, max_tokens, text_format, cache)
+        if key is not None:
+            # SQLite calls block, and a write may wait on another process's; keep them off the loop.
+            text = self._cached_text(await asyncio.to_thread(llm_cache.get, key, kind), usage)
+            if text is not None:
+                return text
+        started = time.perf_counter()
+        try:
+            response, permit = await self._asend(
+                self._request(system_prompt, user_prompt, max_tokens, text_format), priority, kind
             )
-            text_chunks: list[str] = []
-            for output in response.output:
-                for content in getattr(output, "content", []):
-                    if getattr(content, "type", None) == "text":
-                        text_chunks.append(content.text)
-            return " ".join(text_chunks).strip()
+            await permit.arelease("ok", self._total_tokens(response.usage))
         except Exception as exc:  # pragma: no cover - network failure
+            self._observe(kind, "error", started)
             logger.exception("LLM request failed: {}", exc)
             raise
+        self._observe(kind, "ok", started, response.usage)
+        text = self._output_text(response, usage)
+        if key is not None and text:
+            await asyncio.to_thread(self._cache_put, key, text, response)
+        return text
+
+    async def _astream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 500,
+        *,
+        kind: str = "other",
+        priority: str = "interactive",
+    ) -> AsyncIterator[str]:
+        """Yield output text deltas as the model produces them.
+
+        Closing the generator early (for instance when the consumer is
+        cancelled) closes the HTTP response, which aborts the upstream request.
+        """
+        started = time.perf_counter()
+        outcome, response_usage = "cancelled", None
+        try:
+            stream, permit = await self._asend(
+                self._request(system_prompt, user_prompt, max_tokens, None), priority, kind, stream=True
+            )
+        except Exception:
+            self._observe(kind, "error", started)
+            raise
+        try:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    response_usage = event.response.usage
+                elif event.type in ("response.failed", "error"):
+                    raise RuntimeError(f"LLM stream failed: {event}")
+            outcome = "ok"
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            self._observe(kind, outcome, started, response_usage)
+            # A cancellation while closing must not skip the release, or the concurrency slot leaks.
+            try:
+                await stream.close()
+            finally:
+                await permit.arelease(outcome, self._total_tokens(response_usage))
 
-    def summarize(self, text: str) -> str:
+    async def aclose(self) -> None:
+        await self.async_client.close()
+
+    def summarize(self, text: str, usage: LLMUsage | None = None) -> str:
         prompt = (
             "Summarize the following document in 4-6 concise sentences. "
             "Focus on the core themes and key facts."
         )
-        return self._complete(prompt, text[:6000], max_tokens=350)
+        return self._complete(prompt, text[:6000], max_tokens=350, usage=usage, kind="summary")
 
-    def key_points(self, text: str, max_points: int = 5) -> list[str]:
+    def key_points(self, text: str, max_points: int = 5, usage: LLMUsage | None = None) -> list[str]:
         prompt = (
             f"List the {max_points} most important bullet points from the document. "
             "Return them as a plain list separated by newline characters."
         )
-        output = self._complete(prompt, text[:6000], max_tokens=300)
+        output = self._complete(prompt, text[:6000], max_tokens=300, usage=usage, kind="key_points")
         points = [line.strip("-• ").strip() for line in output.splitlines() if line.strip()]
         return [p for p in points if p][:max_points]
 
-    def classify_sentiment(self, text: str) -> str:
+    def classify_sentiment(self, text: str, usage: LLMUsage | None = None) -> str:
         prompt = (
             "Classify the overall sentiment of this document as Positive, Neutral, or Negative. "
             "Respond with a single word."
         )
-        sentiment = self._complete(prompt, text[:4000], max_tokens=5)
+        sentiment = self._complete(prompt, text[:4000], max_tokens=5, usage=usage, kind="sentiment")
         return sentiment.strip().lower()
 
-    def classify_category(self, text: str) -> str:
+    def classify_category(self, text: str, usage: LLMUsage | None = None) -> str:
         prompt = (
             "Classify this document into a high-level category "
             "(e.g., Finance, Legal, Marketing, Technical, HR, Medical, Other). "
             "Respond with just the category."
         )
-        category = self._complete(prompt, text[:4000], max_tokens=10)
+        category = self._complete(prompt, text[:4000], max_tokens=10, usage=usage, kind="category")
         return category.strip()
 
-    def answer_question(self, question: str, context: str) -> str:
+    def structured_insights(
+        self,
+        text: str,
+        max_points: int = 5,
+        usage: LLMUsage | None = None,
+    ) -> dict[str, Any]:
+        """Return summary, key points, sentiment and category from a single request."""
+        prompt = (
+            "Analyze the following document and return a JSON object with: "
+            "a 4-6 sentence `summary` focused on the core themes and key facts; "
+            f"`key_points`, the {max_points} most important bullet points; "
+            "the overall `sentiment` (positive, neutral or negative); and a high-level "
+            "`category` (e.g., Finance, Legal, Marketing, Technical, HR, Medical, Other)."
+        )
+        output = self._complete(
+            prompt,
+            text[:6000],
+            max_tokens=700,
+            text_format={
+                "type": "json_schema",
+                "name": "document_insights",
+                "schema": INSIGHTS_SCHEMA,
+                "strict": True,
+            },
+            usage=usage,
+            kind="insights",
+        )
+        return self._insights(json.loads(output), max_points)
+
+    def summarize_section(self, text: str, usage: LLMUsage | None = None) -> str:
+        """Summary of one section of a longer document (the map step of hierarchical enrichment)."""
+        prompt = (
+            "Summarize this section of a longer document in 3-5 sentences. Keep the names, "
+            "figures, dates and conclusions a reader of the whole document would need."
+        )
+        return self._complete(prompt, text, max_tokens=300, usage=usage, kind="section_summary", checkpoint=True)
+
+    def combine_summaries(self, summaries: str, usage: LLMUsage | None = None) -> str:
+        """Condense consecutive section summaries into one (an intermediate reduce step)."""
         prompt = (
+            "These are summaries of consecutive sections of one document, in order. Condense them "
+            "into a single summary of 5-8 sentences that keeps the key facts and figures."
+        )
+        return self._complete(prompt, summaries, max_tokens=450, usage=usage, kind="combine", checkpoint=True)
+
+    def reduce_insights(
+        self,
+        summaries: Sequence[str],
+        max_points: int = 5,
+        usage: LLMUsage | None = None,
+    ) -> dict[str, Any]:
+        """Structured insights for a whole document from its section summaries, in order."""
+        prompt = (
+            "You are given summaries of the sections of one document, in order. Return a JSON "
+            "object for the whole document with: a 4-6 sentence `summary` of its core themes and "
+            f"key facts; `key_points`, its {max_points} most important bullet points; its overall "
+            "`sentiment` (positive, neutral or negative); and a high-level `category` (e.g., "
+            "Finance, Legal, Marketing, Technical, HR, Medical, Other)."
+        )
+        output = self._complete(
+            prompt,
+            "\n\n".join(f"[Section {i}] {summary}" for i, summary in enumerate(summaries, start=1)),
+            max_tokens=700,
+            text_format={
+                "type": "json_schema",
+                "name": "document_insights",
+                "schema": INSIGHTS_SCHEMA,
+                "strict": True,
+            },
+            usage=usage,
+            kind="reduce",
+        )
+        return self._insights(json.loads(output), max_points)
+
+    @staticmethod
+    def _insights(data: dict[str, Any], max_points: int) -> dict[str, Any]:
+        return {
+            "summary": data["summary"].strip(),
+            "key_points": [p.strip() for p in data["key_points"] if p.strip()][:max_points],
+            "sentiment": data["sentiment"].strip().lower(),
+            "category": data["category"].strip(),
+        }
+
+    async def acompare_documents(self, overview: str, differences: str) -> dict[str, str]:
+        """Describe what compared documents share and how they differ.
+
+        Only an alignment ``overview`` and the ``differences`` found by chunk
+        alignment are sent, never the full documents.
+        """
+        prompt = (
+            "You compare documents. You are given an overview of how their sections align and the "
+            "sections that differ: sections found in only one document, and matched sections whose "
+            "wording changed. Return a JSON object with `similarities`, 2-4 sentences on what the "
+            "documents have in common, and `differences`, a concise description of the material "
+            "differences, naming the document each one comes from."
+        )
+        output = await self._acomplete(
+            prompt,
+            f"{overview}\n\n{differences}",
+            max_tokens=700,
+            text_format={
+                "type": "json_schema",
+                "name": "document_comparison",
+                "schema": COMPARISON_SCHEMA,
+                "strict": True,
+            },
+            kind="comparison",
+        )
+        data = json.loads(output)
+        return {"similarities": data["similarities"].strip(), "differences": data["differences"].strip()}
+
+    @staticmethod
+    def _answer_prompt(context: str) -> str:
+        return (
             "You are an assistant answering questions based strictly on the provided context. "
             "If the answer is not in the context, respond with \"I don't know\".\n\n"
             f"Context:\n{context}"
         )
-        return self._complete(prompt, question, max_tokens=400)
 
+    def answer_question(self, question: str, context: str) -> str:
+        return self._complete(
+            self._answer_prompt(context), question, max_tokens=400, kind="answer", priority="interactive"
+        )
+
+    async def aanswer_question(self, question: str, context: str) -> str:
+        return await self._acomplete(self._answer_prompt(context), question, max_tokens=400, kind="answer")
+
+    def astream_answer_question(self, question: str, context: str) -> AsyncIterator[str]:
+        return self._astream(self._answer_prompt(context), question, max_tokens=400, kind="answer")
 
-llm_client = LLMClient()
 
-__all__ = ["LLMClient", "llm_client"]
+llm_client = lazy("llm_client", LLMClient)
 
+__all__ = ["LLMClient", "LLMUsage", "PROMPT_VERSION", "llm_client"]
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.metrics import LLM_RATE_LIMIT_WAIT_SECONDS
+from app.services.registry import lazy
+
+if TYPE_CHECKING:
+    from redis import Redis
+    from redis.asyncio import Redis as AsyncRedis
+
+PRIORITIES = ("interactive", "batch")
+
+# Refills both buckets for the time since the last call, then takes one request and
+# ``tokens`` tokens if the caller's priority may: batch callers must leave a reserve
+# fraction of each bucket for interactive ones and hold off entirely while an
+# interactive caller is waiting. Returns 0 when granted, else milliseconds to wait.
+# Uses the Redis server's clock, so processes on different hosts agree on refills.
+_ACQUIRE = """
+local bucket, waiting, cooldown = KEYS[1], KEYS[2], KEYS[3]
+local rpm, tpm = tonumber(ARGV[1]), tonumber(ARGV[2])
+local tokens = math.min(tonumber(ARGV[3]), tpm)
+local interactive = ARGV[4] == "interactive"
+local reserve = tonumber(ARGV[5])
+
+local pause = redis.call("PTTL", cooldown)
+if pause > 0 then
+    return pause
+end
+
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local state = redis.call("HMGET", bucket, "requests", "tokens", "updated")
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local requests = math.min(rpm, (tonumber(state[1]) or rpm) + elapsed * rpm / 60000)
+local budget = math.min(tpm, (tonumber(state[2]) or tpm) + elapsed * tpm / 60000)
+
+local floor = interactive and 0 or reserve
+local wait = math.max(
+    (rpm * floor + 1 - requests) * 60000 / rpm,
+    (tpm * floor + tokens - budget) * 60000 / tpm,
+    0
+)
+if not interactive then
+    wait = math.max(wait, math.min(redis.call("PTTL", waiting), 250))
+end
+if wait <= 0 then
+    requests = requests - 1
+    budget = budget - tokens
+elseif interactive then
+    redis.call("SET", waiting, 1, "PX", ARGV[6])
+end
+redis.call("HSET", bucket, "requests", requests, "tokens", budget, "updated", now)
+redis.call("PEXPIRE", bucket, 120000)
+return math.ceil(wait)
+"""
+
+# Corrects the token bucket once a request's actual usage is known.
+_SETTLE = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("HINCRBYFLOAT", KEYS[1], "tokens", ARGV[1])
+end
+return 0
+"""
+
+
+class AdaptiveConcurrency:
+    """Additive-increase, multiplicative-decrease cap on this process's in-flight LLM requests.
+
+    Each success raises the limit by ``1 / limit`` (one per round of
+    requests); a throttled request halves it; other outcomes leave it. The shared buckets keep the
+    fleet under the provider's published limits; this keeps one process from
+    piling requests onto a provider that is pushing back anyway.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, outcome: str) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == "ok":
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome == "throttled":
+                self.limit = max(self.minimum, self.limit / 2)
+            self._condition.notify_all()
+
+
+@dataclass
+class Permit:
+    """One admitted request; ``release`` (or ``arelease``) it exactly once when it finishes."""
+
+    limiter: LLMRateLimiter
+    estimated_tokens: int
+
+    def _settle(self, outcome: str, actual_tokens: int | None) -> float:
+        if not self.limiter.enabled:
+            return 0
+        self.limiter.concurrency.release(outcome)
+        if actual_tokens is None:
+            # A failed request used none of its estimate; otherwise assume it used all of it.
+            actual_tokens = 0 if outcome in ("error", "throttled") else self.estimated_tokens
+        return self.estimated_tokens - actual_tokens
+
+    def release(self, outcome: str = "ok", actual_tokens: int | None = None) -> None:
+        refund = self._settle(outcome, actual_tokens)
+        if refund:
+            limiter = self.limiter
+            limiter._call(lambda: limiter._scripts()["settle"](keys=[limiter.bucket_key], args=[refund]))
+
+    async def arelease(self, outcome: str = "ok", actual_tokens: int | None = None) -> None:
+        # The concurrency slot is freed before the first await, so a cancelled refund cannot leak it.
+        refund = self._settle(outcome, actual_tokens)
+        if refund:
+            limiter = self.limiter
+            await limiter._acall(lambda: limiter._async_scripts()["settle"](keys=[limiter.bucket_key], args=[refund]))
+
+
+class LLMRateLimiter:
+    """Requests- and tokens-per-minute buckets shared by every API and worker process.
+
+    The buckets live in Redis (``settings.redis_url``) and are updated by one
+    Lua script per attempt, so all processes draw from the same provider
+    quota. Tokens are estimated before a request (prompt characters / 4 plus
+    ``max_tokens``) and corrected from the reported usage afterwards.
+    ``interactive`` callers (questions from the API) may use the whole
+    bucket and make ``batch`` callers (enrichment in workers) hold off while
+    they wait; batch callers only draw down to a reserve. A throttled
+    response pauses every process for its ``Retry-After``. If Redis is
+    unreachable requests go through unmetered rather than failing; with
+    ``llm_rate_limit_enabled`` off every request goes straight through.
+    """
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.enabled = settings.llm_rate_limit_enabled
+        self.redis_url = str(settings.redis_url)
+        self.requests_per_minute = settings.llm_requests_per_minute
+        self.tokens_per_minute = settings.llm_tokens_per_minute
+        self.batch_reserve = settings.llm_batch_reserve_fraction
+        self.max_wait_seconds = settings.llm_rate_limit_max_wait_seconds
+        # One hash tag, so the keys the scripts touch share a Redis Cluster slot.
+        self.bucket_key = f"llm_rate:{{{settings.llm_model}}}"
+        self.waiting_key = f"{self.bucket_key}:interactive_waiting"
+        self.cooldown_key = f"{self.bucket_key}:cooldown"
+        self.concurrency = AdaptiveConcurrency(
+            settings.llm_concurrency_initial,
+            settings.llm_concurrency_min,
+            settings.llm_concurrency_max,
+        )
+        self._redis: Redis | None = None
+        self._async_redis: AsyncRedis | None = None
+        self._sync: dict[str, Any] = {}
+        self._async: dict[str, Any] = {}
+        self._unavailable_logged = 0.0
+
+    # Clients are created on first use: the sync one in workers, the async one in the API.
+    def _scripts(self) -> dict[str, Any]:
+        if self._redis is None:
+            from redis import Redis
+
+            self._redis = Redis.from_url(self.redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._sync = {
+                "acquire": self._redis.register_script(_ACQUIRE),
+                "settle": self._redis.register_script(_SETTLE),
+                "set": self._redis.set,
+            }
+        return self._sync
+
+    def _async_scripts(self) -> dict[str, Any]:
+        if self._async_redis is None:
+            from redis.asyncio import Redis as AsyncRedis
+
+            self._async_redis = AsyncRedis.from_url(self.redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            self._async = {
+                "acquire": self._async_redis.register_script(_ACQUIRE),
+                "settle": self._async_redis.register_script(_SETTLE),
+                "set": self._async_redis.set,
+            }
+        return self._async
+
+    @staticmethod
+    def estimate_tokens(request: dict[str, Any]) -> int:
+        prompt_chars = sum(len(message["content"]) for message in request.get("input", []))
+        return prompt_chars // 4 + request.get("max_output_tokens", 0)
+
+    def _unavailable(self, exc: Exception) -> None:
+        if time.monotonic() - self._unavailable_logged > 60:
+            self._unavailable_logged = time.monotonic()
+            logger.warning("LLM rate limiter unavailable, sending requests unmetered: {}", exc)
+
+    def _call(self, command: Any) -> Any:
+        from redis import RedisError
+
+        try:
+            return command()
+        except RedisError as exc:
+            self._unavailable(exc)
+            return 0
+
+    async def _acall(self, command: Any) -> Any:
+        from redis import RedisError
+
+        try:
+            return await command()
+        except RedisError as exc:
+            self._unavailable(exc)
+            return 0
+
+    def _acquire_args(self, priority: str, tokens: int) -> dict[str, Any]:
+        return {
+            "keys": [self.bucket_key, self.waiting_key, self.cooldown_key],
+            "args": [self.requests_per_minute, self.tokens_per_minute, tokens, priority, self.batch_reserve, 2000],
+        }
+
+    @staticmethod
+    def _backoff(wait_ms: int) -> float:
+        # Jitter so processes told to wait the same time do not all retry at once.
+        return wait_ms / 1000 * random.uniform(1.0, 1.2)
+
+    def _expired(self, started: float, priority: str) -> bool:
+        if time.perf_counter() - started < self.max_wait_seconds:
+            return False
+        logger.warning("Waited {}s for LLM rate limit ({}); sending anyway", self.max_wait_seconds, priority)
+        return True
+
+    def acquire(self, priority: str, tokens: int) -> Permit:
+        """Block until a ``priority`` request estimated at ``tokens`` tokens may be sent."""
+        started = time.perf_counter()
+        if self.enabled:
+            args = self._acquire_args(priority, tokens)
+            while (wait_ms := self._call(lambda: self._scripts()["acquire"](**args))) > 0:
+                if self._expired(started, priority):
+                    break
+                time.sleep(self._backoff(wait_ms))
+            self.concurrency.acquire()
+        LLM_RATE_LIMIT_WAIT_SECONDS.labels(priority).observe(time.perf_counter() - started)
+        return Permit(self, tokens)
+
+    async def aacquire(self, priority: str, tokens: int) -> Permit:
+        started = time.perf_counter()
+        if self.enabled:
+            args = self._acquire_args(priority, tokens)
+            while (wait_ms := await self._acall(lambda: self._async_scripts()["acquire"](**args))) > 0:
+                if self._expired(started, priority):
+                    break
+                await asyncio.sleep(self._backoff(wait_ms))
+            # The condition variable would block the event loop; poll instead.
+            while not self.concurrency.try_acquire():
+                await asyncio.sleep(0.01)
+        LLM_RATE_LIMIT_WAIT_SECONDS.labels(priority).observe(time.perf_counter() - started)
+        return Permit(self, tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every process's requests for ``seconds`` (the provider said to back off)."""
+        if self.enabled:
+            milliseconds = max(1, int(seconds * 1000))
+            self._call(lambda: self._scripts()["set"](self.cooldown_key, 1, px=milliseconds))
+
+    async def apause(self, seconds: float) -> None:
+        if self.enabled:
+            milliseconds = max(1, int(seconds * 1000))
+            await self._acall(lambda: self._async_scripts()["set"](self.cooldown_key, 1, px=milliseconds))
+
+    async def aclose(self) -> None:
+        if self._async_redis is not None:
+            await self._async_redis.aclose()
+            self._async_redis = None
+
+
+llm_rate_limiter = lazy("llm_rate_limiter", LLMRateLimiter)
+
+__all__ = ["AdaptiveConcurrency", "LLMRateLimiter", "PRIORITIES", "Permit", "llm_rate_limiter"]
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import pypdfium2 as pdfium
+import pytesseract
+from loguru import logger
+from PIL import Image
+
+from app.core.config import get_settings
+from app.services.registry import lazy
+
+PageResult = str | Future
+
+# Processes of this worker that may each run an OCR pool (a prefork worker's concurrency);
+# set in the parent before it forks, see ``set_worker_processes``.
+_worker_processes = 1
+
+
+def set_worker_processes(count: int) -> None:
+    """Record how many sibling processes split the cores, so the default pool size is a fair share."""
+    global _worker_processes
+    _worker_processes = max(1, count)
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) // _worker_processes)
+
+
+def _init_worker() -> None:
+    # Each pool process runs one page at a time; stop tesseract from also fanning out.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+@lru_cache(maxsize=2)
+def _open_pdf(path: str) -> pdfium.PdfDocument:
+    return pdfium.PdfDocument(path)
+
+
+def _ocr_image(image: Image.Image, language: str, cache_dir: str) -> str:
+    """OCR one page image, memoised on disk by the hash of its pixels."""
+    image = image.convert("L")
+    digest = hashlib.sha256(f"{language}|{image.size}".encode())
+    digest.update(image.tobytes())
+    key = digest.hexdigest()
+    cache_path = Path(cache_dir) / key[:2] / f"{key}.txt"
+    if cache_path.exists():
+        return cache_path.read_text("utf-8")
+
+    text = pytesseract.image_to_string(image, lang=language)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(text, "utf-8")
+    os.replace(tmp_path, cache_path)
+    return text
+
+
+def _ocr_pdf_page(path: str, page_index: int, dpi: int, language: str, cache_dir: str) -> str:
+    page = _open_pdf(path)[page_index]
+    try:
+        image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+    finally:
+        page.close()
+    return _ocr_image(image, language, cache_dir)
+
+
+def _ocr_image_frame(path: str, frame: int, language: str, cache_dir: str) -> str:
+    with Image.open(path) as image:
+        image.seek(frame)
+        return _ocr_image(image, language, cache_dir)
+
+
+class OcrEngine:
+    """Rasterize and OCR pages on a process pool sized to this process's share of the cores.
+
+    Pages are submitted as they are discovered and results are yielded back in
+    page order, with at most ``2 * workers`` pages in flight so memory stays
+    bounded on very long scans. Recognised text is cached per page-image hash.
+    """
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.workers = settings.ocr_workers or default_workers()
+        self.dpi = settings.ocr_dpi
+        self.language = settings.ocr_language
+        self.min_text_chars = settings.ocr_min_text_chars
+        self.cache_dir = str(settings.ocr_cache_path)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            return self._pool
+
+    def _submit(self, fn: Callable[..., str], *args: object) -> Future:
+        try:
+            return self._get_pool().submit(fn, *args)
+        except (AssertionError, BrokenProcessPool, OSError) as exc:
+            # e.g. daemonic worker processes may not spawn children; OCR inline instead.
+            logger.warning("OCR pool unavailable ({}); running page inline", exc)
+            future: Future = Future()
+            future.set_result(fn(*args))
+            return future
+
+    def needs_ocr(self, text: str) -> bool:
+        return len(text.strip()) < self.min_text_chars
+
+    def submit_pdf_page(self, path: Path, page_index: int) -> Future:
+        return self._submit(_ocr_pdf_page, str(path), page_index, self.dpi, self.language, self.cache_dir)
+
+    def submit_image_frame(self, path: Path, frame: int) -> Future:
+        return self._submit(_ocr_image_frame, str(path), frame, self.language, self.cache_dir)
+
+    def ordered(self, pages: Iterable[tuple[int, PageResult]]) -> Iterator[tuple[int, str]]:
+        """Yield ``(page_number, text)`` in order, resolving OCR futures as they complete."""
+        window = self.workers * 2
+        pending: deque[tuple[int, PageResult]] = deque()
+        for item in pages:
+            pending.append(item)
+            while pending and (len(pending) > window or not isinstance(pending[0][1], Future)):
+                page_number, result = pending.popleft()
+                yield page_number, result.result() if isinstance(result, Future) else result
+        for page_number, result in pending:
+            yield page_number, result.result() if isinstance(result, Future) else result
+
+    def iter_image_pages(self, path: Path) -> Iterator[tuple[int, str]]:
+        """OCR every frame of an image (multi-page TIFFs included) in parallel."""
+        with Image.open(path) as image:
+            frames = getattr(image, "n_frames", 1)
+        return self.ordered((frame + 1, self.submit_image_frame(path, frame)) for frame in range(frames))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+ocr_engine = lazy("ocr_engine", OcrEngine)
+
+__all__ = ["OcrEngine", "default_workers", "ocr_engine", "set_worker_processes"]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+
+@dataclass
+class QuantizedVectors:
+    """Embeddings in a storage dtype; int8 rows carry a float32 scale each."""
+
+    data: np.ndarray
+    scales: np.ndarray | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> QuantizedVectors:
+    """Convert a float32 ``(n, d)`` matrix to ``dtype``.
+
+    int8 uses symmetric per-vector scaling (``row ≈ q * scale`` with
+    ``scale = max|row| / 127``), which preserves the direction of normalized
+    embeddings well enough for top-k retrieval at a quarter of the size.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float32":
+        return QuantizedVectors(np.ascontiguousarray(vectors))
+    if dtype == "float16":
+        return QuantizedVectors(vectors.astype(np.float16))
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return QuantizedVectors(data, scales.astype(np.float32))
+    raise ValueError(f"Unknown storage dtype {dtype!r}; expected one of {STORAGE_DTYPES}")
+
+
+def dequantize(vectors: QuantizedVectors) -> np.ndarray:
+    data = vectors.data.astype(np.float32)
+    if vectors.scales is not None:
+        data *= vectors.scales[:, None]
+    return data
+
+
+def scores(vectors: QuantizedVectors, query: np.ndarray) -> np.ndarray:
+    """Dot products of every stored row with a float32 ``query``."""
+    query = np.asarray(query, dtype=np.float32)
+    if vectors.data.dtype == np.float32:
+        return vectors.data @ query
+    result = vectors.data.astype(np.float32) @ query
+    if vectors.scales is not None:
+        result *= vectors.scales
+    return result
+
+
+__all__ = ["QuantizedVectors", "STORAGE_DTYPES", "dequantize", "quantize", "scores"]
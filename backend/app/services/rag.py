@@ -1,39 +1,148 @@
 from __future__ import annotations
 
-from app.services.embeddings import embedding_service
+from typing import Any, AsyncIterator
+
+import numpy as np
+
+from app.services.answer_cache import answer_cache
+from app.services.concurrency import stage_limiter
+from app.services.embedding_batcher import embedding_batcher
 from app.services.llm_client import llm_client
-from app.services.vector_store import vector_store
+from app.services.registry import lazy
+from app.services.vector_store import IndexHandle, vector_store
+
+NO_ANSWER = "I don't know"
 
 
 class RagService:
-    def answer(self, document_id: int, question: str, top_k: int = 4) -> dict:
-        question_embedding = embedding_service.embed_one(question)
-        results = vector_store.query_document(document_id, question_embedding, top_k=top_k)
+    def answer(self, document_id: int, question: str, top_k: int = 4, version: str | None = None) -> dict:
+        """Answer ``question`` from the document's chunks.
+
+        ``version`` identifies the indexed state of the document (its
+        ``updated_at``); cached answers from another version, or from another
+        index version, are discarded.
+        """
+        index = vector_store.active()
+        version = self._cache_version(version, index)
+        cached = answer_cache.get(document_id, version, question)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        question_embedding = embedding_batcher.embed_one(question, index.version.embedding_model)
+        cached = answer_cache.get_similar(document_id, version, question_embedding)
+        if cached is not None:
+            return {**cached, "cached": True}
 
-        documents = results.get("documents", [[]])[0]
-        metadatas = results.get("metadatas", [[]])[0]
+        results = index.store.query_document(document_id, question_embedding, top_k=top_k)
+        documents, metadatas = self._retrieved(results)
         if not documents:
-            return {
-                "answer": "I don't know",
-                "sources": [],
-            }
+            return {"answer": NO_ANSWER, "sources": [], "cached": False}
 
-        context = "\n\n".join(documents)
-        answer = llm_client.answer_question(question, context)
+        answer = llm_client.answer_question(question, "\n\n".join(documents))
+        result = {"answer": answer, "sources": self._sources(documents, metadatas)}
+        answer_cache.put(document_id, version, question, question_embedding, result)
+        return {**result, "cached": False}
 
-        sources = [
-            {
-                "chunk": doc,
-                "metadata": metadata,
-            }
-            for doc, metadata in zip(documents, metadatas)
-        ]
+    async def aanswer(self, document_id: int, question: str, top_k: int = 4, version: str | None = None) -> dict:
+        """Non-blocking ``answer`` for the API event loop.
 
-        return {"answer": answer, "sources": sources}
+        The query embedding goes through the batcher's dispatcher thread, the
+        vector query runs on the bounded blocking pool and the LLM call uses
+        the async client, each under its own stage limit.
+        """
+        index = await self._aactive()
+        version = self._cache_version(version, index)
+        retrieved = await self._aretrieve(index, document_id, question, top_k, version)
+        if isinstance(retrieved, dict):
+            return retrieved
+        question_embedding, documents, metadatas = retrieved
 
+        async with stage_limiter.limit("llm"):
+            answer = await llm_client.aanswer_question(question, "\n\n".join(documents))
+        result = {"answer": answer, "sources": self._sources(documents, metadatas)}
+        answer_cache.put(document_id, version, question, question_embedding, result)
+        return {**result, "cached": False}
 
-rag_service = RagService()
+    async def astream(
+        self,
+        document_id: int,
+        question: str,
+        top_k: int = 4,
+        version: str | None = None,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """Yield ``(event, data)`` pairs: ``sources``, then ``token``s, then ``done``.
 
-__all__ = ["RagService", "rag_service"]
+        Cached answers are replayed as a single token. The answer is cached
+        only when the stream runs to completion.
+        """
+        index = await self._aactive()
+        version = self._cache_version(version, index)
+        retrieved = await self._aretrieve(index, document_id, question, top_k, version)
+        if isinstance(retrieved, dict):
+            yield "sources", {"sources": retrieved["sources"], "cached": retrieved["cached"]}
+            yield "token", {"text": retrieved["answer"]}
+            yield "done", retrieved
+            return
+        question_embedding, documents, metadatas = retrieved
+
+        sources = self._sources(documents, metadatas)
+        yield "sources", {"sources": sources, "cached": False}
+        parts: list[str] = []
+        async with stage_limiter.limit("llm"):
+            async for delta in llm_client.astream_answer_question(question, "\n\n".join(documents)):
+                parts.append(delta)
+                yield "token", {"text": delta}
+        result = {"answer": "".join(parts).strip(), "sources": sources}
+        answer_cache.put(document_id, version, question, question_embedding, result)
+        yield "done", {**result, "cached": False}
+
+    @staticmethod
+    async def _aactive() -> IndexHandle:
+        # The lookup is a SQLite read, and on first start a write that can wait on a
+        # worker's lock; either way it belongs on the blocking pool, not the loop.
+        return await stage_limiter.run("vector", vector_store.active)
+
+    @staticmethod
+    def _cache_version(version: str | None, index: IndexHandle) -> str:
+        # Cached question embeddings are only comparable within one embedding model.
+        return f"{version}@{index.version.id}"
 
+    async def _aretrieve(
+        self,
+        index: IndexHandle,
+        document_id: int,
+        question: str,
+        top_k: int,
+        version: str | None,
+    ) -> dict | tuple[np.ndarray, list[str], list[dict[str, Any]]]:
+        """Final result dict when no LLM call is needed, else ``(embedding, chunks, metadatas)``."""
+        cached = answer_cache.get(document_id, version, question)
+        if cached is not None:
+            return {**cached, "cached": True}
 
+        async with stage_limiter.limit("embedding"):
+            question_embedding = await embedding_batcher.aembed_one(question, index.version.embedding_model)
+        cached = answer_cache.get_similar(document_id, version, question_embedding)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        results = await stage_limiter.run(
+            "vector", index.store.query_document, document_id, question_embedding, top_k=top_k
+        )
+        documents, metadatas = self._retrieved(results)
+        if not documents:
+            return {"answer": NO_ANSWER, "sources": [], "cached": False}
+        return question_embedding, documents, metadatas
+
+    @staticmethod
+    def _retrieved(results: dict) -> tuple[list[str], list[dict[str, Any]]]:
+        return results.get("documents", [[]])[0], results.get("metadatas", [[]])[0]
+
+    @staticmethod
+    def _sources(documents: list[str], metadatas: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [{"chunk": doc, "metadata": metadata} for doc, metadata in zip(documents, metadatas)]
+
+
+rag_service = lazy("rag_service", RagService)
+
+__all__ = ["RagService", "rag_service"]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Generic, Iterable, TypeVar, cast
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """Stand-in for a module-level service singleton that builds it on first use.
+
+    Attribute access is forwarded to the instance, so ``from app.services.x
+    import x_service`` and ``x_service.method()`` work unchanged; the heavy
+    dependencies behind a service (models, clients, database files) are only
+    imported and opened when something actually calls it, or at ``warm_up``.
+    The stand-in's own state is ``_lazy_``-prefixed so it never shadows the
+    service's attributes, and private and dunder lookups are not forwarded.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]) -> None:
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_instance", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _lazy_get(self) -> T:
+        instance = self._lazy_instance
+        if instance is None:
+            with self._lazy_lock:
+                instance = self._lazy_instance
+                if instance is None:
+                    started = time.perf_counter()
+                    instance = self._lazy_factory()
+                    object.__setattr__(self, "_lazy_instance", instance)
+                    logger.debug("Built {} in {:.0f} ms", self._lazy_name, (time.perf_counter() - started) * 1000)
+        return instance
+
+    def __getattr__(self, attr: str) -> Any:
+        # Introspection (hasattr(x, "__wrapped__"), inspect, copy, pickle, pytest's
+        # fixture probing) looks up dunder and private names; answering those must
+        # not build the service, and callers only use a service's public API.
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._lazy_get(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._lazy_get(), attr, value)
+
+    def __repr__(self) -> str:
+        instance = self._lazy_instance
+        return f"<LazyService {self._lazy_name}: {'not loaded' if instance is None else repr(instance)}>"
+
+
+services: dict[str, LazyService[Any]] = {}
+
+
+def lazy(name: str, factory: Callable[[], T]) -> T:
+    """Register ``factory`` as the service ``name`` and return its lazy stand-in."""
+    service = services[name] = LazyService(name, factory)
+    return cast(T, service)
+
+
+def loaded(name: str) -> bool:
+    """Whether the service ``name`` has been built (so has resources worth releasing)."""
+    return services[name]._lazy_instance is not None
+
+
+def warm_up(names: Iterable[str] | None = None) -> None:
+    """Build the named services now (all registered ones by default), e.g. before forking."""
+    for name in names if names is not None else list(services):
+        services[name]._lazy_get()
+
+
+__all__ = ["LazyService", "lazy", "loaded", "services", "warm_up"]
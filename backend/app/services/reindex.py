@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import get_settings
+from app.core.metrics import REINDEXED_CHUNKS
+from app.services.chunk_store import IndexVersion, chunk_store
+from app.services.chunking import batched
+from app.services.embeddings import EmbeddingService, embedding_service_for
+from app.services.registry import lazy
+from app.services.vector_store import IndexHandle, VectorStore, vector_store
+
+# Documents fetched per chunk store query; their chunks are embedded in batches across documents.
+_DOCUMENTS_PER_ROUND = 256
+
+
+@dataclass
+class _Row:
+    document_id: int
+    revision: int
+    chunk_index: int
+    text: str | None  # None for a document without chunks (deleted, or reset and not yet re-indexed)
+    metadata: dict[str, Any]
+    first: bool
+    last: bool
+
+
+class Reindexer:
+    """Re-embeds stored chunks into a new index version, then switches queries over to it.
+
+    The version is built for the configured ``embedding_model`` and
+    ``vector_backend`` while the active version keeps serving queries.
+    Documents are taken in chunk store revision order and embedded
+    ``reindex_batch_size`` chunks at a time across documents, with the upserts
+    of one batch overlapping the encoding of the next. Progress (the revision
+    up to which every document is in the new version) is saved after each
+    batch, so an interrupted job resumes where it stopped. Documents written
+    meanwhile get newer revisions and are caught up before the switch, which
+    only happens once nothing is left beyond the cursor. One job builds a
+    version at a time, under a lease.
+    """
+
+    def __init__(self, batch_size: int | None = None) -> None:
+        settings = get_settings()
+        self.batch_size = batch_size or settings.reindex_batch_size
+        self.lease_seconds = settings.reindex_lease_seconds
+
+    def run(self, document_ids: Iterable[int] = ()) -> dict[str, Any]:
+        """Build (or resume) the version for the configured model and backend and activate it.
+
+        ``document_ids`` may include documents indexed before the chunk store
+        existed; their chunks are first copied from the active version.
+        """
+        settings = get_settings()
+        model, backend = settings.embedding_model, settings.vector_backend
+        active = vector_store.active()
+        if (active.version.embedding_model, active.version.backend) == (model, backend):
+            return {"status": "current", "version": active.version.id}
+
+        self.backfill(active, document_ids)
+        version = chunk_store.building_version(model, backend) or vector_store.create_version(model, backend)
+        if not chunk_store.claim(version.id, self.lease_seconds):
+            logger.info("Index version {} is already being built by another job", version.id)
+            return {"status": "running", "version": version.id}
+
+        logger.info(
+            "Re-indexing into version {} ({}, {}) from revision {}", version.id, model, backend, version.cursor
+        )
+        started = time.perf_counter()
+        store = vector_store.store(version)
+        embedder = embedding_service_for(model)
+        try:
+            while True:
+                self._catch_up(version, store, embedder)
+                if chunk_store.activate(version.id, version.cursor):
+                    break
+        except BaseException:
+            chunk_store.release(version.id)
+            raise
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Activated index version {} ({} chunks embedded in {:.0f}s); version {} retired",
+            version.id,
+            version.chunks,
+            elapsed,
+            active.version.id,
+        )
+        return {
+            "status": "activated",
+            "version": version.id,
+            "previous_version": active.version.id,
+            "chunks": version.chunks,
+            "seconds": round(elapsed, 3),
+        }
+
+    @staticmethod
+    def backfill(active: IndexHandle, document_ids: Iterable[int]) -> int:
+        """Copy chunks of documents missing from the chunk store out of the active version."""
+        missing = chunk_store.missing(document_ids)
+        for document_id in missing:
+            texts, _, metadatas = active.store.get_document_chunks(document_id)
+            metadatas = [
+                {key: value for key, value in metadata.items() if key not in ("document_id", "chunk_index")}
+                for metadata in metadatas
+            ]
+            chunk_store.add_chunks(document_id, texts, metadatas=metadatas)
+            chunk_store.finish_document(document_id, len(texts))
+        if missing:
+            logger.info("Copied chunks of {} document(s) into the chunk store", len(missing))
+        return len(missing)
+
+    def _catch_up(self, version: IndexVersion, store: VectorStore, embedder: EmbeddingService) -> None:
+        """Embed every document changed after ``version.cursor``, advancing it as batches land."""
+        with ThreadPoolExecutor(1, thread_name_prefix="reindex-writer") as writer:
+            while documents := chunk_store.changed_since(version.cursor, _DOCUMENTS_PER_ROUND):
+                pending: Future | None = None
+                for batch in batched(self._rows(documents), self.batch_size):
+                    texts = [row.text for row in batch if row.text is not None]
+                    embeddings = embedder.embed(texts) if texts else np.empty((0, 0), dtype=np.float32)
+                    REINDEXED_CHUNKS.inc(len(texts))
+                    if pending is not None:
+                        self._saved(version, *pending.result())
+                    pending = writer.submit(self._write, store, batch, embeddings)
+                if pending is not None:
+                    self._saved(version, *pending.result())
+
+    def _saved(self, version: IndexVersion, cursor: int | None, chunks: int) -> None:
+        version.chunks += chunks
+        if cursor is not None:
+            version.cursor = cursor
+        chunk_store.save_progress(version.id, version.cursor, version.chunks, self.lease_seconds)
+
+    @staticmethod
+    def _rows(documents: list[tuple[int, int]]) -> Iterator[_Row]:
+        for document_id, revision in documents:
+            chunks = list(chunk_store.iter_chunks(document_id))
+            if not chunks:
+                yield _Row(document_id, revision, 0, None, {}, True, True)
+            for pos, (chunk_index, text, metadata) in enumerate(chunks):
+                yield _Row(document_id, revision, chunk_index, text, metadata, pos == 0, pos == len(chunks) - 1)
+
+    @staticmethod
+    def _write(store: VectorStore, batch: list[_Row], embeddings: np.ndarray) -> tuple[int | None, int]:
+        """Upsert one batch; returns the revision of the last document it completed and the chunks written."""
+        pos = 0
+        for document_id, group in groupby(batch, key=lambda row: row.document_id):
+            rows = list(group)
+            if rows[0].first:
+                store.delete_document(document_id)
+            live = [row for row in rows if row.text is not None]
+            if live:
+                store.upsert_document_chunks(
+                    document_id,
+                    [row.text for row in live],
+                    embeddings[pos : pos + len(live)],
+                    start_index=live[0].chunk_index,
+                    metadatas=[row.metadata for row in live],
+                )
+                pos += len(live)
+        completed = [row.revision for row in batch if row.last]
+        return (completed[-1] if completed else None), pos
+
+
+reindexer = lazy("reindexer", Reindexer)
+
+__all__ = ["Reindexer", "reindexer"]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core.config import get_settings
+from app.services.embedding_batcher import embedding_batcher
+from app.services.registry import lazy
+from app.services.search_index import SearchFilters, search_index
+from app.services.vector_store import vector_store
+
+
+@dataclass
+class SearchResult:
+    document_id: int
+    chunk_index: int
+    page: int | None
+    score: float
+    snippet: str
+    keyword_rank: int | None = None
+    vector_rank: int | None = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+class HybridSearchService:
+    """Corpus-wide search fusing BM25 and vector rankings with reciprocal rank fusion.
+
+    Both retrievers fetch the top ``offset + limit`` chunks; each chunk scores
+    ``sum(1 / (k + rank))`` over the lists it appears in. Attribute filters are
+    applied inside the FTS query and, when they select few enough documents,
+    pushed into the vector query as an id list; otherwise vector hits are
+    filtered after retrieval. Only completed documents are returned: the
+    vector store holds chunks from the moment they are indexed, so its hits
+    are checked against the search index's documents.
+    """
+
+    def search(
+        self,
+        query: str,
+        filters: SearchFilters | None = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> tuple[list[SearchResult], bool]:
+        """Return one page of fused results and whether more results exist."""
+        settings = get_settings()
+        filters = filters or SearchFilters()
+        window = min(offset + limit + 1, settings.search_max_results)
+
+        keyword_hits = search_index.search(query, window, filters)
+
+        document_ids = None
+        if filters:
+            document_ids = search_index.filter_documents(filters, settings.search_filter_pushdown_limit + 1)
+            if len(document_ids) > settings.search_filter_pushdown_limit:
+                document_ids = None
+        if filters and document_ids == []:
+            vector_rows: list[tuple[str, dict[str, Any]]] = []
+        else:
+            index = vector_store.active()
+            results = index.store.query_corpus(
+                embedding_batcher.embed_one(query, index.version.embedding_model),
+                top_k=window,
+                document_ids=document_ids,
+            )
+            vector_rows = list(zip(results.get("documents", [[]])[0], results.get("metadatas", [[]])[0]))
+            if document_ids is None:
+                allowed = search_index.matching_documents(
+                    (int(metadata["document_id"]) for _, metadata in vector_rows), filters
+                )
+                vector_rows = [row for row in vector_rows if int(row[1]["document_id"]) in allowed]
+
+        rrf_k = settings.search_rrf_k
+        fused: dict[tuple[int, int], SearchResult] = {}
+        for rank, hit in enumerate(keyword_hits, start=1):
+            fused[(hit.document_id, hit.chunk_index)] = SearchResult(
+                hit.document_id, hit.chunk_index, hit.page, 1 / (rrf_k + rank), hit.snippet, keyword_rank=rank
+            )
+        for rank, (text, metadata) in enumerate(vector_rows, start=1):
+            key = (int(metadata["document_id"]), int(metadata["chunk_index"]))
+            result = fused.get(key)
+            if result is None:
+                result = fused[key] = SearchResult(*key, metadata.get("page"), 0.0, text[:200])
+            result.score += 1 / (rrf_k + rank)
+            result.vector_rank = rank
+            result.metadata = metadata
+
+        ranked = sorted(fused.values(), key=lambda result: -result.score)
+        return ranked[offset : offset + limit], len(ranked) > offset + limit
+
+
+search_service = lazy("search_service", HybridSearchService)
+
+__all__ = ["HybridSearchService", "SearchResult", "search_service"]
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+from app.core.config import get_settings
+from app.services.registry import lazy
+
+# FTS rowids pack (document_id, chunk_index) so a document's rows form one range.
+_CHUNK_BITS = 20
+_TERM = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(text, page UNINDEXED, tokenize = 'porter unicode61');
+CREATE TABLE IF NOT EXISTS documents (
+    document_id INTEGER PRIMARY KEY,
+    category TEXT,
+    sentiment TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_documents_category ON documents (category, created_at);
+CREATE INDEX IF NOT EXISTS ix_documents_sentiment ON documents (sentiment, created_at);
+CREATE INDEX IF NOT EXISTS ix_documents_created_at ON documents (created_at);
+"""
+
+
+@dataclass
+class SearchFilters:
+    category: str | None = None
+    sentiment: str | None = None
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+
+    def __bool__(self) -> bool:
+        return any(value is not None for value in (self.category, self.sentiment, self.date_from, self.date_to))
+
+    def sql(self, alias: str = "d") -> tuple[str, list[Any]]:
+        clauses, params = [], []
+        if self.category is not None:
+            clauses.append(f"{alias}.category = ? COLLATE NOCASE")
+            params.append(self.category)
+        if self.sentiment is not None:
+            clauses.append(f"{alias}.sentiment = ? COLLATE NOCASE")
+            params.append(self.sentiment)
+        if self.date_from is not None:
+            clauses.append(f"{alias}.created_at >= ?")
+            params.append(self.date_from.isoformat())
+        if self.date_to is not None:
+            clauses.append(f"{alias}.created_at <= ?")
+            params.append(self.date_to.isoformat())
+        return " AND ".join(clauses) or "1", params
+
+
+@dataclass
+class KeywordHit:
+    document_id: int
+    chunk_index: int
+    page: int | None
+    score: float
+    snippet: str
+
+
+class SearchIndex:
+    """Corpus-wide BM25 keyword index (SQLite FTS5) plus filterable document attributes.
+
+    Chunks are added as they are indexed and removed per document, so the
+    inverted index is maintained incrementally and never rebuilt. Chunks only
+    match once their document's attributes are set, when it completes, so
+    documents still processing or that failed are never found. Each thread
+    gets its own connection; WAL mode lets API readers run alongside worker
+    writes.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or get_settings().search_index_path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self) -> None:
+        """Forget connections inherited across ``fork()``; each process opens its own."""
+        self._local = threading.local()
+
+    @staticmethod
+    def _rowid(document_id: int, chunk_index: int) -> int:
+        return (document_id << _CHUNK_BITS) | chunk_index
+
+    def add_chunks(
+        self,
+        document_id: int,
+        chunks: Sequence[str],
+        start_index: int = 0,
+        pages: Sequence[int | None] | None = None,
+    ) -> None:
+        pages = pages or [None] * len(chunks)
+        rows = [
+            (self._rowid(document_id, start_index + pos), text, page)
+            for pos, (text, page) in enumerate(zip(chunks, pages))
+        ]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO chunks (rowid, text, page) VALUES (?, ?, ?)", rows)
+
+    def delete_document(self, document_id: int) -> None:
+        low = self._rowid(document_id, 0)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chunks WHERE rowid BETWEEN ? AND ?", (low, low | ((1 << _CHUNK_BITS) - 1)))
+            conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+
+    def set_document_attributes(
+        self,
+        document_id: int,
+        category: str | None,
+        sentiment: str | None,
+        created_at: datetime | None,
+    ) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (document_id, category, sentiment, created_at) VALUES (?, ?, ?, ?)",
+                (document_id, category, sentiment, created_at.isoformat() if created_at else None),
+            )
+
+    def filter_documents(self, filters: SearchFilters, limit: int) -> list[int]:
+        where, params = filters.sql()
+        rows = self._connect().execute(f"SELECT document_id FROM documents d WHERE {where} LIMIT ?", (*params, limit))
+        return [row[0] for row in rows]
+
+    def matching_documents(self, document_ids: Iterable[int], filters: SearchFilters) -> set[int]:
+        ids = list(set(document_ids))
+        if not ids:
+            return set()
+        where, params = filters.sql()
+        placeholders = ",".join("?" * len(ids))
+        rows = self._connect().execute(
+            f"SELECT document_id FROM documents d WHERE document_id IN ({placeholders}) AND {where}",
+            (*ids, *params),
+        )
+        return {row[0] for row in rows}
+
+    def search(self, query: str, limit: int, filters: SearchFilters | None = None) -> list[KeywordHit]:
+        terms = _TERM.findall(query.lower())
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+        # The join also drops chunks of documents that have not completed (they have no attributes).
+        where, params = (filters or SearchFilters()).sql()
+        sql = (
+            "SELECT c.rowid, c.page, c.rank, snippet(chunks, 0, '[', ']', '…', 16) FROM chunks c "
+            f"JOIN documents d ON d.document_id = (c.rowid >> {_CHUNK_BITS}) "
+            f"WHERE chunks MATCH ? AND {where} ORDER BY c.rank LIMIT ?"
+        )
+        args = (match, *params, limit)
+        mask = (1 << _CHUNK_BITS) - 1
+        return [
+            KeywordHit(rowid >> _CHUNK_BITS, rowid & mask, page, -rank, snippet)
+            for rowid, page, rank, snippet in self._connect().execute(sql, args)
+        ]
+
+
+search_index = lazy("search_index", SearchIndex)
+
+__all__ = ["KeywordHit", "SearchFilters", "SearchIndex", "search_index"]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from loguru import logger
+
+from app.core.config import get_settings
+
+
+class StageWorkspace:
+    """Files one staged processing run hands from task to task on shared storage.
+
+    Celery messages only carry the workspace path. The extract stage writes
+    ``pages.jsonl`` (one page per line), ``head.txt`` (the text enrichment
+    reads) and ``tables.json``; the index stage adds ``sections.json`` when
+    enrichment is hierarchical. Every stage records its small outputs in
+    ``state.json``.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @classmethod
+    def create(cls, document_id: int) -> StageWorkspace:
+        root = get_settings().stage_workspace_path
+        path = root / f"{document_id}-{uuid.uuid4().hex}"
+        path.mkdir(parents=True)
+        return cls(path)
+
+    @property
+    def pages_path(self) -> Path:
+        return self.path / "pages.jsonl"
+
+    @property
+    def head_path(self) -> Path:
+        return self.path / "head.txt"
+
+    @property
+    def tables_path(self) -> Path:
+        return self.path / "tables.json"
+
+    @property
+    def sections_path(self) -> Path:
+        return self.path / "sections.json"
+
+    def write_pages(self, pages: Iterable[tuple[int, str]]) -> int:
+        count = 0
+        with self.pages_path.open("w", encoding="utf-8") as fh:
+            for page_number, text in pages:
+                fh.write(json.dumps([page_number, text]) + "\n")
+                count += 1
+        return count
+
+    def iter_pages(self) -> Iterator[tuple[int, str]]:
+        with self.pages_path.open(encoding="utf-8") as fh:
+            for line in fh:
+                page_number, text = json.loads(line)
+                yield page_number, text
+
+    def read_state(self) -> dict[str, Any]:
+        state_path = self.path / "state.json"
+        return json.loads(state_path.read_text("utf-8")) if state_path.exists() else {}
+
+    def update_state(self, **values: Any) -> dict[str, Any]:
+        state = {**self.read_state(), **values}
+        tmp = self.path / "state.json.tmp"
+        tmp.write_text(json.dumps(state), "utf-8")
+        tmp.replace(self.path / "state.json")
+        return state
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def remove_stale_workspaces(min_age_seconds: int) -> int:
+    """Delete workspaces left behind by runs that died mid-pipeline. Returns the number removed."""
+    root = get_settings().stage_workspace_path
+    if not root.exists():
+        return 0
+    cutoff = time.time() - min_age_seconds
+    removed = 0
+    for path in root.iterdir():
+        if path.is_dir() and path.stat().st_mtime <= cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info("Removed {} stale stage workspace(s)", removed)
+    return removed
+
+
+__all__ = ["StageWorkspace", "remove_stale_workspaces"]
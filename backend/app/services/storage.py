@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Protocol
+
+from loguru import logger
+
+from app.core.config import get_settings
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__(f"Upload exceeds the maximum size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    content_hash: str
+    size_bytes: int
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upload_path(content_hash: str, filename: str | None) -> Path:
+    """Content-addressed location for an upload; the suffix drives text extraction."""
+    suffix = Path(filename or "").suffix.lower()
+    upload_dir = get_settings().upload_dir
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir / f"{content_hash}{suffix}"
+
+
+def _write_block(fh: BinaryIO, digest: hashlib._Hash, block: bytes) -> None:
+    digest.update(block)
+    fh.write(block)
+
+
+def _commit_upload(tmp_path: Path, final_path: Path) -> None:
+    if final_path.exists():
+        # Identical bytes are already stored; keep the existing copy, and touch it so garbage
+        # collection (which spares recent files) cannot remove it before the new document row commits.
+        tmp_path.unlink(missing_ok=True)
+        os.utime(final_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+
+async def save_upload(
+    source: AsyncReadable,
+    filename: str | None,
+    *,
+    max_bytes: int | None = None,
+    chunk_size: int | None = None,
+) -> StoredUpload:
+    """Stream ``source`` to content-addressed storage in fixed-size blocks.
+
+    The SHA-256 and size are computed as blocks arrive and file writes run in a
+    worker thread, so memory stays bounded by ``chunk_size`` and the event loop is
+    never blocked on disk. Raises ``UploadTooLargeError`` as soon as the stream
+    passes ``max_bytes``. An ``UploadFile`` has already been spooled by the
+    multipart parser, whose input ``MaxBodySizeMiddleware`` caps.
+    """
+    settings = get_settings()
+    max_bytes = max_bytes or settings.max_upload_bytes
+    chunk_size = chunk_size or settings.upload_chunk_size
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+
+    # Temporary names are unique per request, so concurrent uploads never collide.
+    tmp_path = settings.upload_dir / f".tmp-{uuid.uuid4().hex}"
+    digest = hashlib.sha256()
+    size = 0
+    fh = await asyncio.to_thread(tmp_path.open, "wb")
+    try:
+        while block := await source.read(chunk_size):
+            size += len(block)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            await asyncio.to_thread(_write_block, fh, digest, block)
+        await asyncio.to_thread(fh.close)
+        content_hash = digest.hexdigest()
+        final_path = upload_path(content_hash, filename)
+        await asyncio.to_thread(_commit_upload, tmp_path, final_path)
+    except BaseException:
+        fh.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return StoredUpload(path=final_path, content_hash=content_hash, size_bytes=size)
+
+
+async def spool_upload(source: AsyncReadable, *, max_bytes: int, chunk_size: int | None = None) -> Path:
+    """Stream ``source`` to a temporary file in the upload directory; the caller removes it."""
+    settings = get_settings()
+    chunk_size = chunk_size or settings.upload_chunk_size
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = settings.upload_dir / f".tmp-{uuid.uuid4().hex}"
+    size = 0
+    fh = await asyncio.to_thread(tmp_path.open, "wb")
+    try:
+        while block := await source.read(chunk_size):
+            size += len(block)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            await asyncio.to_thread(fh.write, block)
+        await asyncio.to_thread(fh.close)
+    except BaseException:
+        fh.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path
+
+
+def store_fileobj(
+    source: BinaryIO,
+    filename: str | None,
+    *,
+    max_bytes: int | None = None,
+    chunk_size: int | None = None,
+) -> StoredUpload:
+    """Blocking counterpart of ``save_upload`` for file objects such as archive members."""
+    settings = get_settings()
+    max_bytes = max_bytes or settings.max_upload_bytes
+    chunk_size = chunk_size or settings.upload_chunk_size
+    settings.upload_dir.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = settings.upload_dir / f".tmp-{uuid.uuid4().hex}"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with tmp_path.open("wb") as fh:
+            while block := source.read(chunk_size):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                _write_block(fh, digest, block)
+        content_hash = digest.hexdigest()
+        final_path = upload_path(content_hash, filename)
+        _commit_upload(tmp_path, final_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return StoredUpload(path=final_path, content_hash=content_hash, size_bytes=size)
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def extract_archive(
+    archive: Path,
+    *,
+    max_files: int,
+    max_member_bytes: int | None = None,
+) -> list[tuple[str, StoredUpload]]:
+    """Store every file in a zip archive, returning ``(member name, stored upload)`` pairs.
+
+    Directories, dotfiles and macOS resource forks are skipped. Members are
+    streamed (never fully decompressed in memory) and capped at
+    ``max_member_bytes`` whatever size they declare, which guards against zip bombs.
+    """
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            members = [
+                info
+                for info in zf.infolist()
+                if not info.is_dir()
+                and not info.filename.startswith("__MACOSX/")
+                and not Path(info.filename).name.startswith(".")
+            ]
+            if len(members) > max_files:
+                raise ArchiveError(f"Archive holds {len(members)} files; at most {max_files} are allowed")
+            stored = []
+            for info in members:
+                with zf.open(info) as member:
+                    stored.append(
+                        (Path(info.filename).name, store_fileobj(member, info.filename, max_bytes=max_member_bytes))
+                    )
+            return stored
+    except zipfile.BadZipFile as exc:
+        raise ArchiveError(f"Not a valid zip archive: {exc}") from exc
+
+
+def remove_unreferenced_uploads(referenced_paths: Iterable[str], min_age_seconds: int) -> int:
+    """Delete stored uploads no ``Document`` row points at. Returns the number removed."""
+    upload_dir = get_settings().upload_dir
+    if not upload_dir.exists():
+        return 0
+    referenced = {Path(p).resolve() for p in referenced_paths}
+    cutoff = time.time() - min_age_seconds
+    removed = 0
+    for path in upload_dir.iterdir():
+        if not path.is_file() or path.resolve() in referenced:
+            continue
+        if path.stat().st_mtime > cutoff:
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+    if removed:
+        logger.info("Removed {} unreferenced upload(s)", removed)
+    return removed
+
+
+__all__ = [
+    "ArchiveError",
+    "StoredUpload",
+    "UploadTooLargeError",
+    "file_sha256",
+    "extract_archive",
+    "remove_unreferenced_uploads",
+    "save_upload",
+    "spool_upload",
+    "store_fileobj",
+    "upload_path",
+]
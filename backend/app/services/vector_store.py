@@ -1,49 +1,711 @@
 from __future__ import annotations
 
-from typing import Sequence
+import contextlib
+import fcntl
+import functools
+import itertools
+import json
+import os
+import secrets
+import shutil
+import struct
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterator, Sequence, TypeVar
 
-import chromadb
-from chromadb.api import ClientAPI
-from chromadb.api.models.Collection import Collection
+import numpy as np
+from loguru import logger
 
 from app.core.config import get_settings
+from app.core.metrics import VECTOR_STORE_SECONDS
+from app.services.chunk_store import IndexVersion, chunk_store
+from app.services.quantization import QuantizedVectors, dequantize, quantize, scores
+from app.services.registry import lazy
 
-class VectorStore:
-    def __init__(self) -> None:
+if TYPE_CHECKING:
+    from chromadb.api import ClientAPI
+    from chromadb.api.models.Collection import Collection
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _timed(operation: str) -> Callable[[F], F]:
+    """Record the decorated method's latency under ``VECTOR_STORE_SECONDS``."""
+
+    def decorator(method: F) -> F:
+        @functools.wraps(method)
+        def wrapper(self: VectorStore, *args: Any, **kwargs: Any) -> Any:
+            with VECTOR_STORE_SECONDS.labels(self.backend, operation).time():
+                return method(self, *args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+class VectorStore(ABC):
+    """Chunk embeddings scoped per document.
+
+    ``query_document`` returns Chroma's result shape (lists nested once per
+    query) so callers do not depend on the backend.
+    """
+
+    backend: str
+
+    @abstractmethod
+    def upsert_document_chunks(
+        self,
+        document_id: int,
+        chunks: Sequence[str],
+        embeddings: np.ndarray,
+        *,
+        start_index: int = 0,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+    ) -> None: ...
+
+    @abstractmethod
+    def query_document(self, document_id: int, query_embedding: np.ndarray, top_k: int = 4) -> dict: ...
+
+    @abstractmethod
+    def query_corpus(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 10,
+        document_ids: Sequence[int] | None = None,
+    ) -> dict:
+        """Nearest chunks across all documents, or only ``document_ids`` when given."""
+
+    @abstractmethod
+    def get_document_chunks(self, document_id: int) -> tuple[list[str], np.ndarray, list[dict[str, Any]]]:
+        """All of a document's chunks in index order, with a float32 ``(n, dim)`` embedding matrix."""
+
+    @abstractmethod
+    def delete_document(self, document_id: int) -> None: ...
+
+    def reopen(self) -> None:
+        """Drop handles inherited across ``fork()``; called once in each worker child."""
+
+    def compact(self) -> int:
+        """Reclaim space still held by deleted or rewritten documents. Returns the rows removed."""
+        return 0
+
+    @abstractmethod
+    def drop(self) -> None:
+        """Delete the whole index (a retired version)."""
+
+    @staticmethod
+    def _metadatas(
+        document_id: int,
+        indices: range,
+        metadatas: Sequence[dict[str, Any]] | None,
+    ) -> list[dict[str, Any]]:
+        return [
+            {**(metadatas[pos] if metadatas else {}), "document_id": str(document_id), "chunk_index": idx}
+            for pos, idx in enumerate(indices)
+        ]
+
+
+class ChromaVectorStore(VectorStore):
+    backend = "chroma"
+
+    def __init__(self, path: Path | None = None, collection: str | None = None) -> None:
         settings = get_settings()
-        self.client: ClientAPI = chromadb.PersistentClient(path=str(settings.vector_db_path))
-        self.collection: Collection = self.client.get_or_create_collection(settings.chroma_collection)
+        self.path = path or settings.vector_db_path
+        self.collection_name = collection or settings.chroma_collection
+        self._open()
+
+    def _open(self) -> None:
+        # Imported here so the NumPy backend (and API cold start) never pays for chromadb.
+        import chromadb
+
+        self.client: ClientAPI = chromadb.PersistentClient(path=str(self.path))
+        self.collection: Collection = self.client.get_or_create_collection(self.collection_name)
+
+    def reopen(self) -> None:
+        from chromadb.api.shared_system_client import SharedSystemClient
 
+        # Chroma caches one client (and its SQLite connections) per path, process-wide.
+        SharedSystemClient.clear_system_cache()
+        self._open()
+
+    @_timed("upsert")
     def upsert_document_chunks(
         self,
         document_id: int,
         chunks: Sequence[str],
-        embeddings: Sequence[Sequence[float]],
+        embeddings: np.ndarray,
+        *,
+        start_index: int = 0,
+        metadatas: Sequence[dict[str, Any]] | None = None,
     ) -> None:
-        ids = [f"{document_id}:{idx}" for idx in range(len(chunks))]
-        metadatas = [{"document_id": str(document_id), "chunk_index": idx} for idx in range(len(chunks))]
+        indices = range(start_index, start_index + len(chunks))
         self.collection.upsert(
-            ids=ids,
-            embeddings=list(embeddings),
+            ids=[f"{document_id}:{idx}" for idx in indices],
+            embeddings=embeddings,
             documents=list(chunks),
-            metadatas=metadatas,
+            metadatas=self._metadatas(document_id, indices, metadatas),
         )
 
+    @_timed("query")
     def query_document(
         self,
         document_id: int,
-        query_embedding: Sequence[float],
+        query_embedding: np.ndarray,
         top_k: int = 4,
     ) -> dict:
         return self.collection.query(
-            query_embeddings=[list(query_embedding)],
+            query_embeddings=query_embedding,
             n_results=top_k,
             where={"document_id": str(document_id)},
         )
 
+    @_timed("query_corpus")
+    def query_corpus(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 10,
+        document_ids: Sequence[int] | None = None,
+    ) -> dict:
+        where = None
+        if document_ids is not None:
+            where = {"document_id": {"$in": [str(document_id) for document_id in document_ids]}}
+        return self.collection.query(query_embeddings=query_embedding, n_results=top_k, where=where)
+
+    @_timed("get")
+    def get_document_chunks(self, document_id: int) -> tuple[list[str], np.ndarray, list[dict[str, Any]]]:
+        result = self.collection.get(
+            where={"document_id": str(document_id)},
+            include=["documents", "embeddings", "metadatas"],
+        )
+        order = sorted(range(len(result["ids"])), key=lambda pos: result["metadatas"][pos]["chunk_index"])
+        embeddings = np.asarray(result["embeddings"], dtype=np.float32)
+        return (
+            [result["documents"][pos] for pos in order],
+            embeddings[order] if len(order) else np.empty((0, 0), dtype=np.float32),
+            [result["metadatas"][pos] for pos in order],
+        )
+
+    @_timed("delete")
+    def delete_document(self, document_id: int) -> None:
+        self.collection.delete(where={"document_id": str(document_id)})
+
+    def drop(self) -> None:
+        self.client.delete_collection(self.collection_name)
+
+
+_CORPUS_POINTER = "corpus.json"
+_CORPUS_LOCK = "corpus.lock"
+_CORPUS_BLOCK_ROWS = 65536
+# ``compact`` rebuilds the corpus matrix once this share of its rows is stale.
+_CORPUS_MAX_STALE_FRACTION = 0.25
+
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_LEN = 128  # fixed, so the row count can be rewritten in place
+
+
+def _write_npy_header(fh: BinaryIO, dtype: np.dtype, shape: tuple[int, ...]) -> None:
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape})
+    padding = _NPY_HEADER_LEN - len(_NPY_MAGIC) - 2 - len(header) - 1
+    fh.seek(0)
+    fh.write(_NPY_MAGIC + struct.pack("<H", _NPY_HEADER_LEN - 10) + header.encode("latin1") + b" " * padding + b"\n")
+
+
+def _append_npy(path: Path, rows: np.ndarray) -> None:
+    """Append rows to a ``.npy`` file, then bump the row count in its header.
+
+    Data is written before the header, so a concurrent reader only ever sees
+    complete rows.
+    """
+    rows = np.ascontiguousarray(rows)
+    mode = "r+b" if path.exists() else "w+b"
+    with path.open(mode) as fh:
+        if mode == "w+b":
+            _write_npy_header(fh, rows.dtype, (0, *rows.shape[1:]))
+        fh.seek(0, 2)
+        fh.write(rows.tobytes())
+        count = (fh.tell() - _NPY_HEADER_LEN) // (rows.itemsize * int(np.prod(rows.shape[1:], dtype=np.int64)))
+        _write_npy_header(fh, rows.dtype, (count, *rows.shape[1:]))
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact search over a memory-mapped embedding matrix per document.
+
+    Each document directory holds ``embeddings.npy`` (plus ``scales.npy`` for
+    int8 storage), a ``chunks.jsonl`` sidecar with chunk text and metadata, and
+    ``offsets.npy`` with the byte offset of every sidecar line. A query maps
+    only that document's rows and runs one vectorized dot product, so latency
+    depends on the document's size rather than the corpus. Chunks must be
+    appended in order; ``start_index == 0`` starts the document afresh.
+
+    Corpus-wide queries use a second, append-only copy of every row in one
+    matrix, so they scan a single contiguous mapping instead of opening every
+    document. Each row records its document and that document's ``epoch`` (a
+    random id written when the document starts afresh), so rows of deleted or
+    rewritten documents are skipped at query time; ``compact`` rebuilds the
+    matrix without them. The scan is still exact and linear in the corpus,
+    bounded by memory bandwidth: 1M 384-dimensional float32 rows take 100-200
+    ms, so corpora that need corpus-wide search under 100 ms at that size
+    should use the Chroma backend's ANN index.
+    """
+
+    backend = "numpy"
+
+    def __init__(self, root: Path | None = None, storage_dtype: str | None = None) -> None:
+        settings = get_settings()
+        self.root = root or settings.numpy_vector_path
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.storage_dtype = storage_dtype or settings.embedding_storage_dtype
+
+    def _document_dir(self, document_id: int) -> Path:
+        return self.root / str(document_id)
+
+    @_timed("upsert")
+    def upsert_document_chunks(
+        self,
+        document_id: int,
+        chunks: Sequence[str],
+        embeddings: np.ndarray,
+        *,
+        start_index: int = 0,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+    ) -> None:
+        document_dir = self._document_dir(document_id)
+        if start_index == 0:
+            shutil.rmtree(document_dir, ignore_errors=True)
+        document_dir.mkdir(parents=True, exist_ok=True)
+
+        if start_index != self._row_count(document_dir):
+            raise ValueError(f"Chunks for document {document_id} must be appended in order (got {start_index})")
+        if start_index == 0:
+            (document_dir / "epoch").write_text(str(secrets.randbits(62)))
+
+        indices = range(start_index, start_index + len(chunks))
+        offsets = np.empty(len(chunks), dtype=np.int64)
+        with (document_dir / "chunks.jsonl").open("ab") as fh:
+            for pos, (chunk, metadata) in enumerate(zip(chunks, self._metadatas(document_id, indices, metadatas))):
+                offsets[pos] = fh.tell()
+                fh.write(json.dumps({"document": chunk, "metadata": metadata}).encode("utf-8") + b"\n")
+
+        stored = quantize(embeddings, self.storage_dtype)
+        _append_npy(document_dir / "embeddings.npy", stored.data)
+        if stored.scales is not None:
+            _append_npy(document_dir / "scales.npy", stored.scales)
+        _append_npy(document_dir / "offsets.npy", offsets)
+        self._append_corpus(document_id, start_index, offsets, stored)
+
+    def _row_count(self, document_dir: Path) -> int:
+        offsets = document_dir / "offsets.npy"
+        return len(np.load(offsets, mmap_mode="r")) if offsets.exists() else 0
+
+    @_timed("query")
+    def query_document(
+        self,
+        document_id: int,
+        query_embedding: np.ndarray,
+        top_k: int = 4,
+    ) -> dict:
+        document_dir = self._document_dir(document_id)
+        if not (document_dir / "offsets.npy").exists():
+            return self._result([])
+        return self._result(self._top_rows(document_dir, query_embedding, top_k))
+
+    @_timed("query_corpus")
+    def query_corpus(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 10,
+        document_ids: Sequence[int] | None = None,
+    ) -> dict:
+        """Exact search over the corpus matrix, or over ``document_ids``' own matrices when given."""
+        if document_ids is None:
+            try:
+                rows = self._top_corpus_rows(self._corpus_dir(), query_embedding, top_k)
+            except FileNotFoundError:
+                # ``compact`` replaced the matrix between reading the pointer and mapping its files.
+                rows = self._top_corpus_rows(self._corpus_dir(), query_embedding, top_k)
+            return self._result(rows)
+        document_dirs = [self._document_dir(document_id) for document_id in document_ids]
+        candidates: list[tuple[float, Path, int, int]] = []
+        for document_dir in document_dirs:
+            if not (document_dir / "offsets.npy").exists():
+                continue
+            candidates.extend(self._top_rows(document_dir, query_embedding, top_k))
+        candidates.sort(key=lambda candidate: -candidate[0])
+        return self._result(candidates[:top_k])
+
+    def _top_rows(
+        self, document_dir: Path, query_embedding: np.ndarray, top_k: int
+    ) -> list[tuple[float, Path, int, int]]:
+        """Best ``top_k`` rows of one document as (similarity, dir, row, sidecar offset)."""
+        offsets = np.load(document_dir / "offsets.npy", mmap_mode="r")
+        matrix = np.load(document_dir / "embeddings.npy", mmap_mode="r")[: len(offsets)]
+        scales_path = document_dir / "scales.npy"
+        scales = np.load(scales_path, mmap_mode="r")[: len(offsets)] if scales_path.exists() else None
+
+        similarities = scores(QuantizedVectors(matrix, scales), query_embedding)
+        k = min(top_k, len(similarities))
+        if k == 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(float(similarities[row]), document_dir, int(row), int(offsets[row])) for row in top]
+
+    def _top_corpus_rows(
+        self, corpus_dir: Path, query_embedding: np.ndarray, top_k: int
+    ) -> list[tuple[float, Path, int, int]]:
+        """Best ``top_k`` live rows of the corpus matrix, as ``_top_rows`` returns them."""
+        rows_path = corpus_dir / "rows.npy"
+        if not rows_path.exists():
+            return []
+        # Rows are appended last, so every row listed here has its embedding written.
+        rows = np.load(rows_path, mmap_mode="r")
+        count = len(rows)
+        matrix = np.load(corpus_dir / "embeddings.npy", mmap_mode="r")[:count]
+        scales_path = corpus_dir / "scales.npy"
+        scales = np.load(scales_path, mmap_mode="r")[:count] if scales_path.exists() else None
+
+        # Score in blocks so quantized rows are never widened to float32 all at once.
+        similarities = np.empty(count, dtype=np.float32)
+        for start in range(0, count, _CORPUS_BLOCK_ROWS):
+            block = slice(start, start + _CORPUS_BLOCK_ROWS)
+            similarities[block] = scores(
+                QuantizedVectors(matrix[block], scales[block] if scales is not None else None), query_embedding
+            )
+
+        epochs: dict[int, int | None] = {}
+        # A rebuild racing an upsert can copy rows that the upsert then appends again.
+        returned: set[tuple[int, int]] = set()
+        found: list[tuple[float, Path, int, int]] = []
+        seen = 0
+        k = min(count, 2 * top_k)
+        while k > seen:
+            top = np.argpartition(-similarities, k - 1)[:k] if k < count else np.arange(count)
+            top = top[np.argsort(-similarities[top], kind="stable")]
+            for row in top[seen:]:
+                document_id, epoch, document_row, offset = (int(value) for value in rows[row])
+                if document_id not in epochs:
+                    epochs[document_id] = self._epoch(self._document_dir(document_id))
+                if epochs[document_id] != epoch or (document_id, document_row) in returned:
+                    continue
+                returned.add((document_id, document_row))
+                found.append((float(similarities[row]), self._document_dir(document_id), document_row, offset))
+                if len(found) == top_k:
+                    return found
+            # Stale rows crowded out the live ones; widen the candidate set.
+            seen, k = k, min(count, 2 * k)
+        return found
+
+    @staticmethod
+    def _epoch(document_dir: Path) -> int | None:
+        try:
+            return int((document_dir / "epoch").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @contextlib.contextmanager
+    def _corpus_lock(self) -> Iterator[None]:
+        """Serialize corpus appends and rebuilds across threads and worker processes."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with (self.root / _CORPUS_LOCK).open("a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _current_corpus_dir(self) -> Path | None:
+        try:
+            return self.root / json.loads((self.root / _CORPUS_POINTER).read_text())["dir"]
+        except FileNotFoundError:
+            return None
+
+    def _corpus_dir(self) -> Path:
+        """The current corpus matrix, built from the document directories if there is none yet."""
+        corpus_dir = self._current_corpus_dir()
+        if corpus_dir is None:
+            with self._corpus_lock():
+                corpus_dir = self._current_corpus_dir() or self._rebuild_corpus()
+        return corpus_dir
+
+    def _append_corpus(self, document_id: int, start_index: int, offsets: np.ndarray, stored: QuantizedVectors) -> None:
+        with self._corpus_lock():
+            corpus_dir = self._current_corpus_dir()
+            if corpus_dir is None:
+                # The first rows, or an index from before the corpus matrix: the build includes these rows.
+                self._rebuild_corpus()
+                return
+            epoch = self._epoch(self._document_dir(document_id))
+            rows = np.column_stack(
+                [
+                    np.full(len(offsets), document_id, dtype=np.int64),
+                    np.full(len(offsets), epoch, dtype=np.int64),
+                    np.arange(start_index, start_index + len(offsets), dtype=np.int64),
+                    offsets,
+                ]
+            )
+            _append_npy(corpus_dir / "embeddings.npy", stored.data)
+            if stored.scales is not None:
+                _append_npy(corpus_dir / "scales.npy", stored.scales)
+            _append_npy(corpus_dir / "rows.npy", rows)
+
+    def _rebuild_corpus(self) -> Path:
+        """Write a corpus matrix of every document's current rows and switch to it. Call with the lock held."""
+        previous = self._current_corpus_dir()
+        corpus_dir = self.root / f"corpus-{uuid.uuid4().hex}"
+        corpus_dir.mkdir()
+        for document_dir in self.root.iterdir():
+            if not document_dir.name.isdigit() or not (document_dir / "offsets.npy").exists():
+                continue
+            offsets = np.load(document_dir / "offsets.npy", mmap_mode="r")
+            count = len(offsets)
+            if count == 0:
+                continue
+            epoch = self._epoch(document_dir)
+            if epoch is None:
+                # Written before the corpus matrix existed.
+                epoch = secrets.randbits(62)
+                (document_dir / "epoch").write_text(str(epoch))
+            _append_npy(
+                corpus_dir / "embeddings.npy", np.load(document_dir / "embeddings.npy", mmap_mode="r")[:count]
+            )
+            scales_path = document_dir / "scales.npy"
+            if scales_path.exists():
+                _append_npy(corpus_dir / "scales.npy", np.load(scales_path, mmap_mode="r")[:count])
+            _append_npy(
+                corpus_dir / "rows.npy",
+                np.column_stack(
+                    [
+                        np.full(count, int(document_dir.name), dtype=np.int64),
+                        np.full(count, epoch, dtype=np.int64),
+                        np.arange(count, dtype=np.int64),
+                        offsets,
+                    ]
+                ),
+            )
+        pointer = self.root / _CORPUS_POINTER
+        tmp = pointer.with_name(f".{pointer.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps({"dir": corpus_dir.name}))
+        os.replace(tmp, pointer)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+        return corpus_dir
+
+    def compact(self) -> int:
+        """Rebuild the corpus matrix once more than ``_CORPUS_MAX_STALE_FRACTION`` of its rows are stale."""
+        with self._corpus_lock():
+            corpus_dir = self._current_corpus_dir()
+            if corpus_dir is None or not (corpus_dir / "rows.npy").exists():
+                return 0
+            rows = np.load(corpus_dir / "rows.npy", mmap_mode="r")
+            document_ids, positions = np.unique(rows[:, 0], return_inverse=True)
+            epochs = [self._epoch(self._document_dir(int(document_id))) for document_id in document_ids]
+            # Epochs are non-negative, so -1 marks a deleted document.
+            current = np.array([-1 if epoch is None else epoch for epoch in epochs], dtype=np.int64)
+            stale = int(np.count_nonzero(current[positions] != rows[:, 1]))
+            if stale <= _CORPUS_MAX_STALE_FRACTION * len(rows):
+                return 0
+            self._rebuild_corpus()
+        logger.info("Compacted the corpus matrix under {}: {} stale rows removed", self.root, stale)
+        return stale
+
+    @staticmethod
+    def _result(rows: Sequence[tuple[float, Path, int, int]]) -> dict:
+        documents, metadatas = [], []
+        for _, document_dir, _, offset in rows:
+            with (document_dir / "chunks.jsonl").open("rb") as fh:
+                fh.seek(offset)
+                record = json.loads(fh.readline())
+            documents.append(record["document"])
+            metadatas.append(record["metadata"])
+        return {
+            "ids": [[f"{meta['document_id']}:{meta['chunk_index']}" for meta in metadatas]],
+            "documents": [documents],
+            "metadatas": [metadatas],
+            # Squared L2 between unit vectors, matching Chroma's default space.
+            "distances": [[2 - 2 * similarity for similarity, *_ in rows]],
+        }
+
+    @_timed("get")
+    def get_document_chunks(self, document_id: int) -> tuple[list[str], np.ndarray, list[dict[str, Any]]]:
+        document_dir = self._document_dir(document_id)
+        if not (document_dir / "offsets.npy").exists():
+            return [], np.empty((0, 0), dtype=np.float32), []
+        count = len(np.load(document_dir / "offsets.npy", mmap_mode="r"))
+        matrix = np.load(document_dir / "embeddings.npy", mmap_mode="r")[:count]
+        scales_path = document_dir / "scales.npy"
+        scales = np.load(scales_path, mmap_mode="r")[:count] if scales_path.exists() else None
+
+        documents, metadatas = [], []
+        with (document_dir / "chunks.jsonl").open("rb") as fh:
+            for line in itertools.islice(fh, count):
+                record = json.loads(line)
+                documents.append(record["document"])
+                metadatas.append(record["metadata"])
+        return documents, dequantize(QuantizedVectors(matrix, scales)), metadatas
+
+    @_timed("delete")
+    def delete_document(self, document_id: int) -> None:
+        shutil.rmtree(self._document_dir(document_id), ignore_errors=True)
+
+    def drop(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+VECTOR_BACKENDS: dict[str, type[VectorStore]] = {
+    "chroma": ChromaVectorStore,
+    "numpy": NumpyVectorStore,
+}
+
+
+def create_vector_store(backend: str | None = None, location: str | None = None) -> VectorStore:
+    """A store for ``backend``; ``location`` is a Chroma collection name or a NumPy root directory."""
+    backend = backend or get_settings().vector_backend
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend {backend!r}; expected one of {sorted(VECTOR_BACKENDS)}")
+    if location is None:
+        return VECTOR_BACKENDS[backend]()
+    if backend == "chroma":
+        return ChromaVectorStore(collection=location)
+    return VECTOR_BACKENDS[backend](Path(location))
+
+
+def version_location(backend: str, version_id: int | None = None) -> str:
+    """Where ``backend`` keeps an index version; ``None`` is the unversioned index that predates versions."""
+    settings = get_settings()
+    if backend == "chroma":
+        name = settings.chroma_collection
+        return name if version_id is None else f"{name}_v{version_id}"
+    root = settings.numpy_vector_path
+    return str(root if version_id is None else root.with_name(f"{root.name}_v{version_id}"))
+
+
+@dataclass
+class IndexHandle:
+    """An index version together with its store; embed with ``version.embedding_model`` to query it."""
+
+    version: IndexVersion
+    store: VectorStore
+
+
+class VersionedVectorStore(VectorStore):
+    """Routes every call to the active index version, as recorded in the chunk store.
+
+    Callers that embed queries or chunks themselves take ``active()`` once and
+    use its model and store together, so a switch of the active version
+    between the two steps cannot mix models. The lookup is one indexed SQLite
+    read, so a switch made by the re-index job is seen by every process on its
+    next call. Deletes also go to versions still being built.
+    """
+
+    backend = "versioned"
+
+    def __init__(self) -> None:
+        self._stores: dict[int, VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def store(self, version: IndexVersion) -> VectorStore:
+        store = self._stores.get(version.id)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(version.id)
+                if store is None:
+                    store = self._stores[version.id] = create_vector_store(version.backend, version.location)
+        return store
+
+    def active(self) -> IndexHandle:
+        version = chunk_store.active_version()
+        if version is None:
+            # First start with versioning: the existing index becomes version 1.
+            settings = get_settings()
+            version = chunk_store.bootstrap_version(
+                settings.embedding_model, settings.vector_backend, version_location(settings.vector_backend)
+            )
+        return IndexHandle(version, self.store(version))
+
+    def create_version(self, embedding_model: str, backend: str) -> IndexVersion:
+        return chunk_store.create_version(
+            embedding_model, backend, lambda version_id: version_location(backend, version_id)
+        )
+
+    def upsert_document_chunks(
+        self,
+        document_id: int,
+        chunks: Sequence[str],
+        embeddings: np.ndarray,
+        *,
+        start_index: int = 0,
+        metadatas: Sequence[dict[str, Any]] | None = None,
+    ) -> None:
+        self.active().store.upsert_document_chunks(
+            document_id, chunks, embeddings, start_index=start_index, metadatas=metadatas
+        )
+
+    def query_document(self, document_id: int, query_embedding: np.ndarray, top_k: int = 4) -> dict:
+        return self.active().store.query_document(document_id, query_embedding, top_k)
+
+    def query_corpus(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 10,
+        document_ids: Sequence[int] | None = None,
+    ) -> dict:
+        return self.active().store.query_corpus(query_embedding, top_k, document_ids)
+
+    def get_document_chunks(self, document_id: int) -> tuple[list[str], np.ndarray, list[dict[str, Any]]]:
+        return self.active().store.get_document_chunks(document_id)
+
+    def delete_document(self, document_id: int) -> None:
+        for version in chunk_store.versions():
+            if version.status != "retired":
+                self.store(version).delete_document(document_id)
+
+    def reopen(self) -> None:
+        with self._lock:
+            if any(isinstance(store, ChromaVectorStore) for store in self._stores.values()):
+                from chromadb.api.shared_system_client import SharedSystemClient
+
+                # Chroma caches one client (and its SQLite connections) per path, process-wide.
+                SharedSystemClient.clear_system_cache()
+            self._stores.clear()
+
+    def compact(self) -> int:
+        return sum(
+            self.store(version).compact() for version in chunk_store.versions() if version.status != "retired"
+        )
+
+    def drop(self) -> None:
+        """Delete every version and its index; the next call starts over with a fresh version."""
+        for version in chunk_store.versions():
+            self.store(version).drop()
+            with self._lock:
+                self._stores.pop(version.id, None)
+            chunk_store.delete_version(version.id)
 
-vector_store = VectorStore()
+    def drop_retired(self, min_age_seconds: float) -> int:
+        """Delete versions retired at least ``min_age_seconds`` ago. Returns the number dropped."""
+        dropped = 0
+        for version in chunk_store.retired_versions(min_age_seconds):
+            self.store(version).drop()
+            with self._lock:
+                self._stores.pop(version.id, None)
+            chunk_store.delete_version(version.id)
+            dropped += 1
+        return dropped
 
-__all__ = ["VectorStore", "vector_store"]
 
+vector_store = lazy("vector_store", VersionedVectorStore)
 
+__all__ = [
+    "ChromaVectorStore",
+    "IndexHandle",
+    "NumpyVectorStore",
+    "VECTOR_BACKENDS",
+    "VectorStore",
+    "VersionedVectorStore",
+    "create_vector_store",
+    "vector_store",
+    "version_location",
+]
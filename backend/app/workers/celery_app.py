@@ -1,6 +1,10 @@
-from celery import Celery
+import time
+from typing import Any
+
+from celery import Celery, signals
 
 from app.core.config import get_settings
+from app.core.metrics import TASK_QUEUE_WAIT_SECONDS, TASK_SECONDS
 
 settings = get_settings()
 
@@ -10,11 +14,48 @@ celery_app = Celery(
     backend=settings.celery_result_backend,
 )
 
+# CPU-bound stages (parsing, OCR, embedding) go to "cpu", served by a prefork pool sized
+# to the cores; LLM enrichment goes to "io", served by a high-concurrency thread pool.
 celery_app.conf.update(
-    task_routes={"app.workers.tasks.*": {"queue": "documents"}},
+    task_routes={
+        "app.workers.tasks.enrich_document": {"queue": "io"},
+        "app.workers.tasks.*": {"queue": "cpu"},
+    },
+    task_default_queue="cpu",
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
     task_track_started=True,
+    beat_schedule={
+        "collect-garbage": {
+            "task": "app.workers.tasks.collect_garbage",
+            "schedule": 6 * 60 * 60,
+        },
+    },
 )
 
 celery_app.autodiscover_tasks(["app.workers"])
 
 
+@signals.before_task_publish.connect
+def _stamp_published_at(headers: dict[str, Any] | None = None, **_: Any) -> None:
+    # Custom headers become attributes of ``task.request`` on the worker.
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+@signals.task_prerun.connect
+def _observe_queue_wait(task: Any = None, **_: Any) -> None:
+    published_at = task.request.get("published_at")
+    if published_at is not None:
+        # Wall clocks of publisher and worker hosts may disagree slightly; never report < 0.
+        TASK_QUEUE_WAIT_SECONDS.labels(task.name).observe(max(time.time() - published_at, 0.0))
+    task.request.started_at = time.perf_counter()
+
+
+@signals.task_postrun.connect
+def _observe_task(task: Any = None, state: str | None = None, **_: Any) -> None:
+    started_at = task.request.get("started_at")
+    if started_at is not None:
+        TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started_at)
+
+
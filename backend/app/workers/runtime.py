@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import os
+import threading
+from typing import Any, Coroutine, TypeVar
+
+from celery import signals
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import metrics
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """One event loop and one pooled database engine for a worker process.
+
+    The loop runs on a dedicated thread and tasks submit coroutines to it, so
+    task threads (the ``io`` queue's thread pool) and prefork children alike
+    reuse the same loop and the same open connections instead of building an
+    event loop and connecting afresh for every task.
+    """
+
+    def __init__(self, database_url: str | None = None, pool_size: int | None = None) -> None:
+        settings = get_settings()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="worker-runtime", daemon=True)
+        self._thread.start()
+        self.engine: AsyncEngine = create_async_engine(
+            database_url or settings.database_url,
+            echo=False,
+            pool_size=pool_size or settings.worker_db_pool_size,
+            pool_pre_ping=True,
+        )
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run ``coro`` on the runtime's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self) -> None:
+        if self.loop.is_closed():
+            return
+        try:
+            self.run(self.engine.dispose())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=10)
+            self.loop.close()
+
+
+_runtime: WorkerRuntime | None = None
+_runtime_pid: int | None = None
+_lock = threading.Lock()
+
+
+def get_runtime() -> WorkerRuntime:
+    """This process's runtime, created on first use (and again after a fork)."""
+    global _runtime, _runtime_pid
+    with _lock:
+        if _runtime is None or _runtime_pid != os.getpid():
+            _runtime, _runtime_pid = WorkerRuntime(), os.getpid()
+        return _runtime
+
+
+def close_runtime() -> None:
+    global _runtime
+    with _lock:
+        runtime, _runtime = _runtime, None
+    if runtime is not None and _runtime_pid == os.getpid():
+        runtime.close()
+
+
+def _set_torch_threads(threads: int) -> int | None:
+    """Set torch's intra-op thread count, returning the previous one (``None`` without torch)."""
+    try:
+        import torch
+    except ImportError:
+        return None
+    previous = torch.get_num_threads()
+    torch.set_num_threads(threads)
+    return previous
+
+
+def preload_models() -> None:
+    """Load and exercise the embedding models and tokenizer in the parent, then freeze the heap.
+
+    Children forked afterwards share these pages copy-on-write. ``gc.freeze``
+    moves everything allocated so far out of the collector's reach, so
+    collections in the children do not write to (and so copy) those pages.
+    The active index version's model is loaded too when it differs from the
+    configured one (until a re-index to the configured model switches over).
+    """
+    # Rayon and OpenMP thread pools do not survive fork; keep the warm-up single-threaded.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    previous = _set_torch_threads(1)
+
+    from app.services.embeddings import embedding_service, embedding_service_for
+    from app.services.vector_store import vector_store
+    from app.workers import tasks
+
+    try:
+        embedding_service.embed(["warm-up"])
+        embedding_service_for(vector_store.active().version.embedding_model).embed(["warm-up"])
+        list(tasks.processor.chunker.iter_chunks([(1, "Warm-up text for the chunker.")]))
+    finally:
+        if previous is not None:
+            _set_torch_threads(previous)
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded models and froze {} objects before forking", gc.get_freeze_count())
+
+
+def _is_prefork(pool_cls: Any) -> bool:
+    from celery.concurrency import get_implementation
+    from celery.concurrency.prefork import TaskPool
+
+    return get_implementation(pool_cls) is TaskPool
+
+
+@signals.worker_init.connect
+def _on_worker_init(sender: Any = None, **_: Any) -> None:
+    metrics.clear_multiprocess_dir()
+    if sender is not None and _is_prefork(sender.pool_cls):
+        from app.services.ocr import set_worker_processes
+
+        # Every prefork child gets its own OCR pool; without this each would size it to all cores.
+        set_worker_processes(sender.concurrency)
+    if get_settings().worker_preload_models:
+        preload_models()
+
+
+@signals.worker_ready.connect
+def _on_worker_ready(**_: Any) -> None:
+    # After the pool has forked, so children do not inherit the server's socket.
+    port = get_settings().worker_metrics_port
+    if port:
+        from prometheus_client import start_http_server
+
+        start_http_server(port, registry=metrics.registry())
+        logger.info("Serving worker metrics on port {}", port)
+
+
+@signals.worker_process_init.connect
+def _on_worker_process_init(**_: Any) -> None:
+    from app.services.chunk_store import chunk_store
+    from app.services.llm_cache import llm_cache
+    from app.services.registry import loaded
+    from app.services.search_index import search_index
+    from app.services.vector_store import vector_store
+
+    settings = get_settings()
+    if settings.worker_torch_threads:
+        _set_torch_threads(settings.worker_torch_threads)
+    # Connections inherited from the parent must not be shared with it or with siblings.
+    if loaded("vector_store"):
+        vector_store.reopen()
+    if loaded("search_index"):
+        search_index.reset_connections()
+    if loaded("llm_cache"):
+        llm_cache.reset_connections()
+    if loaded("chunk_store"):
+        chunk_store.reset_connections()
+    get_runtime()
+
+
+@signals.worker_process_shutdown.connect
+@signals.worker_shutdown.connect
+def _on_worker_shutdown(**_: Any) -> None:
+    from app.services.ocr import ocr_engine
+    from app.services.registry import loaded
+
+    close_runtime()
+    if loaded("ocr_engine"):
+        ocr_engine.shutdown()
+    metrics.mark_process_dead()
+
+
+__all__ = ["WorkerRuntime", "close_runtime", "get_runtime", "preload_models"]
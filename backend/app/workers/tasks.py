@@ -1,104 +1,230 @@
 from pathlib import Path
+from typing import Any, Coroutine, Optional, TypeVar
 
+from celery import Signature, chain
 from loguru import logger
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
 
 from app.core.config import get_settings
 from app.models.document import Document, DocumentStatus
+from app.services.artifact_cache import artifact_cache
+from app.services.artifact_store import artifact_store
 from app.services.document_processor import DocumentProcessor
+from app.services.llm_cache import llm_cache
+from app.services.reindex import reindexer
+from app.services.search_index import search_index
+from app.services.stage_workspace import StageWorkspace, remove_stale_workspaces
+from app.services.storage import file_sha256, remove_unreferenced_uploads
+from app.services.vector_store import vector_store
 from app.workers.celery_app import celery_app
+from app.workers.runtime import get_runtime
 
 settings = get_settings()
 processor = DocumentProcessor()
 
-# Create async engine for database operations in Celery task
-engine = create_async_engine(settings.database_url, echo=False)
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+T = TypeVar("T")
+
+
+def _run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run ``coro`` on this worker process's persistent loop (see ``app.workers.runtime``)."""
+    return get_runtime().run(coro)
+
+
+def async_session():
+    return get_runtime().session()
+
+
+async def _start(document_id: int, file_path: str) -> Optional[str]:
+    """Mark the document as processing and return its content hash, or ``None`` if it is gone."""
+    async with async_session() as session:
+        result = await session.execute(select(Document).where(Document.id == document_id))
+        document = result.scalar_one_or_none()
+        if not document:
+            logger.error("Document {} not found", document_id)
+            return None
+
+        logger.info("Starting processing for document {}", document_id)
+        document.status = DocumentStatus.PROCESSING
+        if not document.content_hash:
+            document.content_hash = file_sha256(Path(file_path))
+        await session.commit()
+        return document.content_hash
+
+
+async def _complete(document_id: int, result: dict) -> dict:
+    async with async_session() as session:
+        document = await session.get(Document, document_id)
+        if not document:
+            # Deleted while the pipeline ran; the caller still removes the stage workspace.
+            logger.error("Document {} not found", document_id)
+            return {"error": "Document not found"}
+        summary = result["summary"]
+        key_points = result["key_points"]
+        sentiment = result["sentiment"]
+        category = result["category"]
+        tables = result["tables"]
+        keywords = key_points[:8]
+
+        # Build insights object
+        insights = {
+            "summary": summary,
+            "key_points": key_points,
+            "sentiment": sentiment,
+            "category": category,
+            "keywords": keywords,
+            "tables": tables,
+            "enrichment": result["enrichment"],
+        }
+
+        # Update document
+        document.summary = summary
+        document.key_points = key_points
+        document.sentiment = sentiment
+        document.category = category
+        document.insights = insights
+        document.status = DocumentStatus.COMPLETED
+
+        await session.commit()
+        await session.refresh(document)
+        search_index.set_document_attributes(document_id, category, sentiment, document.created_at)
+
+    logger.info("Finished processing document {} (enrichment: {})", document_id, result["enrichment"])
+    return {
+        "document_id": document_id,
+        "status": "completed",
+        "summary": summary,
+        "key_points": key_points,
+        "sentiment": sentiment,
+        "category": category,
+    }
+
+
+async def _mark_failed(document_id: int) -> None:
+    try:
+        async with async_session() as session:
+            document = await session.get(Document, document_id)
+            if document:
+                document.status = DocumentStatus.FAILED
+                await session.commit()
+    except Exception as commit_error:
+        logger.error("Error updating document status: {}", commit_error)
+
+
+def _fail(document_id: int, error: Exception, workspace: Optional[StageWorkspace] = None) -> None:
+    logger.error("Error processing document {}: {}", document_id, error)
+    _run(_mark_failed(document_id))
+    if workspace is not None:
+        workspace.remove()
+
+
+def document_pipeline(document_id: int, file_path: str) -> Signature:
+    """Staged processing: extract and index on the ``cpu`` queue, then enrich on ``io``.
+
+    Stages pass only a small payload; pages, text and tables travel through a
+    ``StageWorkspace`` on shared storage.
+    """
+    return chain(
+        extract_document.s(document_id, file_path),
+        index_document.s(),
+        enrich_document.s(),
+    )
 
 
 @celery_app.task(name="app.workers.tasks.process_document")
 def process_document(document_id: int, file_path: str) -> dict:
-    import asyncio
-    
-    async def _process():
+    """Process a document end to end in one task (the staged ``document_pipeline`` splits this up)."""
+    try:
+        content_hash = _run(_start(document_id, file_path))
+        if content_hash is None:
+            return {"error": "Document not found"}
+        result = processor.process(document_id, Path(file_path), content_hash=content_hash)
+        return _run(_complete(document_id, result))
+    except Exception as e:
+        _fail(document_id, e)
+        raise
+
+
+@celery_app.task(name="app.workers.tasks.extract_document")
+def extract_document(document_id: int, file_path: str) -> Optional[dict]:
+    workspace = None
+    try:
+        content_hash = _run(_start(document_id, file_path))
+        if content_hash is None:
+            return None
+        workspace = StageWorkspace.create(document_id)
+        processor.extract_stage(document_id, Path(file_path), workspace, content_hash=content_hash)
+        return {"document_id": document_id, "workspace": str(workspace.path), "content_hash": content_hash}
+    except Exception as e:
+        _fail(document_id, e, workspace)
+        raise
+
+
+@celery_app.task(name="app.workers.tasks.index_document")
+def index_document(payload: Optional[dict]) -> Optional[dict]:
+    if payload is None:
+        return None
+    workspace = StageWorkspace(Path(payload["workspace"]))
+    try:
+        processor.index_stage(payload["document_id"], workspace, content_hash=payload["content_hash"])
+        return payload
+    except Exception as e:
+        _fail(payload["document_id"], e, workspace)
+        raise
+
+
+@celery_app.task(name="app.workers.tasks.enrich_document")
+def enrich_document(payload: Optional[dict]) -> dict:
+    if payload is None:
+        return {"error": "Document not found"}
+    document_id = payload["document_id"]
+    workspace = StageWorkspace(Path(payload["workspace"]))
+    try:
+        result = processor.enrich_stage(workspace, content_hash=payload["content_hash"])
+        completed = _run(_complete(document_id, result))
+    except Exception as e:
+        _fail(document_id, e, workspace)
+        raise
+    workspace.remove()
+    return completed
+
+
+@celery_app.task(name="app.workers.tasks.reindex_embeddings")
+def reindex_embeddings() -> dict:
+    """Re-embed stored chunks into an index version for the configured model and backend, then switch to it.
+
+    Safe to re-run: an interrupted job resumes from its saved progress.
+    """
+
+    async def _completed() -> list[int]:
         async with async_session() as session:
-            try:
-                # Get document
-                result = await session.execute(select(Document).where(Document.id == document_id))
-                document = result.scalar_one_or_none()
-                
-                if not document:
-                    logger.error("Document {} not found", document_id)
-                    return {"error": "Document not found"}
-                
-                logger.info("Starting processing for document {}", document_id)
-                document.status = DocumentStatus.PROCESSING
-                await session.commit()
-                
-                # Process document end-to-end
-                path = Path(file_path)
-                result = processor.process(document_id, path)
-                summary = result["summary"]
-                key_points = result["key_points"]
-                sentiment = result["sentiment"]
-                category = result["category"]
-                tables = result["tables"]
-                keywords = key_points[:8]
-                
-                # Build insights object
-                insights = {
-                    "summary": summary,
-                    "key_points": key_points,
-                    "sentiment": sentiment,
-                    "category": category,
-                    "keywords": keywords,
-                    "tables": tables,
-                }
-                
-                # Update document
-                document.summary = summary
-                document.key_points = key_points
-                document.sentiment = sentiment
-                document.category = category
-                document.insights = insights
-                document.status = DocumentStatus.COMPLETED
-                
-                await session.commit()
-                await session.refresh(document)
-                
-                logger.info("Finished processing document {}", document_id)
-                return {
-                    "document_id": document_id,
-                    "status": "completed",
-                    "summary": summary,
-                    "key_points": key_points,
-                    "sentiment": sentiment,
-                    "category": category,
-                }
-            except Exception as e:
-                logger.error("Error processing document {}: {}", document_id, e)
-                # Update document status to failed
-                try:
-                    result = await session.execute(select(Document).where(Document.id == document_id))
-                    document = result.scalar_one_or_none()
-                    if document:
-                        document.status = DocumentStatus.FAILED
-                        await session.commit()
-                except Exception as commit_error:
-                    logger.error("Error updating document status: {}", commit_error)
-                raise
-    
-    # Run async function
-    loop = asyncio.get_event_loop()
-    if loop.is_running():
-        # If loop is already running, create a new task
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(asyncio.run, _process())
-            return future.result()
-    else:
-        return asyncio.run(_process())
+            rows = await session.execute(select(Document.id).where(Document.status == DocumentStatus.COMPLETED))
+        return list(rows.scalars())
+
+    return reindexer.run(_run(_completed()))
 
 
+@celery_app.task(name="app.workers.tasks.collect_garbage")
+def collect_garbage() -> dict:
+    """Evict unreferenced uploads, cached and stored artifacts, stale LLM responses and retired index versions.
+
+    Also compacts the active index, dropping vectors of deleted or rewritten documents.
+    """
+
+    async def _referenced() -> tuple[list[str], list[str]]:
+        async with async_session() as session:
+            rows = (await session.execute(select(Document.content_hash, Document.storage_path))).all()
+        return [row.content_hash for row in rows if row.content_hash], [row.storage_path for row in rows]
+
+    hashes, paths = _run(_referenced())
+    min_age = settings.artifact_gc_min_age_seconds
+    return {
+        "artifacts_removed": artifact_cache.collect_garbage(
+            hashes, min_age, settings.stage_workspace_max_age_seconds
+        ),
+        "stored_artifacts_removed": artifact_store.collect_garbage(hashes, min_age),
+        "uploads_removed": remove_unreferenced_uploads(paths, min_age),
+        "workspaces_removed": remove_stale_workspaces(settings.stage_workspace_max_age_seconds),
+        "llm_responses_removed": llm_cache.collect_garbage(),
+        "index_versions_dropped": vector_store.drop_retired(settings.index_version_retention_seconds),
+        "vector_rows_compacted": vector_store.compact(),
+    }
@@ -1,8 +1,8 @@
 #!/usr/bin/env python
-"""Convenience script to run Celery worker."""
+"""Convenience script to run a Celery worker serving both the cpu and io queues."""
 from app.workers.celery_app import celery_app
 
 if __name__ == "__main__":
-    celery_app.worker_main()
+    celery_app.worker_main(["worker", "--loglevel=INFO", "--queues=cpu,io"])
 
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""Storage footprint and read latency of extracted text, chunks and tables, before and after the artifact store.
+
+Generates ``--documents`` synthetic documents of ``--pages`` pages (Zipf-distributed
+words, so they compress like prose) with ``--tables`` tables of ``--table-rows``
+rows each, chunks them with ``CHUNK_MAX_TOKENS``-token chunks overlapping by
+``--overlap`` of their length, and compares what the previous layout kept (the
+artifact cache's ``text.txt`` and chunk texts, and full tables in the insights
+column) with the artifact store entry, the cache's metadata-only chunk records
+and the table previews kept in insights. Then times reading one chunk, one page
+and 100 table rows through the store against decompressing the whole text and
+parsing the full insights.
+
+Usage: python scripts/benchmark_artifact_store.py [--documents 10] [--pages 200] [--tables 2] [--table-rows 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def document(rng: np.random.Generator, vocabulary: list[str], pages: int) -> list[tuple[int, str]]:
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    result = []
+    for page in range(1, pages + 1):
+        paragraphs = []
+        for _ in range(6):
+            sentences = []
+            for _ in range(8):
+                words = rng.choice(vocabulary, size=int(rng.integers(8, 24)), p=weights)
+                sentences.append(" ".join(words).capitalize() + f" {int(rng.integers(1, 10_000))}.")
+            paragraphs.append(" ".join(sentences))
+        result.append((page, "\n\n".join(paragraphs) + "\n\n"))
+    return result
+
+
+def table(rng: np.random.Generator, rows: int) -> dict:
+    return {
+        "headers": ["sku", "description", "quantity", "unit price", "total"],
+        "rows": [
+            [f"SKU-{sku:05d}", f"Widget model {model}", str(quantity), f"{price:.2f}", f"{quantity * price:.2f}"]
+            for sku, model, quantity, price in zip(
+                rng.integers(1, 5000, rows),
+                rng.integers(1, 40, rows),
+                rng.integers(1, 100, rows),
+                rng.uniform(1, 500, rows),
+            )
+        ],
+    }
+
+
+def median_ms(call, repeats: int = 50) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--tables", type=int, default=2)
+    parser.add_argument("--table-rows", type=int, default=2000)
+    parser.add_argument("--overlap", type=float, default=0.2, help="chunk overlap as a fraction of chunk tokens")
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp())
+    os.environ["ARTIFACT_STORE_PATH"] = str(root / "store")
+    os.environ["ARTIFACT_STORE_BACKEND"] = "local"
+    from app.core.config import get_settings
+    from app.services.artifact_store import artifact_store, summarize_tables
+    from app.services.chunking import TokenChunker, WordCounter
+
+    settings = get_settings()
+    chunker = TokenChunker(
+        WordCounter(),
+        max_tokens=settings.chunk_max_tokens,
+        overlap_tokens=int(settings.chunk_max_tokens * args.overlap),
+    )
+    rng = np.random.default_rng(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = ["".join(rng.choice(list(letters), size=int(rng.integers(2, 11)))) for _ in range(5000)]
+
+    before = {"text": 0, "chunk texts": 0, "insights": 0}
+    after = {"store": 0, "chunk records": 0, "insights": 0}
+    stored = []
+    write_seconds = 0.0
+    for number in range(args.documents):
+        pages = document(rng, vocabulary, args.pages)
+        tables = [table(rng, args.table_rows) for _ in range(args.tables)]
+        chunks = list(chunker.iter_chunks(pages))
+        content_hash = f"{number:064x}"
+
+        before["text"] += sum(len(text.encode()) for _, text in pages)
+        before["chunk texts"] += sum(
+            len(json.dumps({"text": chunk.text, **chunk.vector_metadata()})) + 1 for chunk in chunks
+        )
+        before["insights"] += len(json.dumps({"tables": tables}))
+        after["chunk records"] += sum(len(json.dumps(chunk.vector_metadata())) + 1 for chunk in chunks)
+        after["insights"] += len(json.dumps({"tables": summarize_tables(tables)}))
+
+        started = time.perf_counter()
+        writer = artifact_store.writer(content_hash)
+        for page, text in pages:
+            writer.add_page(page, text)
+        writer.add_chunks(chunks)
+        writer.add_tables(tables)
+        writer.commit()
+        write_seconds += time.perf_counter() - started
+        stored.append((content_hash, pages, chunks, tables))
+
+    after["store"] = sum(path.stat().st_size for path in (root / "store").rglob("*") if path.is_file())
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(f"{args.documents} documents, {before['text'] / 1e6:.1f} MB of text")
+    for label, sizes in (("before", before), ("after", after)):
+        parts = ", ".join(f"{name} {size / 1e6:.2f} MB" for name, size in sizes.items())
+        print(f"{label:<7} {parts} = {sum(sizes.values()) / 1e6:.2f} MB")
+    per_document = args.documents * 1e3
+    print(
+        f"footprint {total_before / total_after:.1f}x smaller; insights (DB row) "
+        f"{before['insights'] / per_document:.1f} kB -> {after['insights'] / per_document:.1f} kB per document; "
+        f"writes {before['text'] / write_seconds / 1e6:.0f} MB/s"
+    )
+
+    content_hash, pages, chunks, tables = stored[0]
+    full_insights = json.dumps({"tables": tables})
+    picks = random.Random(7)
+    timings = {
+        "one chunk": median_ms(lambda: artifact_store.read_chunk(content_hash, picks.randrange(len(chunks)))),
+        "one page": median_ms(lambda: artifact_store.read_page(content_hash, picks.randrange(1, len(pages) + 1))),
+        "100 table rows": median_ms(
+            lambda: artifact_store.read_table(content_hash, 0, picks.randrange(args.table_rows - 100), 100)
+        ),
+        "whole text": median_ms(lambda: artifact_store.read_text(content_hash)),
+        "full insights": median_ms(lambda: json.loads(full_insights)),
+    }
+    print("reads (median): " + ", ".join(f"{name} {ms:.2f} ms" for name, ms in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Concurrent /ask throughput and event-loop responsiveness of one API process.
+
+Starts ``fake_llm_server`` in a background thread, indexes a synthetic
+document, then issues ``--concurrency`` distinct questions at once through
+``RagService.aanswer`` (``--mode async``) or the synchronous ``answer`` called
+on the loop, as the route used to (``--mode blocking``). A probe coroutine
+measures event-loop lag the whole time, standing in for ``/health``.
+
+Usage: python scripts/benchmark_ask_concurrency.py [--concurrency 500] [--mode async blocking]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import uvicorn
+
+PORT = 8199
+
+
+def start_fake_llm(latency_ms: float) -> None:
+    from fake_llm_server import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(latency_ms, 0, token_ms=0), port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def probe(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+
+async def run(modes: list[str], concurrency: int) -> None:
+    for mode in modes:
+        await measure(mode, concurrency)
+
+
+async def measure(mode: str, concurrency: int) -> None:
+    from app.services.rag import rag_service
+
+    async def ask(i: int) -> float:
+        started = time.perf_counter()
+        question = f"When does contract {i} renew?"
+        if mode == "async":
+            await rag_service.aanswer(1, question, version=mode)
+        else:
+            rag_service.answer(1, question, version=mode)
+        return time.perf_counter() - started
+
+    stop, lags = asyncio.Event(), []
+    prober = asyncio.create_task(probe(stop, lags))
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(ask(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    print(
+        f"{mode:<8} n={concurrency} total={elapsed:6.2f}s rps={concurrency / elapsed:7.1f} "
+        f"p50={p50:7.0f}ms p95={p95:7.0f}ms loop-lag max={max(lags, default=0):7.0f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--mode", nargs="+", default=["async", "blocking"], choices=["async", "blocking"])
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--chunks", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ.setdefault("VECTOR_BACKEND", "numpy")
+    os.environ.setdefault("NUMPY_VECTOR_PATH", tempfile.mkdtemp())
+    start_fake_llm(args.latency_ms)
+
+    from app.services.embeddings import embedding_service
+    from app.services.rag import rag_service  # noqa: F401  (registers the services /ask uses)
+    from app.services.registry import warm_up
+    from app.services.vector_store import vector_store
+
+    # Build services up front, as the API's startup warm-up does, so the first asks do not.
+    warm_up()
+    texts = [f"Clause {i}: the agreement renews every {i % 12 + 1} months." for i in range(args.chunks)]
+    vector_store.upsert_document_chunks(1, texts, embedding_service.embed(texts))
+
+    # One loop for every mode: the pooled HTTP client and stage semaphores bind to it.
+    asyncio.run(run(args.mode, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
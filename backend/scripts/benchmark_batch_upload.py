@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Ingest throughput and round trips: per-file /documents/upload vs /documents/batch.
+
+Runs the API in-process over ``httpx.ASGITransport`` against a temporary
+SQLite database, with Celery publishing to the in-memory broker so no worker
+or Redis is needed. For ``--files`` small synthetic text documents it reports
+wall time, files per second, SQL statements executed and broker publishes
+for three modes: one upload request per file, one multi-file batch request,
+and one zip archive batch request.
+
+Usage: python scripts/benchmark_batch_upload.py [--files 1000] [--file-bytes 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+
+def make_files(count: int, size: int) -> list[tuple[str, bytes]]:
+    return [(f"doc-{i:05d}.txt", (f"Document {i}. " * (size // 14 + 1)).encode()[:size]) for i in range(count)]
+
+
+async def run(args: argparse.Namespace) -> None:
+    import httpx
+    from celery.signals import before_task_publish
+    from sqlalchemy import event
+
+    from app.db.session import engine
+    from app.main import app
+    from app.models.base import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    counters = {"statements": 0, "publishes": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*_args, **_kwargs) -> None:
+        counters["statements"] += 1
+
+    @before_task_publish.connect(weak=False)
+    def count_publish(**_kwargs) -> None:
+        counters["publishes"] += 1
+
+    files = make_files(args.files, args.file_bytes)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files:
+            zf.writestr(name, content)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=600) as client:
+        url = "/api/v1/documents"
+
+        async def per_file() -> None:
+            for name, content in files:
+                response = await client.post(f"{url}/upload", files={"file": (name, content, "text/plain")})
+                response.raise_for_status()
+
+        async def multi_file() -> None:
+            response = await client.post(
+                f"{url}/batch", files=[("files", (name, content, "text/plain")) for name, content in files]
+            )
+            response.raise_for_status()
+
+        async def zip_archive() -> None:
+            response = await client.post(
+                f"{url}/batch", files={"files": ("backfill.zip", archive.getvalue(), "application/zip")}
+            )
+            response.raise_for_status()
+
+        for label, mode in (("per-file", per_file), ("batch", multi_file), ("batch (zip)", zip_archive)):
+            counters.update(statements=0, publishes=0)
+            started = time.perf_counter()
+            await mode()
+            elapsed = time.perf_counter() - started
+            print(
+                f"{label:<12} files={args.files} time={elapsed:7.2f}s files/s={args.files / elapsed:8.1f} "
+                f"sql={counters['statements']:>6} publishes={counters['publishes']:>6}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--file-bytes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir / 'app.db'}"
+    os.environ["UPLOAD_DIR"] = str(workdir / "uploads")
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+    os.environ.setdefault("ENVIRONMENT", "benchmark")  # no SQL echo
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Compare the token-aware chunker with the legacy 1000/200 character windows.
+
+For each file this reports chunk count, stored characters, chunking and
+embedding time, and retrieval quality: random sentences from the document are
+used as queries and we measure how often a chunk containing the sentence is in
+the top-k results (recall@k) and its mean reciprocal rank.
+
+Usage: python scripts/benchmark_chunking.py path/to/doc.pdf [--queries 200] [--k 4]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.chunking import Chunk, iter_chunks
+from app.services.document_processor import DocumentProcessor
+from app.services.embeddings import embedding_service
+
+
+def _spans(chunks: list[Chunk]) -> list[tuple[int, int]]:
+    spans = []
+    for chunk in chunks:
+        if chunk.char_start is not None:
+            spans.append((chunk.char_start, chunk.char_end))
+        else:
+            start = chunk.index * 800
+            spans.append((start, start + len(chunk.text)))
+    return spans
+
+
+def evaluate(name: str, chunks: list[Chunk], chunk_seconds: float, queries, k: int) -> None:
+    texts = [chunk.text for chunk in chunks]
+    started = time.perf_counter()
+    matrix = np.asarray(embedding_service.embed(texts), dtype=np.float32)
+    embed_seconds = time.perf_counter() - started
+
+    spans = _spans(chunks)
+    query_vectors = np.asarray(embedding_service.embed([q for q, _, _ in queries]), dtype=np.float32)
+    ranking = np.argsort(-(query_vectors @ matrix.T), axis=1)
+    hits = 0
+    reciprocal = 0.0
+    for (_, start, end), ranked in zip(queries, ranking):
+        relevant = {i for i, (s, e) in enumerate(spans) if s <= start and end <= e}
+        for rank, idx in enumerate(ranked[:k], start=1):
+            if idx in relevant:
+                hits += 1
+                reciprocal += 1 / rank
+                break
+    n = max(len(queries), 1)
+    print(
+        f"{name:<8} chunks={len(chunks):>6} chars={sum(map(len, texts)):>9} "
+        f"chunk_s={chunk_seconds:>6.2f} embed_s={embed_seconds:>7.2f} "
+        f"recall@{k}={hits / n:.3f} mrr={reciprocal / n:.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    processor = DocumentProcessor()
+    pages = list(processor.iter_pages(args.file))
+    text = "".join(page_text for _, page_text in pages)
+
+    sentences = [m for m in re.finditer(r"[A-Z][^.!?\n]{40,300}[.!?]", text)]
+    random.Random(args.seed).shuffle(sentences)
+    queries = [(m.group(0), m.start(), m.end()) for m in sentences[: args.queries]]
+    print(f"{args.file.name}: {len(text)} chars, {len(pages)} pages, {len(queries)} queries")
+
+    started = time.perf_counter()
+    legacy = list(iter_chunks(pages))
+    evaluate("legacy", legacy, time.perf_counter() - started, queries, args.k)
+
+    started = time.perf_counter()
+    tokens = list(processor.iter_chunks(pages))
+    evaluate("token", tokens, time.perf_counter() - started, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""Latency and payload of GET /documents pages: offset over full rows versus keyset over the summary.
+
+Seeds a temporary SQLite database with ``--documents`` documents whose
+insights carry ``--insights-kb`` KB of extracted tables, then times page 1,
+100, 1,000 and 10,000 (of ``--page-size``) two ways: the previous
+implementation (``OFFSET`` over full ORM rows serialized through
+``DocumentRead``) and ``list_documents`` (keyset on ``(created_at, id)`` over
+the ``DocumentSummary`` columns, the cursor for the page taken from the row
+before it), reporting median milliseconds and response bytes. Also times
+``include_total`` on a cold and a warm count cache.
+
+Usage: python scripts/benchmark_document_list.py [--documents 200000] [--page-size 50] [--pages 1 100 1000 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def seed(url: str, documents: int, insights_kb: int) -> None:
+    from sqlalchemy import create_engine, insert
+
+    from app.main import _create_schema
+    from app.models.document import Document, DocumentStatus
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        _create_schema(conn)
+    table = {"headers": ["item", "quantity", "price"], "rows": [["widget", "12", "3.50"]] * (insights_kb * 16)}
+    statuses = list(DocumentStatus)
+    started = datetime(2024, 1, 1)
+    batch = 5000
+    with engine.begin() as conn:
+        for first in range(0, documents, batch):
+            conn.execute(
+                insert(Document),
+                [
+                    {
+                        "filename": f"invoice-{i}.pdf",
+                        "content_type": "application/pdf",
+                        "size_bytes": 100_000 + i,
+                        "storage_path": f"storage/uploads/{i:064x}.pdf",
+                        "content_hash": f"{i:064x}",
+                        "document_metadata": {},
+                        "status": statuses[i % len(statuses)],
+                        # Several documents share each timestamp, as in a batch upload.
+                        "created_at": started + timedelta(seconds=i // 4),
+                        "updated_at": started + timedelta(seconds=i // 4),
+                        "summary": "The supplier invoices monthly. " * 8,
+                        "key_points": [f"Point {n}" for n in range(10)],
+                        "sentiment": "neutral",
+                        "category": ("invoice", "contract", "report")[i % 3],
+                        "insights": {"tables": [table]},
+                    }
+                    for i in range(first, min(first + batch, documents))
+                ],
+            )
+    engine.dispose()
+
+
+async def bench(page_size: int, pages: list[int], repeats: int) -> None:
+    from sqlalchemy import select
+
+    from app.api.routes.documents import list_documents
+    from app.db.session import async_session_factory
+    from app.models.document import Document
+    from app.schemas.document import DocumentRead
+    from app.services.document_list import encode_cursor
+
+    async def offset_page(page: int) -> bytes:
+        async with async_session_factory() as db:
+            result = await db.execute(
+                select(Document).offset((page - 1) * page_size).limit(page_size).order_by(Document.created_at.desc())
+            )
+            rows = [DocumentRead.from_orm(doc).model_dump_json() for doc in result.scalars().all()]
+        return ("[" + ",".join(rows) + "]").encode()
+
+    async def cursor_for(page: int) -> str | None:
+        if page == 1:
+            return None
+        async with async_session_factory() as db:
+            row = (
+                await db.execute(
+                    select(Document.created_at, Document.id)
+                    .order_by(Document.created_at.desc(), Document.id.desc())
+                    .offset((page - 1) * page_size - 1)
+                    .limit(1)
+                )
+            ).one()
+        return encode_cursor(row.created_at, row.id)
+
+    async def keyset_page(cursor: str | None, include_total: bool = False) -> bytes:
+        async with async_session_factory() as db:
+            page = await list_documents(
+                cursor=cursor, limit=page_size, doc_status=None, category=None, include_total=include_total, db=db
+            )
+        return page.model_dump_json().encode()
+
+    async def timed(call) -> tuple[float, int]:
+        samples, size = [], 0
+        for _ in range(repeats):
+            started = time.perf_counter()
+            size = len(await call())
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples), size
+
+    print(f"{'page':>7} {'offset ms':>10} {'bytes':>9} {'keyset ms':>10} {'bytes':>7}")
+    for page in pages:
+        offset_ms, offset_bytes = await timed(lambda: offset_page(page))
+        cursor = await cursor_for(page)
+        keyset_ms, keyset_bytes = await timed(lambda: keyset_page(cursor))
+        print(f"{page:>7} {offset_ms:>10.1f} {offset_bytes:>9} {keyset_ms:>10.1f} {keyset_bytes:>7}")
+
+    started = time.perf_counter()
+    await keyset_page(None, include_total=True)
+    cold = (time.perf_counter() - started) * 1000
+    warm, _ = await timed(lambda: keyset_page(None, include_total=True))
+    print(f"include_total: first request {cold:.1f} ms, cached {warm:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200_000)
+    parser.add_argument("--insights-kb", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", nargs="+", type=int, default=[1, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "app.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ["ENVIRONMENT"] = "benchmark"  # no SQL echo
+    started = time.perf_counter()
+    seed(f"sqlite:///{path}", args.documents, args.insights_kb)
+    print(f"seeded {args.documents} documents ({os.path.getsize(path) / 1e6:.0f} MB) in {time.perf_counter() - started:.0f}s")
+    pages = [page for page in args.pages if (page - 1) * args.page_size < args.documents]
+    asyncio.run(bench(args.page_size, pages, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
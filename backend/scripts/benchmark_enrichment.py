@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""Compare wall-clock time and token usage of the enrichment modes.
+
+Usage: python scripts/benchmark_enrichment.py path/to/doc.pdf [more files...]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from app.services.document_processor import DocumentProcessor
+from app.services.enrichment import ENRICHMENT_MODES
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--modes", nargs="+", default=list(ENRICHMENT_MODES), choices=ENRICHMENT_MODES)
+    args = parser.parse_args()
+
+    processor = DocumentProcessor()
+    print(f"{'file':<40} {'mode':<12} {'ms':>8} {'calls':>6} {'in_tok':>8} {'out_tok':>8}")
+    for path in args.files:
+        text = processor.extract_text(path)
+        for mode in args.modes:
+            stats = processor.enrich(text, mode=mode).stats()
+            print(
+                f"{path.name[:40]:<40} {mode:<12} {stats['wall_clock_ms']:>8.0f} {stats['calls']:>6} "
+                f"{stats['input_tokens']:>8} {stats['output_tokens']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Wall-clock time and LLM calls of hierarchical enrichment versus document length.
+
+Starts ``fake_llm_server`` in a background thread and enriches synthetic
+documents of increasing length in ``hierarchical`` mode, reporting wall time,
+LLM calls and input tokens per length. Each document is enriched twice; the
+second run is answered from the LLM response cache, as a retry or re-run of
+the document would be, and makes no requests. With the default
+section concurrency, wall time grows with the number of reduce rounds rather
+than the number of sections, and stops growing once ``--max-sections`` caps
+the map step.
+
+Usage: python scripts/benchmark_hierarchical_enrichment.py [--sections 1 4 16 64 256] [--latency-ms 800]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import uvicorn
+
+PORT = 8199
+
+
+def start_fake_llm(latency_ms: float) -> None:
+    from fake_llm_server import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(latency_ms, 0, token_ms=0), port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def document_sections(count: int, chars: int) -> list[str]:
+    # Numbered per document so no section of one length is a cache hit for another.
+    sentence = "Clause {count}.{i}.{j}: the supplier invoices monthly and the buyer pays within 30 days. "
+    return [
+        "".join(sentence.format(count=count, i=i, j=j) for j in range(chars // len(sentence)))
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", nargs="+", type=int, default=[1, 4, 16, 64, 256])
+    parser.add_argument("--section-chars", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--max-sections", type=int, default=None)
+    args = parser.parse_args()
+
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ["LLM_CACHE_PATH"] = tempfile.mkdtemp()
+    if args.max_sections:
+        os.environ["ENRICHMENT_MAX_SECTIONS"] = str(args.max_sections)
+    start_fake_llm(args.latency_ms)
+
+    from app.services.enrichment import enrichment_service
+
+    print(f"{'sections':>8} {'run':<6} {'ms':>8} {'calls':>6} {'cached':>6} {'in_tok':>8}")
+    for count in args.sections:
+        sections = document_sections(count, args.section_chars)
+        for run in ("cold", "cached"):
+            stats = enrichment_service.enrich(sections[0], mode="hierarchical", sections=sections).stats()
+            print(
+                f"{count:>8} {run:<6} {stats['wall_clock_ms']:>8.0f} {stats['calls']:>6} {stats['cached_calls']:>6} "
+                f"{stats['input_tokens']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Cold-start budget for the API and worker entry points.
+
+Imports each target in a fresh interpreter (after one untimed run so bytecode
+is cached) and reports the import wall time, peak RSS, the
+slowest modules by self time from ``-X importtime``, and whether any heavy
+dependency that should load lazily (torch, sentence-transformers, chromadb,
+openai, the document parsers) was imported. Exits non-zero when a target goes
+over its time or memory budget or imports a heavy dependency, so it can run
+as a regression check in CI.
+
+Usage: python scripts/benchmark_import_time.py [--runs 5] [--budget-ms api=2500 ...] [--budget-mb api=150 ...]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    "api": "app.main",
+    "worker": "app.workers.tasks",
+}
+BUDGET_MS = {"api": 2500, "worker": 2000}
+BUDGET_MB = {"api": 150, "worker": 150}
+HEAVY_MODULES = ("torch", "sentence_transformers", "chromadb", "openai", "docx", "pdfminer")
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"ms": elapsed * 1000, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "heavy": heavy}}))
+"""
+
+
+def probe(module: str, importtime: bool = False) -> tuple[dict, str]:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", PROBE.format(module=module, heavy=HEAVY_MODULES)]
+    env = {**os.environ, "API_WARM_UP": "false"}
+    completed = subprocess.run(command, cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest(importtime_log: str, count: int) -> list[tuple[int, str]]:
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def parse_budgets(values: list[str], defaults: dict[str, int]) -> dict[str, int]:
+    budgets = dict(defaults)
+    for value in values:
+        name, _, limit = value.partition("=")
+        budgets[name] = int(limit)
+    return budgets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--budget-ms", nargs="*", default=[], metavar="TARGET=MS")
+    parser.add_argument("--budget-mb", nargs="*", default=[], metavar="TARGET=MB")
+    args = parser.parse_args()
+    budget_ms = parse_budgets(args.budget_ms, BUDGET_MS)
+    budget_mb = parse_budgets(args.budget_mb, BUDGET_MB)
+
+    failures = []
+    for target, module in TARGETS.items():
+        probe(module)  # compile bytecode
+        runs = [probe(module)[0] for _ in range(args.runs)]
+        ms = statistics.median(run["ms"] for run in runs)
+        rss = max(run["rss_mb"] for run in runs)
+        heavy = runs[-1]["heavy"]
+        print(f"{target:<7} import {module}: {ms:7.0f}ms (budget {budget_ms[target]}ms) "
+              f"peak_rss={rss:6.1f}MB (budget {budget_mb[target]}MB) heavy={heavy or 'none'}")
+        _, log = probe(module, importtime=True)
+        for self_us, name in slowest(log, args.top):
+            print(f"        {self_us / 1000:7.1f}ms  {name}")
+
+        if ms > budget_ms[target]:
+            failures.append(f"{target}: import took {ms:.0f}ms, over the {budget_ms[target]}ms budget")
+        if rss > budget_mb[target]:
+            failures.append(f"{target}: peak RSS {rss:.0f}MB, over the {budget_mb[target]}MB budget")
+        if heavy:
+            failures.append(f"{target}: imported {', '.join(heavy)} eagerly")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""LLM response cache: re-run savings, lookup cost and concurrent write-through.
+
+Re-run: starts ``fake_llm_server`` in a background thread and enriches
+``--documents`` synthetic documents twice in ``concurrent`` mode, reporting
+LLM requests sent and served from the cache per pass (the second pass should
+send none).
+
+Write-through: ``--processes`` processes each write and read back
+``--entries`` responses at once, first into a single SQLite file and then
+into the configured number of shards, reporting aggregate throughput and the
+per-lookup cost of a hit.
+
+Usage: python scripts/benchmark_llm_cache.py [--documents 50] [--processes 8] [--entries 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import uvicorn
+
+PORT = 8199
+
+
+def start_fake_llm(latency_ms: float) -> None:
+    from fake_llm_server import create_app
+
+    server = uvicorn.Server(uvicorn.Config(create_app(latency_ms, 0, token_ms=0), port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def bench_rerun(documents: int, latency_ms: float) -> None:
+    start_fake_llm(latency_ms)
+    from app.services.enrichment import enrichment_service
+
+    texts = [f"Invoice {i}: the supplier bills {i * 10} units monthly, payable within 30 days." for i in range(documents)]
+    for label in ("first pass", "re-run"):
+        calls = cached = 0
+        started = time.perf_counter()
+        for text in texts:
+            stats = enrichment_service.enrich(text, mode="concurrent").stats()
+            calls += stats["calls"]
+            cached += stats["cached_calls"]
+        elapsed = time.perf_counter() - started
+        print(f"{label:<12} documents={documents} requests={calls:5d} cached={cached:5d} total={elapsed:7.2f}s")
+
+
+def write_through(path: str, shards: int, worker: int, entries: int, queue: multiprocessing.Queue) -> None:
+    from app.services.llm_cache import LLMResponseCache, request_key
+
+    cache = LLMResponseCache(Path(path), shards)
+    keys = [request_key("model", "system", f"worker {worker} prompt {i}", 500) for i in range(entries)]
+    started = time.perf_counter()
+    for key in keys:
+        cache.put(key, "The contract renews annually unless either party gives notice.", 100, 20)
+    written = time.perf_counter() - started
+    started = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    queue.put((written, time.perf_counter() - started))
+
+
+def bench_write_through(processes: int, entries: int) -> None:
+    from app.core.config import get_settings
+    from app.services.llm_cache import LLMResponseCache
+
+    context = multiprocessing.get_context("spawn")
+    for shards in (1, get_settings().llm_cache_shards):
+        path = tempfile.mkdtemp()
+        LLMResponseCache(Path(path), shards)  # create the schema once, before the writers race
+        queue = context.Queue()
+        workers = [
+            context.Process(target=write_through, args=(path, shards, worker, entries, queue))
+            for worker in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        results = [queue.get() for _ in workers]
+        for process in workers:
+            process.join()
+        writes = processes * entries / max(written for written, _ in results)
+        hit_us = sum(read for _, read in results) / (processes * entries) * 1e6
+        print(f"shards={shards:<3} processes={processes} writes/s={writes:9.0f} hit={hit_us:6.1f}us")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--entries", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ["LLM_CACHE_PATH"] = tempfile.mkdtemp()
+    bench_rerun(args.documents, args.latency_ms)
+    bench_write_through(args.processes, args.entries)
+
+
+if __name__ == "__main__":
+    main()
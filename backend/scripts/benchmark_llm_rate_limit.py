@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""Goodput and interactive latency under a provider rate limit, with and without the shared limiter.
+
+Starts ``fake_llm_server`` with ``--rpm`` / ``--max-concurrency`` limits, then
+for each mode runs ``--workers`` worker processes of ``--threads`` threads
+enriching documents (four batch prompts each, as ``enrich_document`` does in
+``concurrent`` mode) as fast as they can while this process asks
+``--ask-rate`` questions per second through ``aanswer_question``, as the API
+does. ``off`` sends every request straight to the provider and only retries
+429s with backoff; ``on`` admits requests through ``llm_rate_limiter``
+(shared buckets in Redis, priorities, adaptive concurrency). Reports
+documents enriched per second (goodput: a document fails if any of its
+prompts gives up), failures, 429s returned by the provider and interactive
+p50/p99 latency (of every ask, including the time failed ones took to fail).
+
+Needs Redis at ``REDIS_URL``.
+
+Usage: python scripts/benchmark_llm_rate_limit.py [--rpm 600] [--seconds 30] [--workers 2] [--threads 16]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import uvicorn
+
+PORT = 8199
+
+
+def batch_worker(start_at: float, seconds: float, threads: int, queue: multiprocessing.Queue) -> None:
+    from app.services.enrichment import enrichment_service
+    from app.services.registry import warm_up
+
+    warm_up(["llm_client", "llm_rate_limiter", "enrichment_service"])
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.monotonic() + seconds
+    counts = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def loop(thread: int) -> None:
+        i = 0
+        while time.monotonic() < deadline:
+            text = f"Document {os.getpid()}-{thread}-{i}: the supplier invoices monthly, payable in 30 days."
+            try:
+                enrichment_service.enrich(text, mode="concurrent")
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+            with lock:
+                counts[outcome] += 1
+            i += 1
+
+    pool = [threading.Thread(target=loop, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    queue.put(counts)
+
+
+async def interactive(start_at: float, seconds: float, rate: float) -> tuple[list[float], int]:
+    from app.services.llm_client import llm_client
+    from app.services.llm_rate_limiter import llm_rate_limiter
+    from app.services.registry import warm_up
+
+    warm_up(["llm_client", "llm_rate_limiter"])
+    await asyncio.sleep(max(0.0, start_at - time.time()))
+    latencies: list[float] = []
+    failed = 0
+
+    async def ask(i: int) -> None:
+        nonlocal failed
+        started = time.perf_counter()
+        try:
+            await llm_client.aanswer_question(f"When does contract {i} renew?", "Contracts renew annually.")
+        except Exception:
+            failed += 1
+        # Failed asks count too, at the time the user waited for the error.
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        tasks.append(asyncio.create_task(ask(i)))
+        i += 1
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    await llm_rate_limiter.aclose()
+    return latencies, failed
+
+
+def run(mode: str, args: argparse.Namespace) -> None:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    # Every process imports and builds its clients first, then all start together.
+    start_at = time.time() + 10
+    workers = [
+        context.Process(target=batch_worker, args=(start_at, args.seconds, args.threads, queue))
+        for _ in range(args.workers)
+    ]
+    for process in workers:
+        process.start()
+    latencies, asks_failed = asyncio.run(interactive(start_at, args.seconds, args.ask_rate))
+    batches = [queue.get() for _ in workers]
+    for process in workers:
+        process.join()
+    elapsed = time.time() - start_at
+
+    documents_ok = sum(counts["ok"] for counts in batches)
+    documents_failed = sum(counts["failed"] for counts in batches)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if latencies else (float("nan"), float("nan"))
+    print(
+        f"{mode:<4} goodput={documents_ok / elapsed:5.2f} docs/s documents ok={documents_ok:4d} "
+        f"failed={documents_failed:4d} asks ok={len(latencies) - asks_failed:4d} failed={asks_failed:3d} "
+        f"ask p50={p50:7.0f}ms p99={p99:7.0f}ms",
+        end=" ",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ask-rate", type=float, default=2)
+    parser.add_argument("--modes", nargs="+", default=["off", "on"], choices=["off", "on"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run(args.child, args)
+        return
+
+    from fake_llm_server import LIMIT_STATS, ProviderLimits, create_app
+
+    command = [sys.executable, __file__, *sys.argv[1:]]
+    for offset, mode in enumerate(args.modes):
+        port = PORT + offset
+        limits = ProviderLimits(rpm=args.rpm, max_concurrency=args.max_concurrency)
+        server = uvicorn.Server(
+            uvicorn.Config(create_app(args.latency_ms, 0, token_ms=0, limits=limits), port=port, log_level="warning")
+        )
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        LIMIT_STATS.update(accepted=0, throttled=0)
+        env = {
+            **os.environ,
+            "LLM_BASE_URL": f"http://127.0.0.1:{port}/v1",
+            "LLM_RATE_LIMIT_ENABLED": "true" if mode == "on" else "false",
+            "LLM_REQUESTS_PER_MINUTE": str(args.rpm),
+            "LLM_CACHE_ENABLED": "false",
+            # Fresh buckets for every run.
+            "LLM_MODEL": f"benchmark-{os.getpid()}-{mode}",
+            "LOGURU_LEVEL": "ERROR",
+        }
+        subprocess.run([*command, "--child", mode], env=env, check=True)
+        print(f"provider 429s={LIMIT_STATS['throttled']}")
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
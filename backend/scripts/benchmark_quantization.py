@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Measure recall@k and storage size of float16/int8 embeddings versus float32.
+
+With ``--file`` the corpus is the chunk embeddings of a real document and the
+queries are embeddings of random sentences from it; otherwise a synthetic
+clustered corpus of normalized vectors is used.
+
+Usage: python scripts/benchmark_quantization.py [--file doc.pdf] [--n 100000] [--k 10]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+from pathlib import Path
+
+import numpy as np
+
+from app.services.quantization import STORAGE_DTYPES, quantize, scores
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def synthetic(n: int, queries: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 50, 1), dim))
+    corpus = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.normal(size=(n, dim))
+    probes = corpus[rng.integers(0, n, queries)] + 0.35 * rng.normal(size=(queries, dim))
+    return _normalize(corpus).astype(np.float32), _normalize(probes).astype(np.float32)
+
+
+def from_document(path: Path, queries: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    from app.services.document_processor import DocumentProcessor
+    from app.services.embeddings import embedding_service
+
+    processor = DocumentProcessor()
+    pages = list(processor.iter_pages(path))
+    corpus = embedding_service.embed([chunk.text for chunk in processor.iter_chunks(pages)])
+    sentences = re.findall(r"[A-Z][^.!?\n]{40,300}[.!?]", "".join(text for _, text in pages))
+    random.Random(seed).shuffle(sentences)
+    return corpus, embedding_service.embed(sentences[:queries])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file", type=Path)
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.file:
+        corpus, probes = from_document(args.file, args.queries, args.seed)
+    else:
+        corpus, probes = synthetic(args.n, args.queries, args.dim, args.seed)
+    k = min(args.k, len(corpus))
+
+    exact = np.argsort(-(probes @ corpus.T), axis=1)[:, :k]
+    print(f"corpus={corpus.shape} queries={len(probes)} k={k}")
+    for dtype in STORAGE_DTYPES:
+        stored = quantize(corpus, dtype)
+        approx = np.stack([np.argsort(-scores(stored, probe))[:k] for probe in probes])
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(exact, approx)])
+        print(f"{dtype:<8} bytes/vector={stored.nbytes / len(corpus):7.1f} recall@{k}={recall:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Load-test query embedding: per-call encode versus the micro-batching dispatcher.
+
+Runs ``--concurrency`` client threads issuing ``--requests`` embeds in total and
+reports p50/p99 latency and throughput for each path.
+
+Usage: python scripts/benchmark_query_embedding.py [--concurrency 32] [--requests 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+
+from app.services.embedding_batcher import embedding_batcher
+from app.services.embeddings import embedding_service
+
+WORDS = "what is the total amount due invoice contract term party payment date clause renewal".split()
+
+
+def run(name: str, embed: Callable[[str], object], questions: list[str], concurrency: int) -> None:
+    def timed(question: str) -> float:
+        started = time.perf_counter()
+        embed(question)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.array(list(executor.map(timed, questions))) * 1000
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:<10} p50={np.percentile(latencies, 50):7.1f} ms  p99={np.percentile(latencies, 99):7.1f} ms  "
+        f"rps={len(questions) / elapsed:8.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    questions = [" ".join(rng.choices(WORDS, k=rng.randint(4, 14))) + "?" for _ in range(args.requests)]
+    embedding_service.embed(questions[:8])  # warm up
+
+    run("per-call", embedding_service.embed_one, questions, args.concurrency)
+    run("batched", embedding_batcher.embed_one, questions, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
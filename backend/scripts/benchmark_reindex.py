@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Re-index throughput and query latency while a re-index runs.
+
+Indexes ``--documents`` synthetic documents with ``--from-model`` into a
+temporary store. Then, in a fresh process configured with ``--to-model``,
+times a plain embedding pass over every stored chunk in
+``--batch-size`` batches (the throughput ceiling) and runs the re-index job
+while a thread keeps querying the active version, as the API would.
+Reports chunks per second of both, query p50/p99 before and during the
+re-index, and which index version answered the queries.
+
+Usage: python scripts/benchmark_reindex.py [--documents 200] [--from-model all-MiniLM-L6-v2]
+       [--to-model paraphrase-MiniLM-L3-v2] [--batch-size 512]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+SENTENCE = "Clause {doc}.{i}: the supplier invoices monthly and the buyer pays within 30 days of receipt. "
+
+
+def index(documents: int, sentences: int) -> None:
+    from app.services.document_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    started = time.perf_counter()
+    chunks = 0
+    for document_id in range(1, documents + 1):
+        text = "".join(SENTENCE.format(doc=document_id, i=i) for i in range(sentences))
+        processor._reset_index(document_id)
+        chunks += processor.index_chunks(document_id, processor.iter_chunks(iter([(1, text)])))
+    elapsed = time.perf_counter() - started
+    print(f"ingest    chunks={chunks:6d} {chunks / elapsed:8.0f} chunks/s (chunking, embedding and writes)")
+
+
+def query_latencies(stop: threading.Event, seconds: float | None = None) -> tuple[list[float], Counter]:
+    from app.services.embeddings import embedding_service_for
+    from app.services.vector_store import vector_store
+
+    latencies: list[float] = []
+    versions: Counter = Counter()
+    deadline = time.monotonic() + seconds if seconds else None
+    i = 0
+    while not stop.is_set() and (deadline is None or time.monotonic() < deadline):
+        started = time.perf_counter()
+        active = vector_store.active()
+        query = embedding_service_for(active.version.embedding_model).embed_one(f"When is invoice {i} due?")
+        active.store.query_corpus(query, top_k=10)
+        latencies.append(time.perf_counter() - started)
+        versions[active.version.id] += 1
+        i += 1
+        time.sleep(0.01)
+    return latencies, versions
+
+
+def percentiles(latencies: list[float]) -> str:
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return f"p50={p50:6.1f}ms p99={p99:6.1f}ms n={len(latencies)}"
+
+
+def reindex(documents: int, batch_size: int) -> None:
+    from app.services.chunk_store import chunk_store
+    from app.services.chunking import batched
+    from app.services.embeddings import embedding_service
+    from app.services.reindex import Reindexer
+
+    texts = [text for document_id in range(1, documents + 1) for _, text, _ in chunk_store.iter_chunks(document_id)]
+    embedding_service.embed(texts[:batch_size])  # load the new model before timing
+    started = time.perf_counter()
+    for batch in batched(texts, batch_size):
+        embedding_service.embed(batch)
+    ceiling = len(texts) / (time.perf_counter() - started)
+    print(f"embed     chunks={len(texts):6d} {ceiling:8.0f} chunks/s (new model alone)")
+
+    idle, _ = query_latencies(threading.Event(), seconds=3)
+    print(f"queries   idle      {percentiles(idle)}")
+
+    stop = threading.Event()
+    during: list = []
+    thread = threading.Thread(target=lambda: during.extend(query_latencies(stop)))
+    thread.start()
+    result = Reindexer(batch_size).run()
+    stop.set()
+    thread.join()
+    latencies, versions = during
+    print(f"reindex   chunks={result['chunks']:6d} {result['chunks'] / result['seconds']:8.0f} chunks/s -> {result}")
+    print(f"queries   reindex   {percentiles(latencies)} answered by version(s) {dict(versions)}")
+    print(f"versions  {[(version.id, version.embedding_model, version.status) for version in chunk_store.versions()]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--sentences", type=int, default=200, help="sentences per document")
+    parser.add_argument("--from-model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--to-model", default="paraphrase-MiniLM-L3-v2")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--phase", choices=["index", "reindex"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.phase == "index":
+        index(args.documents, args.sentences)
+        return
+    if args.phase == "reindex":
+        reindex(args.documents, args.batch_size)
+        return
+
+    # Each phase runs in its own process, as after a deploy that changes EMBEDDING_MODEL.
+    root = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        "VECTOR_BACKEND": "numpy",
+        "NUMPY_VECTOR_PATH": f"{root}/vectors",
+        "CHUNK_STORE_PATH": f"{root}/chunks.db",
+        "SEARCH_INDEX_PATH": f"{root}/search.db",
+        "VECTOR_DB_PATH": f"{root}/chroma",
+        "LOGURU_LEVEL": "WARNING",
+    }
+    command = [sys.executable, __file__, *sys.argv[1:]]
+    subprocess.run([*command, "--phase", "index"], env={**env, "EMBEDDING_MODEL": args.from_model}, check=True)
+    subprocess.run([*command, "--phase", "reindex"], env={**env, "EMBEDDING_MODEL": args.to_model}, check=True)
+
+
+if __name__ == "__main__":
+    main()
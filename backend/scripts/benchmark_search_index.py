@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Keyword-side latency of the corpus search index by corpus size.
+
+Chunks are random sentences over a Zipf-distributed vocabulary, with one of
+``--entities`` counterparty names planted in a small share of them. Timed
+queries look up a random counterparty, unfiltered and filtered by category.
+Vector-side latency is covered by ``benchmark_vector_backends.py``.
+
+Usage: python scripts/benchmark_search_index.py [--sizes 100000 1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from app.services.chunking import batched
+from app.services.search_index import SearchFilters, SearchIndex
+
+VOCABULARY = 20_000
+WORDS_PER_CHUNK = 120
+CATEGORIES = ["Legal", "Finance", "HR", "Technical", "Marketing"]
+
+
+def fill(index: SearchIndex, size: int, chunks_per_doc: int, entities: int, rng: np.random.Generator) -> float:
+    ranks = np.arange(1, VOCABULARY + 1)
+    weights = 1 / ranks
+    weights /= weights.sum()
+    started = time.perf_counter()
+    for document_id in range(max(size // chunks_per_doc, 1)):
+        words = rng.choice(VOCABULARY, size=(chunks_per_doc, WORDS_PER_CHUNK), p=weights)
+        chunks = [" ".join(f"w{word}" for word in row) for row in words]
+        for pos in rng.choice(chunks_per_doc, size=max(chunks_per_doc // 50, 1), replace=False):
+            chunks[pos] += f" counterparty{rng.integers(entities)} corp"
+        for batch in batched(range(chunks_per_doc), 64):
+            index.add_chunks(document_id, chunks[batch[0] : batch[-1] + 1], start_index=batch[0])
+        index.set_document_attributes(
+            document_id,
+            CATEGORIES[document_id % len(CATEGORIES)],
+            "neutral",
+            datetime(2024, 1, 1) + timedelta(hours=document_id),
+        )
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100_000, 1_000_000])
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--entities", type=int, default=5_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=20)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = SearchIndex(Path(tmp) / "search.db")
+            fill_seconds = fill(index, size, args.chunks_per_doc, args.entities, rng)
+            for label, filters in (("unfiltered", None), ("category", SearchFilters(category="Finance"))):
+                latencies = []
+                for _ in range(args.queries):
+                    query = f"counterparty{rng.integers(args.entities)} agreement"
+                    started = time.perf_counter()
+                    index.search(query, args.top_k, filters)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                p50, p95 = np.percentile(latencies, [50, 95])
+                print(
+                    f"chunks={size:>9,} {label:<10} fill={fill_seconds:7.1f}s "
+                    f"p50={p50:6.2f}ms p95={p95:6.2f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""Time to first token of /ask/stream against time to answer of /ask, end to end over HTTP.
+
+Starts ``fake_llm_server`` (streaming) and the API with uvicorn in background
+threads, against a temporary database and NumPy vector store holding one
+processed synthetic document. Each round asks a fresh question (so the
+answer cache never hits) through both endpoints and records:
+
+- ``sources``: when the stream's ``sources`` event arrived;
+- ``ttft``: when its first ``token`` event arrived;
+- ``stream total`` and ``/ask total``: when the full answer was available.
+
+``--cancel`` also disconnects one stream after its first token and reports
+whether the fake LLM saw the upstream request closed before finishing.
+
+Usage: python scripts/benchmark_time_to_first_token.py [--rounds 20] [--latency-ms 400] [--token-ms 30]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import uvicorn
+
+LLM_PORT = 8198
+API_PORT = 8197
+
+
+def serve(app, port: int) -> None:
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def seed(chunks: int) -> int:
+    from app.db.session import async_session_factory, engine
+    from app.models.base import Base
+    from app.models.document import Document, DocumentStatus
+    from app.services.embeddings import embedding_service
+    from app.services.vector_store import vector_store
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session_factory() as session:
+        document = Document(
+            filename="synthetic.txt",
+            content_type="text/plain",
+            size_bytes=0,
+            storage_path="",
+            status=DocumentStatus.COMPLETED,
+        )
+        session.add(document)
+        await session.commit()
+        document_id = document.id
+    texts = [f"Clause {i}: the agreement renews every {i % 12 + 1} months." for i in range(chunks)]
+    vector_store.upsert_document_chunks(document_id, texts, embedding_service.embed(texts))
+    return document_id
+
+
+async def stream_once(client, url: str, question: str, cancel_after_first: bool = False) -> dict[str, float]:
+    started = time.perf_counter()
+    marks: dict[str, float] = {}
+    async with client.stream("POST", f"{url}/stream", json={"question": question}) as response:
+        async for line in response.aiter_lines():
+            if not line.startswith("event: "):
+                continue
+            event = line.removeprefix("event: ")
+            marks.setdefault(event, (time.perf_counter() - started) * 1000)
+            if event == "token" and cancel_after_first:
+                break
+    return marks
+
+
+async def run(args: argparse.Namespace, document_id: int) -> None:
+    import httpx
+
+    url = f"http://127.0.0.1:{API_PORT}/api/v1/documents/{document_id}/ask"
+    rows: dict[str, list[float]] = {"sources": [], "ttft": [], "stream total": [], "/ask total": []}
+    async with httpx.AsyncClient(timeout=60) as client:
+        for round_ in range(args.rounds):
+            marks = await stream_once(client, url, f"When does clause {round_} renew? (stream)")
+            rows["sources"].append(marks["sources"])
+            rows["ttft"].append(marks["token"])
+            rows["stream total"].append(marks["done"])
+
+            started = time.perf_counter()
+            response = await client.post(url, json={"question": f"When does clause {round_} renew? (ask)"})
+            response.raise_for_status()
+            rows["/ask total"].append((time.perf_counter() - started) * 1000)
+
+        for label, values in rows.items():
+            p50, p95 = np.percentile(values, [50, 95])
+            print(f"{label:<13} p50={p50:7.1f}ms p95={p95:7.1f}ms")
+
+        if args.cancel:
+            from fake_llm_server import STREAM_STATS
+
+            await stream_once(client, url, "Cancelled question?", cancel_after_first=True)
+            await asyncio.sleep(args.token_ms * 3 / 1000)
+            print(f"cancelled upstream streams: {STREAM_STATS['cancelled']} (completed: {STREAM_STATS['completed']})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--token-ms", type=float, default=30)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--cancel", action="store_true")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{LLM_PORT}/v1"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir / 'app.db'}"
+    os.environ.setdefault("ENVIRONMENT", "benchmark")  # no SQL echo
+    os.environ.setdefault("VECTOR_BACKEND", "numpy")
+    os.environ.setdefault("NUMPY_VECTOR_PATH", str(workdir / "vectors"))
+
+    from fake_llm_server import create_app
+
+    serve(create_app(args.latency_ms, 0, args.token_ms), LLM_PORT)
+    document_id = asyncio.run(seed(args.chunks))
+
+    from app.main import app
+
+    serve(app, API_PORT)
+    asyncio.run(run(args, document_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Per-document query latency of the Chroma and NumPy vector backends by corpus size.
+
+Each corpus is made of documents with ``--chunks-per-doc`` random unit vectors.
+Both backends are filled into a temporary directory, then ``--queries``
+single-document queries against random documents are timed.
+
+Usage: python scripts/benchmark_vector_backends.py [--sizes 10000 100000 1000000] [--backends chroma numpy]
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.services.chunking import batched
+from app.services.vector_store import ChromaVectorStore, NumpyVectorStore, VectorStore
+
+DIM = 384
+
+
+def build(backend: str, root: Path) -> VectorStore:
+    if backend == "chroma":
+        return ChromaVectorStore(path=root / "chroma", collection="benchmark")
+    return NumpyVectorStore(root=root / "numpy")
+
+
+def fill(store: VectorStore, documents: int, chunks_per_doc: int, rng: np.random.Generator) -> float:
+    started = time.perf_counter()
+    for document_id in range(documents):
+        vectors = rng.normal(size=(chunks_per_doc, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for batch in batched(range(chunks_per_doc), 512):
+            store.upsert_document_chunks(
+                document_id,
+                [f"chunk {document_id}:{idx}" for idx in batch],
+                vectors[batch[0] : batch[-1] + 1],
+                start_index=batch[0],
+            )
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"], choices=["chroma", "numpy"])
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=4)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        documents = max(size // args.chunks_per_doc, 1)
+        for backend in args.backends:
+            rng = np.random.default_rng(0)
+            with tempfile.TemporaryDirectory() as tmp:
+                store = build(backend, Path(tmp))
+                fill_seconds = fill(store, documents, args.chunks_per_doc, rng)
+                queries = rng.normal(size=(args.queries, DIM)).astype(np.float32)
+                queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+                targets = rng.integers(0, documents, args.queries)
+                latencies = []
+                for query, document_id in zip(queries, targets):
+                    started = time.perf_counter()
+                    store.query_document(int(document_id), query, top_k=args.top_k)
+                    latencies.append((time.perf_counter() - started) * 1000)
+            print(
+                f"chunks={size:>9} backend={backend:<6} fill_s={fill_seconds:8.1f} "
+                f"p50_ms={np.percentile(latencies, 50):7.2f} p99_ms={np.percentile(latencies, 99):7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
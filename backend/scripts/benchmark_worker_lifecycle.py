@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""Worker per-task overhead and per-child memory, before and after ``app.workers.runtime``.
+
+Overhead: ``--tasks`` small database round trips (the status update each task
+does) run either the old way, a fresh event loop via ``asyncio.run`` plus a
+``NullPool`` engine per call, or on the persistent ``WorkerRuntime`` loop with
+its pooled engine.
+
+Memory: forks ``--children`` processes the way Celery's prefork pool does,
+with and without ``preload_models`` in the parent, has each child embed a
+few texts and run full collections, and reports each child's private dirty
+memory and PSS from ``/proc/<pid>/smaps_rollup`` (Linux only).
+
+Usage: python scripts/benchmark_worker_lifecycle.py [--tasks 500] [--children 4]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def smaps_rollup(pid: int) -> dict[str, int]:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+
+def bench_overhead(tasks: int) -> None:
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.core.config import get_settings
+    from app.models.base import Base
+    from app.models.document import Document
+    from app.workers.runtime import WorkerRuntime
+
+    url = get_settings().database_url
+
+    async def setup() -> None:
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(setup())
+
+    async def round_trip(factory) -> None:
+        async with factory() as session:
+            await session.execute(select(Document).where(Document.id == 1))
+            await session.commit()
+
+    def per_task() -> None:
+        async def once() -> None:
+            engine = create_async_engine(url, poolclass=NullPool)
+            await round_trip(async_sessionmaker(engine, class_=AsyncSession))
+            await engine.dispose()
+
+        asyncio.run(once())
+
+    runtime = WorkerRuntime()
+    for label, call in (
+        ("asyncio.run + NullPool", per_task),
+        ("persistent runtime", lambda: runtime.run(round_trip(runtime.session))),
+    ):
+        call()
+        started = time.perf_counter()
+        for _ in range(tasks):
+            call()
+        elapsed = time.perf_counter() - started
+        print(f"{label:<24} tasks={tasks} per-task={elapsed / tasks * 1e6:8.0f}us")
+    runtime.close()
+
+
+def bench_memory(children: int, preload: bool) -> None:
+    """Runs in a fresh process so the two configurations do not share a heap."""
+    from app.services.embeddings import embedding_service
+    from app.workers import runtime
+
+    if preload:
+        runtime.preload_models()
+
+    pids, ready = [], []
+    for _ in range(children):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            for i in range(20):
+                embedding_service.embed([f"Child workload sentence number {i}."] * 8)
+                gc.collect()
+            os.write(write_fd, b"x")
+            time.sleep(3600)
+            os._exit(0)
+        os.close(write_fd)
+        pids.append(pid)
+        ready.append(read_fd)
+
+    for fd in ready:
+        os.read(fd, 1)
+    rollups = [smaps_rollup(pid) for pid in pids]
+    for pid in pids:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+
+    private = sum(r.get("Private_Dirty", 0) for r in rollups) / len(rollups) / 1024
+    pss = sum(r.get("Pss", 0) for r in rollups) / len(rollups) / 1024
+    label = "preloaded + frozen" if preload else "no preload"
+    print(f"{label:<24} children={children} private_dirty={private:8.1f}MiB pss={pss:8.1f}MiB per child")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--children", type=int, default=4)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir / 'app.db'}"
+    os.environ.setdefault("ENVIRONMENT", "benchmark")  # no SQL echo
+    bench_overhead(args.tasks)
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        print("memory: /proc/<pid>/smaps_rollup not available, skipping")
+        return
+    for preload in (False, True):
+        pid = os.fork()
+        if pid == 0:
+            bench_memory(args.children, preload)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""Minimal stand-in for the OpenAI Responses API, for load and latency tests.
+
+``POST /v1/responses`` waits ``--latency-ms`` (plus uniform jitter) before the
+first token and ``--token-ms`` per further token. Without ``stream`` it then
+returns the whole answer; with ``"stream": true`` it sends Responses API
+server-sent events (``response.created``, one ``response.output_text.delta``
+per token, ``response.completed``) as the tokens are "generated". Requests
+with a ``json_schema`` text format get a JSON object filled in from the
+schema, so structured prompts parse. Point the backend at it with
+``LLM_BASE_URL=http://127.0.0.1:8100/v1``.
+
+``--rpm``, ``--tpm`` and ``--max-concurrency`` emulate provider limits:
+requests over the per-minute request or token budget (prompt characters / 4
+plus ``max_output_tokens``, as providers estimate it) get a 429 with
+``retry-after-ms``; requests beyond the concurrency cap get a 429 without it.
+
+Usage: python scripts/fake_llm_server.py [--port 8100] [--latency-ms 800] [--jitter-ms 200] [--token-ms 20]
+       [--rpm 0] [--tpm 0] [--max-concurrency 0]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER = (
+    "The contract renews annually unless either party gives 60 days written notice "
+    "before the end of the current term, in which case it expires at the end of that term."
+)
+
+
+def _tokens(answer: str = ANSWER) -> list[str]:
+    words = answer.split(" ")
+    return [words[0]] + [f" {word}" for word in words[1:]]
+
+
+def _fill(schema: dict[str, Any]) -> Any:
+    if "enum" in schema:
+        return schema["enum"][0]
+    if schema.get("type") == "object":
+        return {name: _fill(prop) for name, prop in schema.get("properties", {}).items()}
+    if schema.get("type") == "array":
+        return [_fill(schema.get("items", {"type": "string"}))]
+    return ANSWER
+
+
+def _answer(request: dict) -> str:
+    text_format = (request.get("text") or {}).get("format") or {}
+    if text_format.get("type") == "json_schema":
+        return json.dumps(_fill(text_format["schema"]))
+    return ANSWER
+
+
+# Streams that ran to the end vs. streams whose client went away first.
+STREAM_STATS = {"completed": 0, "cancelled": 0}
+# Requests admitted vs. rejected with a 429.
+LIMIT_STATS = {"accepted": 0, "throttled": 0}
+
+
+class ProviderLimits:
+    """Per-minute request and token buckets refilled continuously, plus a concurrency cap (0 = off)."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_concurrency: int = 0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+
+    def admit(self, request: dict) -> JSONResponse | None:
+        """None if ``request`` may run (the caller must then ``finish`` it), else the 429 to send."""
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        tokens = sum(len(str(item.get("content", ""))) for item in request.get("input", [])) // 4
+        tokens += request.get("max_output_tokens") or 0
+
+        retry_after = 0.0
+        if self.rpm and self.requests < 1:
+            retry_after = (1 - self.requests) * 60 / self.rpm
+        if self.tpm and self.tokens < tokens:
+            retry_after = max(retry_after, (tokens - self.tokens) * 60 / self.tpm)
+        if retry_after or (self.max_concurrency and self.in_flight >= self.max_concurrency):
+            LIMIT_STATS["throttled"] += 1
+            headers = {"retry-after-ms": str(int(retry_after * 1000) + 1)} if retry_after else {}
+            error = {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}
+            return JSONResponse({"error": error}, status_code=429, headers=headers)
+        self.requests -= 1
+        self.tokens -= tokens
+        self.in_flight += 1
+        LIMIT_STATS["accepted"] += 1
+        return None
+
+    def finish(self) -> None:
+        self.in_flight -= 1
+
+
+def _response(request: dict, status: str, text: str) -> dict[str, Any]:
+    output = []
+    if text:
+        output.append(
+            {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "status": status,
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        )
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": request.get("model", "fake"),
+        "status": status,
+        "output": output,
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": sum(len(str(item.get("content", "")).split()) for item in request.get("input", [])),
+            "output_tokens": len(_tokens(text)) if text else 0,
+            "total_tokens": 0,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+def create_app(
+    latency_ms: float,
+    jitter_ms: float,
+    token_ms: float = 20,
+    limits: ProviderLimits | None = None,
+) -> FastAPI:
+    app = FastAPI()
+    limits = limits or ProviderLimits()
+
+    async def first_token_delay() -> None:
+        await asyncio.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+
+    async def events(request: dict) -> AsyncIterator[str]:
+        sequence = 0
+
+        def sse(payload: dict[str, Any]) -> str:
+            nonlocal sequence
+            sequence += 1
+            return f"event: {payload['type']}\ndata: {json.dumps({**payload, 'sequence_number': sequence})}\n\n"
+
+        try:
+            yield sse({"type": "response.created", "response": _response(request, "in_progress", "")})
+            await first_token_delay()
+            answer = _answer(request)
+            for position, token in enumerate(_tokens(answer)):
+                if position:
+                    await asyncio.sleep(token_ms / 1000)
+                yield sse(
+                    {
+                        "type": "response.output_text.delta",
+                        "item_id": "msg_fake",
+                        "output_index": 0,
+                        "content_index": 0,
+                        "delta": token,
+                        "logprobs": [],
+                    }
+                )
+            yield sse({"type": "response.completed", "response": _response(request, "completed", answer)})
+        except asyncio.CancelledError:
+            STREAM_STATS["cancelled"] += 1
+            raise
+        finally:
+            limits.finish()
+        STREAM_STATS["completed"] += 1
+
+    @app.post("/v1/responses")
+    async def responses(request: dict):
+        rejected = limits.admit(request)
+        if rejected is not None:
+            return rejected
+        if request.get("stream"):
+            return StreamingResponse(events(request), media_type="text/event-stream")
+        try:
+            answer = _answer(request)
+            await first_token_delay()
+            await asyncio.sleep(token_ms * (len(_tokens(answer)) - 1) / 1000)
+            return _response(request, "completed", answer)
+        finally:
+            limits.finish()
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute (0 = unlimited)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="concurrent requests (0 = unlimited)")
+    args = parser.parse_args()
+    limits = ProviderLimits(args.rpm, args.tpm, args.max_concurrency)
+    uvicorn.run(
+        create_app(args.latency_ms, args.jitter_ms, args.token_ms, limits),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+
+import fakeredis
+import pytest
+import redis
+import redis.asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import Settings, get_settings
+from app.services.registry import services
+
+# Every path setting, pointed into the test's temporary directory.
+_STORAGE = {
+    "VECTOR_DB_PATH": "chroma",
+    "UPLOAD_DIR": "uploads",
+    "ARTIFACT_CACHE_PATH": "artifacts",
+    "ARTIFACT_STORE_PATH": "artifact_store",
+    "STAGE_WORKSPACE_PATH": "stages",
+    "OCR_CACHE_PATH": "ocr_cache",
+    "LLM_CACHE_PATH": "llm_cache",
+    "NUMPY_VECTOR_PATH": "vectors",
+    "CHUNK_STORE_PATH": "chunks.db",
+    "SEARCH_INDEX_PATH": "search.db",
+}
+
+
+def _forget_services() -> None:
+    for service in services.values():
+        object.__setattr__(service, "_lazy_instance", None)
+
+
+@pytest.fixture(autouse=True)
+def settings(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Settings]:
+    """Fresh settings with storage under ``tmp_path``, and service singletons rebuilt from them.
+
+    Tests change settings with ``monkeypatch.setenv`` followed by ``get_settings.cache_clear()``.
+    """
+    for name, path in _STORAGE.items():
+        monkeypatch.setenv(name, str(tmp_path / path))
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv("VECTOR_BACKEND", "numpy")
+    monkeypatch.setenv("ENVIRONMENT", "test")
+    get_settings.cache_clear()
+    _forget_services()
+    yield get_settings()
+    get_settings.cache_clear()
+    _forget_services()
+
+
+@pytest.fixture
+def redis_server(monkeypatch: pytest.MonkeyPatch) -> fakeredis.FakeServer:
+    """An in-memory Redis (with Lua) behind every sync and async client the app creates, as if shared by processes."""
+    server = fakeredis.FakeServer()
+
+    class SyncRedis(fakeredis.FakeRedis):
+        @classmethod
+        def from_url(cls, url: str, **kwargs: object) -> "SyncRedis":
+            return cls(server=server)
+
+    class AsyncRedis(fakeredis.FakeAsyncRedis):
+        @classmethod
+        def from_url(cls, url: str, **kwargs: object) -> "AsyncRedis":
+            return cls(server=server)
+
+    monkeypatch.setattr(redis, "Redis", SyncRedis)
+    monkeypatch.setattr(redis.asyncio, "Redis", AsyncRedis)
+    return server
+
+
+@pytest.fixture
+def database(settings: Settings) -> Iterator[Engine]:
+    """A synchronous engine on the test's SQLite database, with the schema created, for setup and assertions."""
+    from app.models.base import Base
+
+    engine = create_engine(settings.database_url.replace("+aiosqlite", ""))
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(settings: Settings, database: Engine) -> Iterator[TestClient]:
+    """The API over the test database; the lifespan (model warm-up) does not run."""
+    from app.db.session import get_db
+    from app.main import app
+
+    # Each TestClient request runs on its own event loop, so connections must not be pooled across them.
+    engine = create_async_engine(settings.database_url, poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_test_db() -> AsyncIterator[AsyncSession]:
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    yield TestClient(app, base_url=f"http://test{settings.api_v1_prefix}")
+    app.dependency_overrides.clear()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from app.core.config import get_settings
+from app.services.answer_cache import AnswerCache, normalize_question
+
+DUE = {"answer": "In 30 days."}
+TOTAL = {"answer": "$1,200."}
+
+
+def unit(*values: float) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_questions_match_exactly_after_normalization() -> None:
+    cache = AnswerCache()
+    cache.put(1, "v1", "When is the invoice due?", unit(1, 0), DUE)
+
+    assert normalize_question("  when is the INVOICE   due? ") == "when is the invoice due"
+    assert cache.get(1, "v1", "when is the invoice due") == DUE
+    assert cache.get(1, "v1", "What is the total?") is None
+    assert cache.get(2, "v1", "When is the invoice due?") is None
+
+
+def test_near_duplicate_questions_match_on_embedding_similarity() -> None:
+    cache = AnswerCache()
+    cache.put(1, "v1", "When is the invoice due?", unit(1, 0, 0), DUE)
+    cache.put(1, "v1", "What is the total?", unit(0, 1, 0), TOTAL)
+
+    assert cache.get_similar(1, "v1", unit(0.1, 1, 0)) == TOTAL
+    assert cache.get_similar(1, "v1", unit(1, 1, 0)) is None
+    assert cache.stats() == {
+        "entries": 2,
+        "documents": 1,
+        "exact_hits": 0,
+        "semantic_hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+    }
+
+
+def test_a_new_document_version_drops_the_old_answers() -> None:
+    cache = AnswerCache()
+    cache.put(1, "v1", "When is the invoice due?", unit(1, 0), DUE)
+    cache.put(2, "v1", "When is the invoice due?", unit(1, 0), DUE)
+
+    assert cache.get(1, "v2", "When is the invoice due?") is None
+    assert cache.get_similar(1, "v2", unit(1, 0)) is None
+    assert cache.get(1, "v1", "When is the invoice due?") is None
+    assert cache.get(2, "v1", "When is the invoice due?") == DUE
+    assert cache.stats()["entries"] == 1
+
+
+def test_entries_are_evicted_least_recently_used_across_documents(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("ANSWER_CACHE_MAX_ENTRIES", "2")
+    get_settings.cache_clear()
+    cache = AnswerCache()
+    cache.put(1, "v1", "due", unit(1, 0), DUE)
+    cache.put(2, "v1", "total", unit(0, 1), TOTAL)
+    cache.get(1, "v1", "due")
+    cache.put(3, "v1", "due", unit(1, 0), DUE)
+
+    assert cache.get(2, "v1", "total") is None
+    assert cache.get(1, "v1", "due") == DUE
+    assert cache.get(3, "v1", "due") == DUE
+
+
+def test_expired_entries_are_not_served(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("ANSWER_CACHE_TTL_SECONDS", "0")
+    get_settings.cache_clear()
+    cache = AnswerCache()
+    cache.put(1, "v1", "due", unit(1, 0), DUE)
+
+    assert cache.get_similar(1, "v1", unit(1, 0)) is None
+    assert cache.get(1, "v1", "due") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,68 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.core.config import get_settings
+from app.services.artifact_cache import ArtifactCache, ArtifactWriter
+from app.services.artifact_store import artifact_store
+
+CONTENT_HASH = "ab" * 32
+
+
+@pytest.mark.parametrize(
+    ("name", "value"),
+    [
+        ("ENRICHMENT_MODE", "hierarchical"),
+        ("ENRICHMENT_SECTION_TOKENS", "1024"),
+        ("ENRICHMENT_MAX_SECTIONS", "12"),
+        ("ENRICHMENT_REDUCE_MAX_CHARS", "8000"),
+    ],
+)
+def test_enrichment_settings_change_the_cache_variant(monkeypatch: pytest.MonkeyPatch, name: str, value: str) -> None:
+    before = ArtifactCache().variant
+    monkeypatch.setenv(name, value)
+    get_settings.cache_clear()
+
+    assert ArtifactCache().variant != before
+
+
+def staged_writer(cache: ArtifactCache, age_seconds: float) -> dict:
+    """What ``index_stage`` leaves behind: a detached writer whose directory is ``age_seconds`` old."""
+    artifacts = artifact_store.writer(CONTENT_HASH)
+    artifacts.add_page(1, "Invoice due in 30 days.")
+    artifacts.commit()
+    writer = cache.writer(CONTENT_HASH, "model")
+    metadatas = [{"char_start": 0, "char_end": 23}]
+    writer.add_chunks(["Invoice due in 30 days."], np.ones((1, 4), dtype=np.float32), metadatas)
+    detached = writer.detach()
+    past = time.time() - age_seconds
+    os.utime(detached["tmp"], (past, past))
+    return detached
+
+
+def test_gc_spares_a_staged_writer_waiting_for_its_enrich_stage() -> None:
+    cache = ArtifactCache()
+    detached = staged_writer(cache, age_seconds=2 * 3600)
+
+    assert cache.collect_garbage([CONTENT_HASH], min_age_seconds=3600, staged_max_age_seconds=24 * 3600) == 0
+
+    writer = cache.reattach(CONTENT_HASH, detached)
+    assert isinstance(writer, ArtifactWriter)
+    writer.commit({"summary": "Due in 30 days."})
+    cached = cache.load(CONTENT_HASH)
+    assert cached is not None
+    assert (cached.chunk_count, cached.insights) == (1, {"summary": "Due in 30 days."})
+
+
+def test_a_staged_writer_removed_by_gc_is_not_cached_instead_of_failing() -> None:
+    cache = ArtifactCache()
+    detached = staged_writer(cache, age_seconds=2 * 3600)
+    writer = cache.reattach(CONTENT_HASH, detached)
+
+    assert cache.collect_garbage([CONTENT_HASH], min_age_seconds=3600, staged_max_age_seconds=3600) == 1
+
+    assert cache.reattach(CONTENT_HASH, detached) is None
+    writer.commit({"summary": "Due in 30 days."})
+    assert cache.load(CONTENT_HASH) is None
@@ -0,0 +1,97 @@
+import math
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.artifact_store import ArtifactStore, LocalArtifactBackend
+from app.services.chunking import Chunk
+
+CONTENT_HASH = "cd" * 32
+# Multi-byte characters make frame byte offsets differ from character offsets.
+PAGES = [(1, "Invoice №42 — "), (1, "due in 30 days. "), (2, "Totals: €1,200; "), (3, "paid in full ✓")]
+TEXT = "".join(text for _, text in PAGES)
+
+
+class RecordingBackend(LocalArtifactBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.gets: list[tuple[str, int, int | None]] = []
+
+    def get(self, key: str, start: int = 0, end: int | None = None) -> bytes:
+        self.gets.append((key, start, end))
+        return super().get(key, start, end)
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> ArtifactStore:
+    monkeypatch.setenv("ARTIFACT_STORE_FRAME_CHARS", "8")
+    monkeypatch.setenv("ARTIFACT_STORE_ROW_GROUP_ROWS", "2")
+    get_settings.cache_clear()
+    store = ArtifactStore(RecordingBackend())
+    writer = store.writer(CONTENT_HASH)
+    for page, text in PAGES:
+        writer.add_page(page, text)
+    writer.add_chunks(
+        [
+            Chunk(TEXT[0:30], 0, 1, char_start=0, char_end=30),
+            Chunk(TEXT[20:50], 1, 1, page_end=2, char_start=20, char_end=50),
+        ]
+    )
+    writer.add_tables(
+        [{"headers": ["item", "qty", "price"], "rows": [["a", "1", "2"], ["b", "3"], ["c"], ["d", "4", "5"], ["e"]]}]
+    )
+    writer.commit()
+    return store
+
+
+def test_every_span_reads_back_the_original_text(store: ArtifactStore) -> None:
+    reader = store.reader(CONTENT_HASH)
+    assert reader is not None
+    assert len(reader.manifest.frames) == math.ceil(len(TEXT) / 8) + 1
+
+    for start in range(len(TEXT) + 1):
+        for end in range(start, len(TEXT) + 2):
+            assert reader.read(start, end) == TEXT[start:end]
+    assert store.read_text(CONTENT_HASH) == TEXT
+
+
+def test_a_span_fetches_only_the_frames_it_covers(store: ArtifactStore) -> None:
+    backend = store.backend
+    reader = store.reader(CONTENT_HASH)
+    frames = reader.manifest.frames
+    backend.gets.clear()
+
+    assert reader.read(10, 20) == TEXT[10:20]
+    assert backend.gets == [(f"{CONTENT_HASH}/text.zst", frames[1], frames[3])]
+    # Within the frames already decompressed, nothing is fetched again.
+    assert reader.read(12, 24) == TEXT[12:24]
+    assert len(backend.gets) == 1
+
+
+def test_pages_and_chunks_are_sliced_from_the_stored_text(store: ArtifactStore) -> None:
+    first = len(PAGES[0][1]) + len(PAGES[1][1])
+
+    assert store.read_page(CONTENT_HASH, 1) == (0, first, TEXT[:first])
+    assert store.read_page(CONTENT_HASH, 2) == (first, first + len(PAGES[2][1]), PAGES[2][1])
+    assert store.read_page(CONTENT_HASH, 4) is None
+    span, text = store.read_chunk(CONTENT_HASH, 1)
+    assert (span.start, span.end, span.page, span.page_end, text) == (20, 50, 1, 2, TEXT[20:50])
+    assert store.read_chunk(CONTENT_HASH, 2) is None
+
+
+@pytest.mark.parametrize(
+    ("offset", "limit", "expected"),
+    [
+        (0, None, [["a", "1", "2"], ["b", "3"], ["c"], ["d", "4", "5"], ["e"]]),
+        (1, 2, [["b", "3"], ["c"]]),
+        (3, 10, [["d", "4", "5"], ["e"]]),
+        (5, 1, []),
+    ],
+)
+def test_table_rows_are_read_by_row_group(store: ArtifactStore, offset: int, limit: int | None, expected: list) -> None:
+    store.backend.gets.clear()
+    table, rows = store.read_table(CONTENT_HASH, 0, offset, limit)
+
+    assert (table.headers, table.row_count, len(table.row_groups)) == (["item", "qty", "price"], 5, 3)
+    assert rows == expected
+    assert len(store.backend.gets) == (1 if expected else 0)
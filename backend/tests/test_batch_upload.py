@@ -0,0 +1,123 @@
+import importlib
+import io
+import zipfile
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, func, select, update
+
+from app.core.config import get_settings
+from app.models.document import Document, DocumentStatus
+
+class FakeGroup:
+    """Records what ``upload_batch`` dispatches instead of publishing to a broker."""
+
+    dispatched: list[tuple[str, list[tuple[Any, ...]]]] = []
+    fail = False
+
+    def __init__(self, tasks: Any) -> None:
+        self.tasks = list(tasks)
+
+    def apply_async(self, task_id: str) -> None:
+        if FakeGroup.fail:
+            raise ConnectionError("broker unavailable")
+        FakeGroup.dispatched.append((task_id, [task.args for task in self.tasks]))
+
+
+@pytest.fixture
+def dispatched(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, list[tuple[Any, ...]]]]:
+    routes = importlib.import_module("app.api.routes.documents")
+    monkeypatch.setattr(FakeGroup, "dispatched", [])
+    monkeypatch.setattr(FakeGroup, "fail", False)
+    monkeypatch.setattr(routes, "group", FakeGroup)
+    monkeypatch.setattr(routes, "document_pipeline", lambda *args: SimpleNamespace(args=args))
+    return FakeGroup.dispatched
+
+
+def zip_of(files: dict[str, bytes]) -> bytes:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return archive.getvalue()
+
+
+def set_status(database: Engine, statuses: dict[int, DocumentStatus]) -> None:
+    with database.begin() as conn:
+        for document_id, status in statuses.items():
+            conn.execute(update(Document).where(Document.id == document_id).values(status=status))
+
+
+def test_a_batch_of_files_and_archives_is_inserted_and_dispatched_as_one_group(
+    client: TestClient, database: Engine, dispatched: list
+) -> None:
+    archive = zip_of({"a.txt": b"alpha", "nested/b.txt": b"beta", "__MACOSX/._b.txt": b"", "dir/.hidden": b"x"})
+    response = client.post(
+        "/documents/batch",
+        files=[("files", ("c.txt", b"gamma", "text/plain")), ("files", ("docs.zip", archive, "application/zip"))],
+    )
+
+    assert response.status_code == 201
+    body = response.json()
+    assert body["document_count"] == 3
+    assert [doc["filename"] for doc in body["documents"]] == ["c.txt", "a.txt", "b.txt"]
+    assert {doc["status"] for doc in body["documents"]} == {"received"}
+    [(task_id, tasks)] = dispatched
+    assert task_id == body["batch_id"]
+    assert [document_id for document_id, _ in tasks] == [doc["id"] for doc in body["documents"]]
+
+    with database.connect() as conn:
+        stored = conn.execute(select(func.count()).where(Document.batch_id == body["batch_id"])).scalar_one()
+    assert stored == 3
+
+
+def test_batch_progress_counts_documents_by_status(client: TestClient, database: Engine, dispatched: list) -> None:
+    files = [("files", (f"{i}.txt", f"document {i}".encode(), "text/plain")) for i in range(4)]
+    body = client.post("/documents/batch", files=files).json()
+    ids = [doc["id"] for doc in body["documents"]]
+    set_status(
+        database, {ids[0]: DocumentStatus.COMPLETED, ids[1]: DocumentStatus.FAILED, ids[2]: DocumentStatus.PROCESSING}
+    )
+
+    progress = client.get(f"/documents/batches/{body['batch_id']}").json()
+
+    assert progress == {
+        "batch_id": body["batch_id"],
+        "total": 4,
+        "received": 1,
+        "processing": 1,
+        "completed": 1,
+        "failed": 1,
+        "finished": False,
+        "progress": 0.5,
+    }
+    set_status(database, {ids[2]: DocumentStatus.COMPLETED, ids[3]: DocumentStatus.COMPLETED})
+    assert client.get(f"/documents/batches/{body['batch_id']}").json()["finished"] is True
+    assert client.get("/documents/batches/unknown").status_code == 404
+
+
+def test_a_failed_dispatch_marks_the_batch_failed(client: TestClient, database: Engine, dispatched: list) -> None:
+    FakeGroup.fail = True
+    response = client.post("/documents/batch", files=[("files", ("a.txt", b"alpha", "text/plain"))])
+
+    assert response.status_code == 503
+    with database.connect() as conn:
+        statuses = conn.execute(select(Document.status)).scalars().all()
+    assert statuses == [DocumentStatus.FAILED]
+
+
+def test_an_empty_or_oversized_batch_is_rejected(
+    client: TestClient, dispatched: list, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    response = client.post("/documents/batch", files={"files": ("empty.zip", zip_of({}), "application/zip")})
+    assert response.status_code == 400
+
+    monkeypatch.setenv("BATCH_MAX_FILES", "2")
+    get_settings.cache_clear()
+    archive = zip_of({f"{i}.txt": b"x" for i in range(3)})
+    response = client.post("/documents/batch", files={"files": ("many.zip", archive, "application/zip")})
+
+    assert response.status_code == 400
+    assert dispatched == []
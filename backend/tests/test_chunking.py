@@ -0,0 +1,144 @@
+import random
+import re
+from bisect import bisect_right
+
+import pytest
+
+from app.services.chunking import Chunk, TokenChunker, WordCounter
+
+COUNTER = WordCounter()
+
+
+def make_pages(seed: int = 0, pages: int = 4, paragraphs: int = 4) -> list[tuple[int, str]]:
+    """Pages of paragraphs of sentences of 3 to 8 tokens (2 to 7 words and a full stop)."""
+    rng = random.Random(seed)
+    result = []
+    for page in range(1, pages + 1):
+        body = []
+        for paragraph in range(paragraphs):
+            sentences = [
+                " ".join(f"p{page}s{paragraph}w{word}" for word in range(rng.randint(2, 7))).capitalize() + "."
+                for _ in range(rng.randint(1, 6))
+            ]
+            body.append(" ".join(sentences))
+        result.append((page, "\n\n".join(body) + "\n\n"))
+    return result
+
+
+def chunk(pages: list[tuple[int, str]], **options) -> list[Chunk]:
+    return list(TokenChunker(COUNTER, **options).iter_chunks(pages))
+
+
+def tokens(text: str) -> int:
+    return COUNTER.count([text])[0]
+
+
+PAGES = make_pages()
+TEXT = "".join(text for _, text in PAGES)
+PAGE_STARTS = [sum(len(text) for _, text in PAGES[:pos]) for pos in range(len(PAGES))]
+
+
+def page_at(offset: int) -> int:
+    return PAGES[bisect_right(PAGE_STARTS, offset) - 1][0]
+
+
+@pytest.mark.parametrize(("max_tokens", "overlap_tokens"), [(16, 0), (24, 6), (48, 12), (64, 0), (20, 19)])
+def test_chunks_are_spans_of_the_document_within_the_token_budget(max_tokens: int, overlap_tokens: int) -> None:
+    chunks = chunk(PAGES, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    for c in chunks:
+        assert c.text == TEXT[c.char_start : c.char_end]
+        assert 0 < tokens(c.text) <= max_tokens
+        assert c.page == page_at(c.char_start)
+        assert c.page_end == page_at(c.char_end - 1)
+
+
+@pytest.mark.parametrize("overlap_tokens", [0, 6])
+def test_every_word_is_in_some_chunk(overlap_tokens: int) -> None:
+    chunks = chunk(PAGES, max_tokens=24, overlap_tokens=overlap_tokens)
+
+    for word in re.finditer(r"\w+", TEXT):
+        assert any(c.char_start <= word.start() and word.end() <= c.char_end for c in chunks), word.group()
+
+
+def test_without_overlap_chunks_follow_each_other() -> None:
+    chunks = chunk(PAGES, max_tokens=24)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.char_start >= previous.char_end
+
+
+def test_overlap_repeats_whole_trailing_sentences_within_its_budget() -> None:
+    chunks = chunk(PAGES, max_tokens=24, overlap_tokens=8)
+
+    overlaps = 0
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.char_start > previous.char_start
+        if current.char_start >= previous.char_end:
+            continue
+        overlaps += 1
+        assert tokens(TEXT[current.char_start : previous.char_end]) <= 8
+        # The repeated part starts a sentence.
+        assert TEXT[current.char_start].isupper()
+        assert TEXT[: current.char_start].rstrip().endswith(".")
+    assert overlaps > 0
+
+
+def test_overlap_never_pushes_a_chunk_over_the_budget() -> None:
+    # Carried sentences plus the sentence that did not fit must still fit.
+    chunks = chunk(PAGES, max_tokens=10, overlap_tokens=9)
+
+    assert all(tokens(c.text) <= 10 for c in chunks)
+
+
+def test_a_sentence_longer_than_the_budget_is_split_on_token_boundaries() -> None:
+    words = [f"word{i}" for i in range(50)]
+    pages = [(1, "Short one. " + " ".join(words) + " and more words. Tail sentence.")]
+    text = pages[0][1]
+
+    chunks = chunk(pages, max_tokens=16)
+
+    assert all(c.text == text[c.char_start : c.char_end] for c in chunks)
+    assert all(tokens(c.text) <= 16 for c in chunks)
+    covered = " ".join(c.text for c in chunks)
+    assert all(word in covered.split() for word in words)
+    # Pieces of the long sentence meet at word boundaries, never inside a word.
+    for c in chunks:
+        assert c.char_start == 0 or not text[c.char_start - 1].isalnum()
+        assert c.char_end == len(text) or not text[c.char_end].isalnum()
+
+
+def test_chunks_close_at_paragraph_boundaries_once_mostly_full() -> None:
+    paragraph = "One two three four five six. Seven eight nine ten eleven twelve."  # 14 tokens
+    pages = [(1, "\n\n".join([paragraph] * 4) + "\n\n")]
+    text = pages[0][1]
+
+    # 14 tokens reach the soft limit of 0.75 * 16, so each paragraph is its own chunk.
+    chunks = chunk(pages, max_tokens=16)
+
+    assert [c.text for c in chunks] == [paragraph] * 4
+    assert all(text[c.char_end : c.char_end + 2] == "\n\n" for c in chunks)
+
+
+def test_short_paragraphs_are_packed_together() -> None:
+    pages = [(1, "\n\n".join(["Alpha beta gamma."] * 6))]  # 4 tokens each
+
+    chunks = chunk(pages, max_tokens=16)
+
+    # Three paragraphs (12 tokens) reach the soft limit at a paragraph end.
+    assert [tokens(c.text) for c in chunks] == [12, 12]
+
+
+def test_chunks_span_pages() -> None:
+    pages = [(1, "First page sentence.\n\n"), (2, "Second page sentence.\n\n"), (3, "Third.")]
+
+    chunks = chunk(pages, max_tokens=64)
+
+    assert len(chunks) == 1
+    assert (chunks[0].page, chunks[0].page_end) == (1, 3)
+    assert chunks[0].text == "".join(text for _, text in pages).rstrip()
+
+
+def test_an_empty_document_yields_one_empty_chunk() -> None:
+    assert chunk([(1, ""), (2, "  \n\n ")]) == [Chunk("", 0, 1)]
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.services.comparison import ComparedDocument, DocumentComparator, best_matches, runs
+
+
+def normalized(rows: list[list[float]]) -> np.ndarray:
+    matrix = np.array(rows, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def document(document_id: int, embeddings: np.ndarray) -> ComparedDocument:
+    texts = [f"Section {document_id}.{i}" for i in range(len(embeddings))]
+    metadatas = [{"page": i + 1} for i in range(len(embeddings))]
+    return ComparedDocument(document_id, f"{document_id}.pdf", texts, embeddings, metadatas)
+
+
+@pytest.mark.parametrize("block_rows", [1, 3, 7, 2048])
+def test_best_matches_equals_the_full_matrix_argmax_whatever_the_block_size(block_rows: int) -> None:
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((17, 8)).astype(np.float32)
+    b = rng.standard_normal((11, 8)).astype(np.float32)
+    similarities = a @ b.T
+
+    matches = best_matches(a, b, block_rows=block_rows)
+
+    np.testing.assert_array_equal(matches.row_best, similarities.argmax(axis=1))
+    np.testing.assert_allclose(matches.row_score, similarities.max(axis=1), rtol=1e-6)
+    np.testing.assert_array_equal(matches.col_best, similarities.argmax(axis=0))
+    np.testing.assert_allclose(matches.col_score, similarities.max(axis=0), rtol=1e-6)
+
+
+def test_best_matches_against_an_empty_document_scores_nothing() -> None:
+    matches = best_matches(np.ones((3, 4), dtype=np.float32), np.zeros((0, 4), dtype=np.float32))
+
+    assert np.all(matches.row_score == -np.inf)
+    assert len(matches.col_best) == 0
+
+
+@pytest.mark.parametrize(
+    ("indices", "expected"),
+    [
+        ([], []),
+        ([4], [(4, 4)]),
+        ([0, 1, 2], [(0, 2)]),
+        ([0, 1, 3, 5, 6, 7, 9], [(0, 1), (3, 3), (5, 7), (9, 9)]),
+    ],
+)
+def test_runs_collapses_consecutive_indices(indices: list[int], expected: list[tuple[int, int]]) -> None:
+    assert runs(np.array(indices, dtype=np.int64)) == expected
+
+
+def test_align_pair_separates_identical_reworded_and_unique_sections() -> None:
+    a = document(1, normalized([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1]]))
+    # Chunk 0 is unchanged, chunk 1 reworded (cosine 0.86), and each document has one section of its own.
+    b = document(2, normalized([[1, 0, 0, 0], [0, 1, 0.6, 0], [0, 0, -1, 0]]))
+
+    pair = DocumentComparator().align_pair(a, b)
+
+    assert [(i, j) for i, j, _ in pair.aligned] == [(0, 0)]
+    assert [(i, j) for i, j, _ in pair.changed] == [(1, 1)]
+    assert pair.changed[0][2] == pytest.approx(1 / np.sqrt(1.36))
+    assert (pair.only_in_a, pair.only_in_b) == ([(2, 2)], [(2, 2)])
+    assert pair.similarity == pytest.approx(4 / 6)
+    assert pair.as_dict()["only_in_b"] == [
+        {"document_id": 2, "chunks": [2, 2], "pages": [3, 3], "text": "Section 2.2"}
+    ]
+
+
+def test_align_pair_only_aligns_mutual_best_matches() -> None:
+    # Both of A's chunks prefer B's only chunk, which prefers A's chunk 0.
+    a = document(1, normalized([[1, 0], [1, 0.2]]))
+    b = document(2, normalized([[1, 0]]))
+
+    pair = DocumentComparator().align_pair(a, b)
+
+    assert [(i, j) for i, j, _ in pair.aligned] == [(0, 0)]
+    assert pair.changed == [] and pair.only_in_a == []
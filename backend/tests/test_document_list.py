@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Engine, insert
+
+from app.models.document import Document, DocumentStatus
+from app.services.document_list import decode_cursor, encode_cursor
+
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def add_documents(database: Engine, created: list[datetime], **values: object) -> None:
+    rows = [
+        {
+            "filename": f"{i}.txt",
+            "content_type": "text/plain",
+            "size_bytes": 1,
+            "storage_path": f"/uploads/{i}.txt",
+            "status": DocumentStatus.COMPLETED,
+            "created_at": created_at,
+            "updated_at": created_at,
+            **values,
+        }
+        for i, created_at in enumerate(created)
+    ]
+    with database.begin() as conn:
+        conn.execute(insert(Document), rows)
+
+
+def all_pages(client: TestClient, **params: object) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        body = client.get("/documents/", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        pages.append([item["id"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("created_at", [START, START.replace(microsecond=123456)])
+def test_cursors_round_trip(created_at: datetime) -> None:
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(START, 1)[:-3], "WzEsMiwzXQ"])
+def test_malformed_cursors_are_rejected(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_are_newest_first_and_neither_skip_nor_repeat_rows_sharing_a_timestamp(
+    client: TestClient, database: Engine
+) -> None:
+    # Ids 1-3 share one timestamp, so the page boundary falls inside a tie on created_at.
+    add_documents(database, [START, START, START, START - timedelta(seconds=1), START + timedelta(seconds=1)])
+
+    pages = all_pages(client, limit=2)
+
+    assert pages == [[5, 3], [2, 1], [4]]
+
+
+def test_a_page_ending_exactly_at_the_last_row_has_no_next_cursor(client: TestClient, database: Engine) -> None:
+    add_documents(database, [START + timedelta(seconds=i) for i in range(4)])
+
+    assert all_pages(client, limit=2) == [[4, 3], [2, 1]]
+    assert all_pages(client, limit=200) == [[4, 3, 2, 1]]
+
+
+def test_filters_page_by_keyset_within_the_filter(client: TestClient, database: Engine) -> None:
+    add_documents(database, [START + timedelta(seconds=i) for i in range(3)], category="invoice")
+    add_documents(database, [START + timedelta(seconds=i) for i in range(3)], category="contract")
+
+    assert all_pages(client, limit=2, category="invoice") == [[3, 2], [1]]
+    body = client.get("/documents/", params={"status": "failed", "include_total": True}).json()
+    assert body == {"items": [], "next_cursor": None, "total": 0}
+    assert client.get("/documents/", params={"category": "contract", "include_total": True}).json()["total"] == 3
+
+
+def test_an_invalid_cursor_is_a_bad_request(client: TestClient) -> None:
+    assert client.get("/documents/", params={"cursor": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,27 @@
+from app.services.document_processor import DocumentProcessor, TableScanner
+
+PAGES = [
+    "Totals by region\nRegion | Q1 | Q2\nNorth | 10 | 12\nSou",
+    "th | 8 | 9\nEast | 7 | 11\n\nNotes follow.\nA | B\n",
+    "1 | 2",
+]
+
+
+def test_a_table_crossing_a_page_break_comes_back_whole() -> None:
+    scanner = TableScanner()
+    for page in PAGES:
+        scanner.feed(page)
+
+    assert scanner.finish() == [
+        {"headers": ["Region", "Q1", "Q2"], "rows": [["North", "10", "12"], ["South", "8", "9"], ["East", "7", "11"]]},
+        {"headers": ["A", "B"], "rows": [["1", "2"]]},
+    ]
+
+
+def test_paged_scanning_matches_scanning_the_whole_text() -> None:
+    text = "".join(PAGES).replace("\n", "\r\n")
+    scanner = TableScanner()
+    for start in range(0, len(text), 7):
+        scanner.feed(text[start : start + 7])
+
+    assert scanner.finish() == DocumentProcessor().extract_tables(text)
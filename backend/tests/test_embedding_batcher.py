@@ -0,0 +1,57 @@
+import importlib
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+# ``app.services.embedding_batcher`` the attribute is the service; this is the module.
+batcher_module = importlib.import_module("app.services.embedding_batcher")
+
+
+class FakeEmbeddings:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        self.batches.append(list(texts))
+        return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def embeddings(monkeypatch: pytest.MonkeyPatch) -> FakeEmbeddings:
+    fake = FakeEmbeddings()
+    monkeypatch.setattr(batcher_module, "embedding_service_for", lambda model: fake)
+    return fake
+
+
+def test_concurrent_requests_are_coalesced_into_one_encode(embeddings: FakeEmbeddings) -> None:
+    batcher = EmbeddingBatcher(max_batch_size=3, max_wait_ms=5000)
+    futures = [batcher.submit(text) for text in ("a", "bb", "ccc")]
+
+    assert [float(future.result(timeout=5)[0]) for future in futures] == [1.0, 2.0, 3.0]
+    assert embeddings.batches == [["a", "bb", "ccc"]]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_a_forked_process_starts_its_own_dispatcher(embeddings: FakeEmbeddings) -> None:
+    batcher = EmbeddingBatcher(max_batch_size=1, max_wait_ms=0)
+    assert float(batcher.embed_one("parent")[0]) == 6.0
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # The parent's dispatcher thread does not exist here; without a restart this would hang.
+        result = threading.Thread(target=lambda: os.write(write_fd, b"%d" % batcher.embed_one("child")[0]))
+        result.start()
+        result.join(timeout=5)
+        os._exit(0 if not result.is_alive() else 1)
+    os.close(write_fd)
+    _, status = os.waitpid(pid, 0)
+    with os.fdopen(read_fd, "rb") as pipe:
+        output = pipe.read()
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert output == b"5"
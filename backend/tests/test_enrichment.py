@@ -0,0 +1,69 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.llm_client import LLMClient
+
+SECTIONS = [f"Section {pos} of the annual report." for pos in range(4)]
+INSIGHTS = {
+    "summary": "An annual report.",
+    "key_points": ["Revenue grew."],
+    "sentiment": "positive",
+    "category": "Finance",
+}
+
+
+class FakeResponses:
+    """Answers every request; the first request for ``failing`` raises, as a dropped connection would."""
+
+    def __init__(self, failing: str) -> None:
+        self.failing = failing
+        self.failed = False
+        self.sent: list[str] = []
+
+    def send(self, request: dict, priority: str, kind: str) -> SimpleNamespace:
+        user_prompt = request["input"][1]["content"]
+        self.sent.append(user_prompt)
+        if user_prompt == self.failing and not self.failed:
+            self.failed = True
+            raise ConnectionError("connection dropped")
+        text = json.dumps(INSIGHTS) if kind == "reduce" else f"Summary of: {user_prompt}"
+        return SimpleNamespace(
+            output=[SimpleNamespace(content=[SimpleNamespace(type="output_text", text=text)])],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5),
+        )
+
+
+def test_a_retried_hierarchical_run_only_resends_the_failed_section(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    get_settings.cache_clear()
+    responses = FakeResponses(failing=SECTIONS[2])
+    monkeypatch.setattr(LLMClient, "_send", responses.send)
+    from app.services.enrichment import enrichment_service
+
+    with pytest.raises(ConnectionError):
+        enrichment_service.enrich(SECTIONS[0], mode="hierarchical", sections=SECTIONS)
+    assert sorted(responses.sent) == sorted(SECTIONS)
+
+    responses.sent.clear()
+    result = enrichment_service.enrich(SECTIONS[0], mode="hierarchical", sections=SECTIONS)
+
+    assert responses.sent[0] == SECTIONS[2]
+    assert len(responses.sent) == 2  # The failed section, then the reduce request.
+    assert (result.summary, result.category) == (INSIGHTS["summary"], INSIGHTS["category"])
+    assert result.usage.cached_calls == 3
+
+
+def test_other_completions_still_honour_the_cache_bypass(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    get_settings.cache_clear()
+    responses = FakeResponses(failing="")
+    monkeypatch.setattr(LLMClient, "_send", responses.send)
+    from app.services.llm_client import llm_client
+
+    llm_client.summarize("The invoice is due in 30 days.")
+    llm_client.summarize("The invoice is due in 30 days.")
+
+    assert len(responses.sent) == 2
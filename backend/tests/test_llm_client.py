@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm_client import LLMClient
+
+
+class StalledStream:
+    """A response stream that sends one delta, then goes quiet; closing it is interrupted too."""
+
+    def __init__(self) -> None:
+        self.close_attempted = False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        yield SimpleNamespace(type="response.output_text.delta", delta="Partial")
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        self.close_attempted = True
+        raise asyncio.CancelledError
+
+
+def test_a_cancelled_stream_releases_its_concurrency_slot(redis_server) -> None:
+    from app.services.llm_rate_limiter import llm_rate_limiter
+
+    client = LLMClient()
+    stream = StalledStream()
+
+    async def create(**_: object) -> StalledStream:
+        return stream
+
+    client.async_client = SimpleNamespace(responses=SimpleNamespace(create=create))
+    received: list[str] = []
+
+    async def consume() -> None:
+        async for delta in client.astream_answer_question("When is it due?", "The invoice is due in 30 days."):
+            received.append(delta)
+
+    async def run() -> None:
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        assert llm_rate_limiter.concurrency.in_flight == 1
+        # The client disconnects: the SSE generator is cancelled mid-stream.
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await llm_rate_limiter.aclose()
+
+    asyncio.run(run())
+
+    assert received == ["Partial"]
+    assert stream.close_attempted
+    assert llm_rate_limiter.concurrency.in_flight == 0
@@ -0,0 +1,240 @@
+import asyncio
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.llm_rate_limiter import AdaptiveConcurrency, LLMRateLimiter
+
+
+@pytest.fixture
+def make_limiter(redis_server, monkeypatch: pytest.MonkeyPatch):
+    def make(**settings: object) -> LLMRateLimiter:
+        options = {
+            "LLM_REQUESTS_PER_MINUTE": 1000,
+            "LLM_TOKENS_PER_MINUTE": 1000,
+            "LLM_BATCH_RESERVE_FRACTION": 0.0,
+            **settings,
+        }
+        for name, value in options.items():
+            monkeypatch.setenv(name, str(value))
+        get_settings.cache_clear()
+        return LLMRateLimiter()
+
+    return make
+
+
+def attempt(limiter: LLMRateLimiter, priority: str, tokens: int) -> int:
+    """Milliseconds the acquire script tells a caller to wait; 0 means it was admitted."""
+    return limiter._scripts()["acquire"](**limiter._acquire_args(priority, tokens))
+
+
+def bucket(limiter: LLMRateLimiter, field: str) -> float:
+    limiter._scripts()
+    return float(limiter._redis.hget(limiter.bucket_key, field))
+
+
+# Adaptive concurrency
+
+
+def test_successes_raise_the_limit_by_about_one_per_round() -> None:
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=8)
+
+    for _ in range(4):
+        concurrency.acquire()
+        concurrency.release("ok")
+
+    assert 4.9 < concurrency.limit < 5
+    for _ in range(200):
+        concurrency.acquire()
+        concurrency.release("ok")
+    assert concurrency.limit == 8
+
+
+def test_throttling_halves_the_limit_down_to_the_minimum() -> None:
+    concurrency = AdaptiveConcurrency(initial=16, minimum=3, maximum=32)
+
+    concurrency.acquire()
+    concurrency.release("throttled")
+    assert concurrency.limit == 8
+    for _ in range(5):
+        concurrency.acquire()
+        concurrency.release("throttled")
+    assert concurrency.limit == 3
+
+
+def test_errors_and_cancellations_leave_the_limit() -> None:
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=8)
+
+    for outcome in ("error", "cancelled"):
+        concurrency.acquire()
+        concurrency.release(outcome)
+
+    assert concurrency.limit == 4
+    assert concurrency.in_flight == 0
+
+
+def test_no_more_than_the_limit_are_in_flight() -> None:
+    concurrency = AdaptiveConcurrency(initial=2, minimum=1, maximum=8)
+
+    assert concurrency.try_acquire()
+    assert concurrency.try_acquire()
+    assert not concurrency.try_acquire()
+    concurrency.release("error")
+    assert concurrency.try_acquire()
+    assert concurrency.in_flight == 2
+
+
+# Shared buckets
+
+
+def test_requests_wait_for_the_requests_bucket_to_refill(make_limiter) -> None:
+    limiter = make_limiter(LLM_REQUESTS_PER_MINUTE=3, LLM_TOKENS_PER_MINUTE=100_000)
+
+    assert [attempt(limiter, "interactive", 1) for _ in range(3)] == [0, 0, 0]
+    # One request refills every 20 s.
+    assert 19_000 < attempt(limiter, "interactive", 1) <= 20_000
+
+
+def test_requests_wait_for_the_tokens_they_need(make_limiter) -> None:
+    limiter = make_limiter()
+
+    assert attempt(limiter, "interactive", 600) == 0
+    # 100 tokens short at 1000 tokens per minute.
+    assert 5_900 < attempt(limiter, "interactive", 500) <= 6_000
+
+
+def test_a_request_larger_than_the_bucket_is_admitted_when_it_is_full(make_limiter) -> None:
+    limiter = make_limiter()
+
+    assert attempt(limiter, "interactive", 5_000) == 0
+
+
+def test_batch_requests_leave_the_reserve_to_interactive_ones(make_limiter) -> None:
+    limiter = make_limiter(LLM_REQUESTS_PER_MINUTE=10, LLM_TOKENS_PER_MINUTE=100_000, LLM_BATCH_RESERVE_FRACTION=0.2)
+
+    assert [attempt(limiter, "batch", 1) for _ in range(8)] == [0] * 8
+    assert attempt(limiter, "batch", 1) > 0
+    assert [attempt(limiter, "interactive", 1) for _ in range(2)] == [0, 0]
+    assert attempt(limiter, "interactive", 1) > 0
+
+
+def test_batch_requests_hold_off_while_an_interactive_one_waits(make_limiter, redis_server) -> None:
+    limiter = make_limiter()
+
+    assert attempt(limiter, "batch", 700) == 0
+    assert attempt(limiter, "interactive", 500) > 0
+    # 10 tokens are available, but the interactive request is first in line.
+    assert 0 < attempt(limiter, "batch", 10) <= 250
+
+    limiter._redis.delete(limiter.waiting_key)
+    assert attempt(limiter, "batch", 10) == 0
+
+
+def test_pause_holds_every_request(make_limiter) -> None:
+    limiter = make_limiter()
+
+    limiter.pause(2.0)
+
+    assert 1_900 < attempt(limiter, "interactive", 1) <= 2_000
+    assert 1_900 < attempt(limiter, "batch", 1) <= 2_000
+
+
+# Permits
+
+
+def test_release_refunds_the_unused_part_of_the_estimate(make_limiter) -> None:
+    limiter = make_limiter()
+
+    permit = limiter.acquire("interactive", 800)
+    assert bucket(limiter, "tokens") == pytest.approx(200, abs=5)
+    assert limiter.concurrency.in_flight == 1
+
+    permit.release("ok", actual_tokens=300)
+    assert bucket(limiter, "tokens") == pytest.approx(700, abs=5)
+    assert limiter.concurrency.in_flight == 0
+
+
+@pytest.mark.parametrize(
+    ("outcome", "expected_tokens"),
+    [("ok", 200), ("cancelled", 200), ("error", 1000), ("throttled", 1000)],
+)
+def test_release_without_usage(make_limiter, outcome: str, expected_tokens: int) -> None:
+    # Without reported usage a completed request is assumed to have used its estimate; a failed one none of it.
+    limiter = make_limiter()
+
+    limiter.acquire("interactive", 800).release(outcome)
+
+    assert bucket(limiter, "tokens") == pytest.approx(expected_tokens, abs=5)
+
+
+def test_throttled_release_halves_concurrency(make_limiter) -> None:
+    limiter = make_limiter(LLM_CONCURRENCY_INITIAL=16)
+
+    limiter.acquire("interactive", 10).release("throttled")
+
+    assert limiter.concurrency.limit == 8
+
+
+def test_an_expired_wait_sends_anyway(make_limiter) -> None:
+    limiter = make_limiter(LLM_REQUESTS_PER_MINUTE=1, LLM_RATE_LIMIT_MAX_WAIT_SECONDS=0)
+    limiter.acquire("batch", 1).release()
+
+    permit = limiter.acquire("batch", 1)
+
+    assert limiter.concurrency.in_flight == 1
+    permit.release()
+
+
+def test_unreachable_redis_lets_requests_through_unmetered(make_limiter, redis_server) -> None:
+    limiter = make_limiter(LLM_REQUESTS_PER_MINUTE=1)
+    redis_server.connected = False
+
+    permits = [limiter.acquire("interactive", 10) for _ in range(3)]
+
+    assert limiter.concurrency.in_flight == 3
+    for permit in permits:
+        permit.release("ok", actual_tokens=1)
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_a_disabled_limiter_admits_everything_untracked(make_limiter) -> None:
+    limiter = make_limiter(LLM_RATE_LIMIT_ENABLED="false", LLM_REQUESTS_PER_MINUTE=1)
+
+    permits = [limiter.acquire("batch", 10_000) for _ in range(3)]
+    for permit in permits:
+        permit.release()
+
+    assert limiter._redis is None
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_async_acquire_and_release_share_the_buckets(make_limiter) -> None:
+    limiter = make_limiter()
+
+    async def run() -> None:
+        permit = await limiter.aacquire("interactive", 800)
+        assert limiter.concurrency.in_flight == 1
+        await permit.arelease("ok", actual_tokens=300)
+        await limiter.aclose()
+
+    asyncio.run(run())
+
+    assert bucket(limiter, "tokens") == pytest.approx(700, abs=5)
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_async_acquire_waits_for_a_concurrency_slot(make_limiter) -> None:
+    limiter = make_limiter(LLM_CONCURRENCY_INITIAL=1)
+
+    async def run() -> None:
+        first = await limiter.aacquire("interactive", 1)
+        second = asyncio.create_task(limiter.aacquire("interactive", 1))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        await first.arelease("error")
+        await (await asyncio.wait_for(second, 1)).arelease("error")
+        await limiter.aclose()
+
+    asyncio.run(run())
+
+    assert limiter.concurrency.in_flight == 0
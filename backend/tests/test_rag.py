@@ -0,0 +1,32 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.vector_store import VersionedVectorStore
+
+ANSWER = {"answer": "In 30 days.", "sources": []}
+
+
+def test_the_async_ask_path_resolves_the_active_index_off_the_event_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.services.answer_cache import answer_cache
+    from app.services.rag import rag_service
+
+    threads: list[threading.Thread] = []
+
+    def active(self: VersionedVectorStore) -> SimpleNamespace:
+        threads.append(threading.current_thread())
+        return SimpleNamespace(version=SimpleNamespace(id=1, embedding_model="model"))
+
+    monkeypatch.setattr(VersionedVectorStore, "active", active)
+    answer_cache.put(7, "v1@1", "When is it due?", np.ones(4, dtype=np.float32), ANSWER)
+
+    async def ask() -> tuple[dict, threading.Thread]:
+        return await rag_service.aanswer(7, "When is it due?", version="v1"), threading.current_thread()
+
+    result, loop_thread = asyncio.run(ask())
+
+    assert result == {**ANSWER, "cached": True}
+    assert len(threads) == 1 and threads[0] is not loop_thread
@@ -0,0 +1,42 @@
+import copy
+import inspect
+
+import pytest
+
+from app.services import registry
+from app.services.registry import lazy, loaded
+
+
+@pytest.fixture
+def built() -> list[str]:
+    calls: list[str] = []
+    yield calls
+    registry.services.pop("probe", None)
+
+
+def test_introspection_does_not_build_the_service(built: list[str]) -> None:
+    service = lazy("probe", lambda: built.append("probe") or object())
+
+    assert not hasattr(service, "__wrapped__")
+    assert not hasattr(service, "_pytestfixturefunction")
+    assert inspect.unwrap(service) is service
+    copy.copy(service)
+
+    assert built == []
+    assert not loaded("probe")
+
+
+def test_public_attribute_access_builds_the_service_once(built: list[str]) -> None:
+    class Service:
+        def __init__(self) -> None:
+            built.append("probe")
+
+        def ping(self) -> str:
+            return "pong"
+
+    service = lazy("probe", Service)
+
+    assert service.ping() == "pong"
+    assert service.ping() == "pong"
+    assert built == ["probe"]
+    assert loaded("probe")
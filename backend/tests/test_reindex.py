@@ -0,0 +1,230 @@
+import hashlib
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pytest
+
+from app.core.config import Settings, get_settings
+from app.services import reindex
+from app.services.chunk_store import ChunkStore
+from app.services.reindex import Reindexer
+from app.services.vector_store import VersionedVectorStore
+
+DIM = 8
+
+
+def vector(model: str, text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(f"{model}:{text}".encode()).digest()[:8], "big")
+    row = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return row / np.linalg.norm(row)
+
+
+class FakeEmbedder:
+    """Deterministic unit vectors per model and text; ``before_embed`` runs ahead of every call."""
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.embedded: list[str] = []
+        self.before_embed: Callable[[int], None] | None = None
+        self.calls = 0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        self.calls += 1
+        if self.before_embed is not None:
+            self.before_embed(self.calls)
+        self.embedded.extend(texts)
+        return np.stack([vector(self.model, text) for text in texts])
+
+
+class Stores(NamedTuple):
+    chunks: ChunkStore
+    vectors: VersionedVectorStore
+
+
+@pytest.fixture
+def stores(settings: Settings) -> Stores:
+    """The chunk and vector store singletons, looked up once ``settings`` points them at ``tmp_path``."""
+    from app.services.chunk_store import chunk_store
+    from app.services.vector_store import vector_store
+
+    return Stores(chunk_store, vector_store)
+
+
+@pytest.fixture
+def embedders(monkeypatch: pytest.MonkeyPatch) -> dict[str, FakeEmbedder]:
+    embedders: dict[str, FakeEmbedder] = {}
+
+    def embedding_service_for(model: str | None = None) -> FakeEmbedder:
+        model = model or get_settings().embedding_model
+        return embedders.setdefault(model, FakeEmbedder(model))
+
+    monkeypatch.setattr(reindex, "embedding_service_for", embedding_service_for)
+    return embedders
+
+
+def use_model(monkeypatch: pytest.MonkeyPatch, name: str) -> None:
+    monkeypatch.setenv("EMBEDDING_MODEL", name)
+    get_settings.cache_clear()
+
+
+def texts_of(document_id: int, count: int, tag: str = "") -> list[str]:
+    return [f"document {document_id} chunk {pos}{tag}" for pos in range(count)]
+
+
+def index_document(stores: Stores, document_id: int, texts: list[str]) -> None:
+    """What the index stage does: reset, then write the chunks to the active version and the chunk store."""
+    stores.vectors.delete_document(document_id)
+    stores.chunks.reset_document(document_id)
+    index = stores.vectors.active()
+    model = index.version.embedding_model
+    metadatas = [{"page": 1} for _ in texts]
+    index.store.upsert_document_chunks(
+        document_id, texts, np.stack([vector(model, text) for text in texts]), metadatas=metadatas
+    )
+    stores.chunks.add_chunks(document_id, texts, metadatas=metadatas)
+    stores.chunks.finish_document(document_id, len(texts))
+
+
+def delete_document(stores: Stores, document_id: int) -> None:
+    stores.vectors.delete_document(document_id)
+    stores.chunks.reset_document(document_id)
+
+
+def assert_indexed(stores: Stores, document_id: int, texts: list[str], model: str) -> None:
+    stored, embeddings, metadatas = stores.vectors.active().store.get_document_chunks(document_id)
+    assert stored == texts
+    assert [metadata["page"] for metadata in metadatas] == [1] * len(texts)
+    np.testing.assert_allclose(embeddings, np.stack([vector(model, text) for text in texts]), atol=1e-2)
+
+
+@pytest.fixture
+def corpus(monkeypatch: pytest.MonkeyPatch, embedders, stores) -> dict[int, list[str]]:
+    """Four documents indexed with model ``a``; the configured model is then switched to ``b``."""
+    use_model(monkeypatch, "a")
+    documents = {document_id: texts_of(document_id, 3) for document_id in range(1, 5)}
+    for document_id, texts in documents.items():
+        index_document(stores, document_id, texts)
+    use_model(monkeypatch, "b")
+    return documents
+
+
+def test_reindex_builds_and_activates_a_version_for_the_new_model(corpus, embedders, stores) -> None:
+    result = Reindexer(batch_size=2).run()
+
+    assert result["status"] == "activated"
+    assert (result["version"], result["previous_version"], result["chunks"]) == (2, 1, 12)
+    active = stores.vectors.active().version
+    assert (active.id, active.embedding_model) == (2, "b")
+    for document_id, texts in corpus.items():
+        assert_indexed(stores, document_id, texts, "b")
+    assert sorted(embedders["b"].embedded) == sorted(text for texts in corpus.values() for text in texts)
+    assert [version.status for version in stores.chunks.versions()] == ["retired", "active"]
+
+
+def test_reindex_with_the_active_model_does_nothing(monkeypatch: pytest.MonkeyPatch, embedders, stores) -> None:
+    use_model(monkeypatch, "a")
+    index_document(stores, 1, texts_of(1, 2))
+
+    assert Reindexer().run() == {"status": "current", "version": 1}
+    assert embedders == {}
+
+
+def test_documents_written_during_the_reindex_are_caught_up_before_the_switch(corpus, embedders, stores) -> None:
+    rewritten = texts_of(1, 1, " rewritten")
+
+    def write_meanwhile(call: int) -> None:
+        if call == 1:
+            # Indexed with the still active model ``a``, in what queries see until the switch.
+            index_document(stores, 5, texts_of(5, 2))
+            index_document(stores, 1, rewritten)
+        if call == 2:
+            # Document 2's chunks are already read, so the job still writes them; its next pass removes them.
+            delete_document(stores, 2)
+
+    embedders["b"] = FakeEmbedder("b")
+    embedders["b"].before_embed = write_meanwhile
+
+    assert Reindexer(batch_size=2).run()["status"] == "activated"
+
+    assert_indexed(stores, 1, rewritten, "b")
+    assert_indexed(stores, 3, corpus[3], "b")
+    assert_indexed(stores, 4, corpus[4], "b")
+    assert_indexed(stores, 5, texts_of(5, 2), "b")
+    assert stores.vectors.active().store.get_document_chunks(2)[0] == []
+
+
+def test_activate_refuses_a_version_behind_the_latest_revision(corpus, stores) -> None:
+    version = stores.vectors.create_version("b", "numpy")
+    latest = stores.chunks.changed_since(0, 100)[-1][1]
+
+    assert not stores.chunks.activate(version.id, latest - 1)
+    assert stores.vectors.active().version.id == 1
+
+    assert stores.chunks.activate(version.id, latest)
+    assert [(v.id, v.status) for v in stores.chunks.versions()] == [(1, "retired"), (version.id, "active")]
+
+
+def test_an_interrupted_reindex_resumes_from_its_saved_cursor(corpus, embedders, stores) -> None:
+    def fail(call: int) -> None:
+        if call == 3:
+            raise RuntimeError("embedding failed")
+
+    embedders["b"] = FakeEmbedder("b")
+    embedders["b"].before_embed = fail
+
+    with pytest.raises(RuntimeError):
+        Reindexer(batch_size=3).run()
+
+    (building,) = [version for version in stores.chunks.versions() if version.status == "building"]
+    # Document 1 was written once document 2 had been embedded; document 2's write was still pending.
+    revisions = dict(stores.chunks.changed_since(0, 100))
+    assert building.cursor == revisions[1]
+    assert building.chunks == 3
+    assert stores.vectors.active().version.id == 1
+    # The lease was released, so the job can be picked up again straight away.
+    assert stores.chunks.claim(building.id, 60)
+    stores.chunks.release(building.id)
+
+    embedders["b"] = FakeEmbedder("b")
+    result = Reindexer(batch_size=3).run()
+
+    assert (result["status"], result["version"], result["chunks"]) == ("activated", building.id, 12)
+    assert not set(corpus[1]) & set(embedders["b"].embedded)
+    for document_id, texts in corpus.items():
+        assert_indexed(stores, document_id, texts, "b")
+
+
+def test_a_version_leased_by_another_job_is_left_alone(corpus, embedders, stores) -> None:
+    version = stores.vectors.create_version("b", "numpy")
+    assert stores.chunks.claim(version.id, 60)
+
+    assert Reindexer().run() == {"status": "running", "version": version.id}
+    assert embedders == {}
+
+
+def test_documents_indexed_before_the_chunk_store_are_copied_from_the_active_version(corpus, stores) -> None:
+    texts = texts_of(7, 2)
+    metadatas = [{"page": 1, "document_id": 7, "chunk_index": pos} for pos in range(2)]
+    stores.vectors.active().store.upsert_document_chunks(
+        7, texts, np.stack([vector("a", text) for text in texts]), metadatas=metadatas
+    )
+
+    assert Reindexer().run(document_ids=[1, 7])["status"] == "activated"
+
+    assert [text for _, text, _ in stores.chunks.iter_chunks(7)] == texts
+    assert_indexed(stores, 7, texts, "b")
+
+
+def test_drop_removes_every_version(corpus, stores) -> None:
+    Reindexer().run()
+    locations = [Path(version.location) for version in stores.chunks.versions()]
+    assert all(location.exists() for location in locations)
+
+    stores.vectors.drop()
+
+    assert stores.chunks.versions() == []
+    assert not any(location.exists() for location in locations)
+    # The next call starts over from the configured model.
+    assert stores.vectors.active().version.embedding_model == "b"
@@ -0,0 +1,79 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core.config import get_settings
+from app.services.storage import UploadTooLargeError, remove_unreferenced_uploads, save_upload, store_fileobj
+
+
+def age(path: Path, seconds: float) -> None:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_identical_uploads_share_one_content_addressed_file() -> None:
+    first = store_fileobj(io.BytesIO(b"quarterly report"), "report.PDF")
+    second = store_fileobj(io.BytesIO(b"quarterly report"), "copy.pdf")
+
+    digest = hashlib.sha256(b"quarterly report").hexdigest()
+    assert first.path == second.path == get_settings().upload_dir / f"{digest}.pdf"
+    assert (first.content_hash, first.size_bytes) == (digest, 16)
+    assert [p.name for p in get_settings().upload_dir.iterdir()] == [first.path.name]
+
+
+class ChunkedSource:
+    """An ``UploadFile`` stand-in that records the size of every read."""
+
+    def __init__(self, data: bytes) -> None:
+        self.buffer = io.BytesIO(data)
+        self.reads: list[int] = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        return self.buffer.read(size)
+
+
+def test_save_upload_streams_in_fixed_size_blocks() -> None:
+    source = ChunkedSource(b"x" * 10)
+    stored = asyncio.run(save_upload(source, "notes.txt", chunk_size=4))
+
+    assert source.reads == [4, 4, 4, 4]
+    assert stored.size_bytes == 10
+    assert stored.content_hash == hashlib.sha256(b"x" * 10).hexdigest()
+    assert stored.path.read_bytes() == b"x" * 10
+
+
+def test_an_oversized_upload_is_rejected_without_leaving_a_temporary_file() -> None:
+    source = ChunkedSource(b"x" * 10)
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(save_upload(source, "notes.txt", max_bytes=6, chunk_size=4))
+
+    assert source.reads == [4, 4]
+    assert list(get_settings().upload_dir.iterdir()) == []
+
+
+def test_reusing_a_stored_upload_refreshes_its_age_for_gc() -> None:
+    stored = store_fileobj(io.BytesIO(b"contract"), "contract.txt")
+    age(stored.path, 7200)
+
+    asyncio.run(save_upload(ChunkedSource(b"contract"), "contract.txt"))
+
+    assert remove_unreferenced_uploads([], min_age_seconds=3600) == 0
+    assert stored.path.exists()
+
+
+def test_remove_unreferenced_uploads_spares_referenced_and_recent_files() -> None:
+    referenced = store_fileobj(io.BytesIO(b"kept"), "kept.txt")
+    orphan = store_fileobj(io.BytesIO(b"orphan"), "orphan.txt")
+    recent = store_fileobj(io.BytesIO(b"recent"), "recent.txt")
+    age(referenced.path, 7200)
+    age(orphan.path, 7200)
+
+    assert remove_unreferenced_uploads([str(referenced.path)], min_age_seconds=3600) == 1
+    assert referenced.path.exists() and recent.path.exists()
+    assert not orphan.path.exists()
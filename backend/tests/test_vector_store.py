@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.core.config import Settings
+from app.services.vector_store import NumpyVectorStore
+
+DIM = 8
+
+
+def unit(seed: int) -> np.ndarray:
+    row = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return row / np.linalg.norm(row)
+
+
+def texts_of(document_id: int, count: int, tag: str = "") -> list[str]:
+    return [f"document {document_id} chunk {pos}{tag}" for pos in range(count)]
+
+
+@pytest.fixture
+def store(settings: Settings) -> NumpyVectorStore:
+    return NumpyVectorStore()
+
+
+def upsert(store: NumpyVectorStore, document_id: int, embeddings: np.ndarray, tag: str = "") -> list[str]:
+    texts = texts_of(document_id, len(embeddings), tag)
+    store.upsert_document_chunks(document_id, texts, embeddings)
+    return texts
+
+
+def corpus_ids(store: NumpyVectorStore, query: np.ndarray, top_k: int) -> list[str]:
+    return store.query_corpus(query, top_k)["ids"][0]
+
+
+def test_corpus_query_matches_exact_search_over_every_document(store: NumpyVectorStore) -> None:
+    embeddings = {
+        document_id: np.stack([unit(10 * document_id + pos) for pos in range(5)]) for document_id in (1, 2, 3)
+    }
+    for document_id, rows in embeddings.items():
+        upsert(store, document_id, rows)
+    query = unit(99)
+
+    scored = [
+        (float(row @ query), f"{document_id}:{pos}")
+        for document_id, rows in embeddings.items()
+        for pos, row in enumerate(rows)
+    ]
+    expected = sorted(scored, reverse=True)
+    assert corpus_ids(store, query, 4) == [key for _, key in expected[:4]]
+    assert store.query_corpus(query, 4, document_ids=[2])["ids"][0] == [
+        key for _, key in expected if key.startswith("2:")
+    ][:4]
+
+
+def test_rows_of_deleted_and_rewritten_documents_are_skipped(store: NumpyVectorStore) -> None:
+    query = unit(0)
+    # Document 1's rows all match the query best, then get superseded.
+    upsert(store, 1, np.stack([query] * 6))
+    upsert(store, 2, np.stack([unit(2), unit(3)]))
+    upsert(store, 3, np.stack([unit(4)]))
+    store.delete_document(3)
+    rewritten = upsert(store, 1, np.stack([unit(5)]), " rewritten")
+
+    result = store.query_corpus(query, 3)
+
+    assert sorted(result["ids"][0]) == ["1:0", "2:0", "2:1"]
+    assert rewritten[0] in result["documents"][0]
+
+
+def test_compact_drops_stale_rows_once_they_pass_the_threshold(store: NumpyVectorStore) -> None:
+    for document_id in range(1, 5):
+        upsert(store, document_id, np.stack([unit(document_id)] * 2))
+    assert store.compact() == 0
+
+    store.delete_document(1)
+    store.delete_document(2)
+    assert store.compact() == 4
+    assert store.compact() == 0
+    corpus = json.loads((store.root / "corpus.json").read_text())["dir"]
+    assert len(np.load(store.root / corpus / "rows.npy")) == 4
+    assert sorted(corpus_ids(store, unit(3), 10)) == ["3:0", "3:1", "4:0", "4:1"]
+
+
+def test_an_index_from_before_the_corpus_matrix_is_built_on_first_query(store: NumpyVectorStore) -> None:
+    for document_id in (1, 2):
+        upsert(store, document_id, np.stack([unit(document_id)]))
+    (store.root / "corpus.json").unlink()
+    for document_id in (1, 2):
+        (store.root / str(document_id) / "epoch").unlink()
+
+    assert corpus_ids(store, unit(2), 2) == ["2:0", "1:0"]
+    assert corpus_ids(store, unit(1), 1) == ["1:0"]
@@ -1,10 +1,21 @@
+import { useState } from 'react';
+import { documentAPI } from '../services/api';
+
 const InsightsDisplay = ({ document }) => {
+  // Insights keep a preview of each table; full tables are loaded from the API on demand.
+  const [fullTables, setFullTables] = useState({});
+
   if (!document || !document.insights) {
     return <div>No insights available</div>;
   }
 
   const { insights } = document;
 
+  const showAllRows = async (index) => {
+    const table = await documentAPI.getDocumentTable(document.id, index, { limit: 10000 });
+    setFullTables((loaded) => ({ ...loaded, [index]: table.rows }));
+  };
+
   return (
     <div className="insights-display">
       <h2>Document Insights</h2>
@@ -33,28 +44,41 @@ const InsightsDisplay = ({ document }) => {
       {insights.tables && insights.tables.length > 0 && (
         <div className="insight-section">
           <h3>📊 Extracted Tables</h3>
-          {insights.tables.map((table, index) => (
-            <div key={index} className="table-container">
-              <table className="extracted-table">
-                <thead>
-                  <tr>
-                    {table.headers?.map((header, hIndex) => (
-                      <th key={hIndex}>{header}</th>
-                    ))}
-                  </tr>
-                </thead>
-                <tbody>
-                  {table.rows?.map((row, rIndex) => (
-                    <tr key={rIndex}>
-                      {row.map((cell, cIndex) => (
-                        <td key={cIndex}>{cell}</td>
+          {insights.tables.map((table, tIndex) => {
+            const index = table.index ?? tIndex;
+            const rows = fullTables[index] ?? table.rows ?? [];
+            const rowCount = table.row_count ?? rows.length;
+            return (
+              <div key={index} className="table-container">
+                <table className="extracted-table">
+                  <thead>
+                    <tr>
+                      {table.headers?.map((header, hIndex) => (
+                        <th key={hIndex}>{header}</th>
                       ))}
                     </tr>
-                  ))}
-                </tbody>
-              </table>
-            </div>
-          ))}
+                  </thead>
+                  <tbody>
+                    {rows.map((row, rIndex) => (
+                      <tr key={rIndex}>
+                        {row.map((cell, cIndex) => (
+                          <td key={cIndex}>{cell}</td>
+                        ))}
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+                {rows.length < rowCount && (
+                  <p className="table-rows-note">
+                    {rows.length} of {rowCount} rows{' '}
+                    <button type="button" onClick={() => showAllRows(index)}>
+                      Show all rows
+                    </button>
+                  </p>
+                )}
+              </div>
+            );
+          })}
         </div>
       )}
 
@@ -14,19 +14,20 @@ const QuestionAnswer = ({ documentId }) => {
     setLoading(true);
     setError(null);
 
+    const id = Date.now();
+    const setAnswer = (update) =>
+      setAnswers((current) => current.map((qa) => (qa.id === id ? { ...qa, answer: update(qa.answer) } : qa)));
+
     try {
-      const response = await documentAPI.askQuestion(documentId, question);
-      setAnswers([
-        ...answers,
-        {
-          question,
-          answer: response.answer,
-          timestamp: new Date(),
-        },
-      ]);
+      setAnswers((current) => [...current, { id, question, answer: '', timestamp: new Date() }]);
       setQuestion('');
+      const response = await documentAPI.askQuestionStream(documentId, question, {
+        onToken: (text) => setAnswer((answer) => answer + text),
+      });
+      setAnswer(() => response.answer);
     } catch (err) {
-      setError(err.response?.data?.detail || 'Failed to get answer');
+      setAnswers((current) => current.filter((qa) => qa.id !== id));
+      setError(err.message || 'Failed to get answer');
     } finally {
       setLoading(false);
     }
@@ -29,9 +29,19 @@ export const documentAPI = {
     return response.data;
   },
 
-  // Get all documents
-  getAllDocuments: async () => {
-    const response = await api.get('/api/v1/documents/');
+  // Get one page of documents, newest first, as { items, next_cursor, total }; pass next_cursor to get the next page
+  getDocumentPage: async ({ cursor, limit, status, category, includeTotal } = {}) => {
+    const response = await api.get('/api/v1/documents/', {
+      params: { cursor, limit, status, category, include_total: includeTotal },
+    });
+    return response.data;
+  },
+
+  // Get rows [offset, offset + limit) of one of a document's extracted tables
+  getDocumentTable: async (documentId, tableIndex, { offset, limit } = {}) => {
+    const response = await api.get(`/api/v1/documents/${documentId}/tables/${tableIndex}`, {
+      params: { offset, limit },
+    });
     return response.data;
   },
 
@@ -43,6 +53,41 @@ export const documentAPI = {
     return response.data;
   },
 
+  // Ask a question and receive the answer as it is generated (Server-Sent Events).
+  // Calls onSources(sources) once, then onToken(text) per token; resolves with the final answer.
+  askQuestionStream: async (documentId, question, { onSources, onToken, signal } = {}) => {
+    const response = await fetch(`${API_BASE_URL}/api/v1/documents/${documentId}/ask/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify({ question }),
+      signal,
+    });
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw new Error(body.detail || 'Failed to get answer');
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const message = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = message.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(message.match(/^data: (.*)$/m)?.[1] ?? 'null');
+        if (event === 'sources') onSources?.(data.sources);
+        else if (event === 'token') onToken?.(data.text);
+        else if (event === 'error') throw new Error(data.detail);
+        else if (event === 'done') return data;
+      }
+    }
+    throw new Error('Answer stream ended unexpectedly');
+  },
+
   // Compare documents
   compareDocuments: async (documentIds) => {
     const response = await api.post('/api/v1/documents/compare', {